@@ -1,12 +1,19 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 import os
+import threading
+import time
 
+from config import settings
 from database import get_db
 from models.user import User
 
@@ -18,15 +25,95 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 43200
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
+    """Verify a password against a hash (blocking, see PasswordHasher)"""
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
-    """Hash a password"""
-    salt = bcrypt.gensalt()
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password at the configured bcrypt cost (blocking, see PasswordHasher)"""
+    salt = bcrypt.gensalt(rounds or settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """bcrypt cost factor of a hash ($2b$<cost>$...), None if it is not a bcrypt hash"""
+    try:
+        return int(hashed_password.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated bounded thread pool, so a burst of logins neither
+    blocks the event loop nor holds the request thread pool. bcrypt releases
+    the GIL, so the workers hash in parallel. Once max_queue hashes are
+    waiting, further callers get a 503 instead of queueing without bound.
+    """
+    
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._metrics = {"completed": 0, "rejected": 0, "rehashed": 0, "max_queue_depth": 0}
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self.submit(verify_password, password, hashed_password))
+    
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(get_password_hash, password, self.rounds))
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a verified hash was made at another cost than the configured one"""
+        cost = hash_cost(hashed_password)
+        return cost is not None and cost != self.rounds
+    
+    async def rehash(self, user: User, password: str):
+        """Re-hash a just verified password at the configured cost; saved with the caller's commit"""
+        user.hashed_password = await self.hash(password)
+        with self._lock:
+            self._metrics["rehashed"] += 1
+    
+    def submit(self, func: Callable, *args) -> Future:
+        """Queue a bcrypt call on the pool, or raise a 503 once max_queue calls are waiting"""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._metrics["rejected"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many sign-ins in progress, please try again",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._pending - self.workers)
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return future
+    
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            self._metrics["completed"] += 1
+    
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self._metrics,
+                "workers": self.workers,
+                "in_progress": min(self._pending, self.workers),
+                "queue_depth": max(self._pending - self.workers, 0),
+            }
+
+
+# Singleton instance
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_LIMIT,
+    rounds=settings.BCRYPT_ROUNDS
+)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -39,11 +126,128 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user from token"""
+class UserCache:
+    """
+    Bounded TTL/LRU cache of authenticated users keyed by token subject
+    (username), so most requests skip the user lookup. Entries hold column
+    values, minus secrets, and are merged into the request's session without
+    a query, so handlers can still change and commit the user. Committed
+    user changes in this process invalidate the entry; the TTL bounds how
+    long other processes can serve a stale one.
+    """
+    
+    # Loaded on access instead of being kept in memory
+    UNCACHED_COLUMNS = ("hashed_password", "two_fa_secret")
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.columns = tuple(
+            column.key for column in User.__table__.columns if column.key not in self.UNCACHED_COLUMNS
+        )
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._generation = 0  # Bumped by every invalidation
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "invalidations": 0}
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+    
+    @property
+    def generation(self) -> int:
+        return self._generation
+    
+    def get(self, db: Session, username: str) -> Optional[User]:
+        """The cached user attached to db, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[username]
+                entry = None
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(username)
+            self._metrics["hits"] += 1
+        
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
+    def put(self, user: User, generation: int):
+        """Cache a user loaded while the cache was at generation; skipped if invalidated since"""
+        if not self.enabled:
+            return
+        values = {column: getattr(user, column) for column in self.columns}
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user.username] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, *usernames: str):
+        with self._lock:
+            self._generation += 1
+            self._metrics["invalidations"] += 1
+            for username in usernames:
+                self._entries.pop(username, None)
+    
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+    
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "size": len(self._entries)}
+
+
+# Singleton instance
+user_cache = UserCache(max_size=settings.AUTH_USER_CACHE_SIZE, ttl_seconds=settings.AUTH_USER_CACHE_SECONDS)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, user):
+    """Remember changed users; their cache entries are dropped once the change is committed"""
+    session = object_session(user)
+    if session is None:
+        user_cache.clear()
+        return
+    changed = session.info.setdefault("changed_usernames", set())
+    changed.add(user.username)
+    changed.update(inspect(user).attrs.username.history.deleted or ())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _users_bulk_changed(state):
+    if (state.is_update or state.is_delete) and state.bind_mapper is User.__mapper__:
+        state.session.info["clear_user_cache"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    changed = session.info.pop("changed_usernames", None)
+    if session.info.pop("clear_user_cache", False):
+        user_cache.clear()
+    elif changed:
+        user_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_users(session, previous_transaction):
+    if not session.in_transaction():
+        session.info.pop("changed_usernames", None)
+        session.info.pop("clear_user_cache", None)
+
+
+def get_user_from_token(token: str, db: Session) -> User:
+    """Resolve the user a JWT access token was issued to"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,7 +255,6 @@ def get_current_user(
     )
     
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
@@ -59,14 +262,31 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = user_cache.get(db, username)
     if user is None:
-        raise credentials_exception
+        generation = user_cache.generation
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        user_cache.put(user, generation)
     
     return user
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current authenticated user from token"""
+    return get_user_from_token(credentials.credentials, db)
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+    """Get the current user, who must be an admin"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
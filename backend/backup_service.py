@@ -38,6 +38,23 @@ class BackupService:
         else:
             return self._backup_sqlite(timestamp, compress)
     
+    def enqueue_backup(self, compress: bool = True) -> int:
+        """
+        Queue a backup (and S3 upload) for the background job workers
+        
+        Returns:
+            Job id, see GET /api/v1/jobs/{job_id}
+        """
+        from database import SessionLocal
+        from job_queue import job_queue
+        
+        db = SessionLocal()
+        try:
+            # A backup already waiting covers this request
+            return job_queue.enqueue(db, "backup", {"compress": compress}, dedupe=True).id
+        finally:
+            db.close()
+    
     def _backup_postgres(self, timestamp: str, compress: bool) -> str:
         """Backup PostgreSQL database using pg_dump"""
         filename = f"kilele_backup_{timestamp}.sql"
@@ -226,6 +243,13 @@ class BackupService:
 # Global instance
 backup_service = BackupService()
 
+
+def run_backup_job(db, job, payload: dict) -> dict:
+    """Job handler for BackupService.enqueue_backup"""
+    backup_file = backup_service.create_backup(compress=payload.get("compress", True))
+    backup_service.upload_to_s3(backup_file)
+    return {"backup_file": backup_file}
+
 # CLI interface
 if __name__ == "__main__":
     import sys
@@ -233,6 +257,7 @@ if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python backup_service.py create       - Create new backup")
+        print("  python backup_service.py queue        - Queue a backup for the API's job workers")
         print("  python backup_service.py list         - List all backups")
         print("  python backup_service.py restore FILE - Restore from backup")
         print("  python backup_service.py cleanup      - Remove old backups")
@@ -247,6 +272,10 @@ if __name__ == "__main__":
         # Upload to S3 if configured
         backup_service.upload_to_s3(backup_file)
         
+    elif command == "queue":
+        job_id = backup_service.enqueue_backup(compress=True)
+        print(f"\n📦 Backup queued as job {job_id}")
+        
     elif command == "list":
         backups = backup_service.list_backups()
         print(f"\n📦 Available backups ({len(backups)}):")
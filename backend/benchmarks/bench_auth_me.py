@@ -0,0 +1,60 @@
+"""
+Benchmark: GET /api/v1/auth/me throughput
+Requests per second through the app in-process (TestClient, one client)
+with the authenticated-user cache in auth.py disabled and enabled, on a
+scratch SQLite database.
+
+Usage (from backend/):
+    python benchmarks/bench_auth_me.py [requests]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_database = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database}"
+os.environ.setdefault("DEBUG", "False")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from auth import user_cache  # noqa: E402
+from main import app  # noqa: E402
+
+
+def requests_per_second(client: TestClient, headers: dict, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 200, response.text
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    client = TestClient(app)
+
+    credentials = {"username": "benchmark", "password": "benchmark123"}
+    client.post("/api/v1/auth/register", json={**credentials, "email": "benchmark@example.com"})
+    token = client.post("/api/v1/auth/login", json=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    size = user_cache.max_size
+    requests_per_second(client, headers, 100)  # Warm up
+
+    user_cache.max_size = 0
+    uncached = requests_per_second(client, headers, count)
+    user_cache.max_size = size
+    cached = requests_per_second(client, headers, count)
+
+    print(f"GET /api/v1/auth/me, {count:,} requests, SQLite")
+    print(f"  user lookup per request    {uncached:8.0f} req/s")
+    print(f"  user cache                 {cached:8.0f} req/s   {cached / uncached:5.2f}x")
+    print(f"  cache {user_cache.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
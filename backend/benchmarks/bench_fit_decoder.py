@@ -0,0 +1,117 @@
+"""
+Benchmark: FIT record decoding
+Compares fitparse's generic message API, as parse_fit used it, with the
+struct-based fast path in utils/fit_decoder.py on synthetic Garmin-style
+activity files (valid CRCs, so fitparse reads them too).
+
+Usage (from backend/):
+    python benchmarks/bench_fit_decoder.py [points] [repeats]
+"""
+import struct
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.fit_decoder import FIT_EPOCH, decode_fit  # noqa: E402
+from utils.wearable_parser import WearableDataParser  # noqa: E402
+
+_CRC_TABLE = (0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401,
+              0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400)
+
+
+def fit_crc(data: bytes, crc: int = 0) -> int:
+    for byte in data:
+        tmp = _CRC_TABLE[crc & 0xF]
+        crc = ((crc >> 4) & 0x0FFF) ^ tmp ^ _CRC_TABLE[byte & 0xF]
+        tmp = _CRC_TABLE[crc & 0xF]
+        crc = ((crc >> 4) & 0x0FFF) ^ tmp ^ _CRC_TABLE[(byte >> 4) & 0xF]
+    return crc
+
+
+def _definition(local: int, global_number: int, fields) -> bytes:
+    body = struct.pack("<BBHB", 0, 0, global_number, len(fields))
+    return bytes([0x40 | local]) + body + b"".join(struct.pack("<BBB", *field) for field in fields)
+
+
+def synthetic_fit(count: int, compressed_every: int = 0, seed: int = 7) -> bytes:
+    """
+    A 1 Hz activity: file_id, `count` records (the first few without a fix),
+    periodic lap-style event messages and a session with device totals.
+    Every compressed_every-th record uses a compressed timestamp header.
+    """
+    rng = np.random.default_rng(seed)
+    start = 1_100_000_000  # FIT seconds
+    heading = np.cumsum(rng.normal(0, 0.05, count))
+    lat = -0.35 + np.cumsum(1.1e-5 * np.cos(heading))
+    lng = 36.75 + np.cumsum(1.1e-5 * np.sin(heading))
+    alt = 2000 + 300 * np.sin(np.linspace(0, 2 * np.pi, count))
+
+    out = [
+        _definition(0, 0, [(0, 1, 0x00), (1, 2, 0x84), (4, 4, 0x86)]),
+        struct.pack("<BBHI", 0, 4, 1, start),
+        # record: timestamp, lat, long, altitude, heart rate, distance (skipped by the fast path)
+        _definition(1, 20, [(253, 4, 0x86), (0, 4, 0x85), (1, 4, 0x85), (2, 2, 0x84), (3, 1, 0x02), (5, 4, 0x86)]),
+        # record without timestamp, for compressed timestamp headers
+        _definition(2, 20, [(0, 4, 0x85), (1, 4, 0x85), (2, 2, 0x84), (3, 1, 0x02), (5, 4, 0x86)]),
+        # event: timestamp, event, event_type
+        _definition(3, 21, [(253, 4, 0x86), (0, 1, 0x00), (1, 1, 0x00)]),
+    ]
+    for i in range(count):
+        timestamp = start + i
+        position = (0x7FFFFFFF, 0x7FFFFFFF) if i < 3 else (
+            int(round(lat[i] / 180 * 2 ** 31)), int(round(lng[i] / 180 * 2 ** 31)))
+        altitude = int(round((alt[i] + 500) * 5))
+        heart_rate = 110 + (i % 40)
+        if compressed_every and i % compressed_every == 1:
+            out.append(bytes([0x80 | (2 << 5) | (timestamp & 0x1F)]))
+            out.append(struct.pack("<iiHBI", *position, altitude, heart_rate, i * 110))
+        else:
+            out.append(b"\x01" + struct.pack("<IiiHBI", timestamp, *position, altitude, heart_rate, i * 110))
+        if i % 600 == 0:
+            out.append(b"\x03" + struct.pack("<IBB", timestamp, 0, 4))
+
+    out.append(_definition(0, 18, [(253, 4, 0x86), (7, 4, 0x86), (8, 4, 0x86), (9, 4, 0x86), (22, 2, 0x84), (23, 2, 0x84)]))
+    out.append(b"\x00" + struct.pack("<IIIIHH", start + count, count * 1000, (count - 60) * 1000, count * 110, 612, 598))
+
+    records = b"".join(out)
+    header = struct.pack("<BBHI4s", 14, 0x20, 2132, len(records), b".FIT")
+    header += struct.pack("<H", fit_crc(header))
+    return header + records + struct.pack("<H", fit_crc(header + records))
+
+
+def best_of(func, repeats: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeats))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    data = synthetic_fit(count, compressed_every=4)
+
+    fast = decode_fit(data)
+    slow = WearableDataParser._parse_fit_fitparse(data, max_points=None)
+    assert len(fast.track.latitude) == len(slow.track.latitude) == count - 3
+    assert np.allclose(fast.track.latitude, slow.track.latitude)
+    assert np.allclose(fast.track.longitude, slow.track.longitude)
+    assert np.allclose(fast.track.elevation, slow.track.elevation)
+    assert np.allclose(fast.track.time, slow.track.time)
+    assert np.array_equal(fast.heart_rate, slow.heart_rate)
+    assert fast.session["total_distance"] == slow.session["total_distance"]
+    assert fast.track.time[0] == (1_100_000_000 + 3) + FIT_EPOCH
+
+    fitparse_time = best_of(lambda: WearableDataParser._parse_fit_fitparse(data, max_points=None), repeats)
+    fast_time = best_of(lambda: decode_fit(data), repeats)
+    full_time = best_of(lambda: WearableDataParser.parse_fit(data, max_points=None), repeats)
+
+    print(f"{count:,} records ({len(data) / 1e6:.1f} MB), best of {repeats}; decoders agree")
+    print(f"  fitparse message API     {fitparse_time * 1000:9.1f} ms")
+    print(f"  fast path (decode_fit)   {fast_time * 1000:9.1f} ms   {fitparse_time / fast_time:6.1f}x")
+    print(f"  parse_fit incl. metrics  {full_time * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
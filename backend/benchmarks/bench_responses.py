@@ -0,0 +1,135 @@
+"""
+Benchmark: response serialization and compression
+Renders the payloads of the route, feed and hike list endpoints, as FastAPI
+hands them to the response class, with the stdlib JSONResponse and with
+FastJSONResponse from http_encoding.py, and compares body sizes and times
+with gzip and brotli at the levels CompressionMiddleware uses.
+
+Usage (from backend/):
+    python benchmarks/bench_responses.py [route points] [repeats]
+"""
+import gzip
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_track_metrics import synthetic_track  # noqa: E402
+from config import settings  # noqa: E402
+from http_encoding import FastJSONResponse, brotli  # noqa: E402
+from schemas.hike import HikeResponse  # noqa: E402
+from schemas.social import ActivityResponse  # noqa: E402
+from utils.route_codec import decode_arrays, encode_arrays, to_points  # noqa: E402
+from utils.track_metrics import track_arrays  # noqa: E402
+
+
+def route_payload(count: int) -> dict:
+    """GET /api/v1/wearable/sessions/{id}/route for a full-resolution recording"""
+    points = to_points(decode_arrays(encode_arrays(track_arrays(synthetic_track(count)))))
+    return {
+        "session_id": 1,
+        "hike_id": 1,
+        "route_coordinates": points,
+        "total_points": len(points),
+        "recorded_points": len(points),
+        "tolerance_m": 0.0
+    }
+
+
+def feed_payload(count: int = 100) -> list:
+    """GET /api/v1/social/feed at its largest page size"""
+    now = datetime(2026, 5, 1, 6)
+    items = [
+        ActivityResponse(
+            id=i,
+            user_id=i % 40,
+            activity_type=("completed_hike", "review", "achievement")[i % 3],
+            hike_id=i % 25,
+            related_id=i,
+            description=f"Completed Trail {i % 25} in {2 + i % 5} hours",
+            created_at=now - timedelta(minutes=7 * i),
+            username=f"hiker{i % 40}",
+            user_profile_picture=f"https://res.cloudinary.com/kilele/image/upload/v1/profiles/hiker{i % 40}.jpg",
+            hike_name=f"Trail {i % 25}",
+            cursor=f"{(now - timedelta(minutes=7 * i)).isoformat()},{i}"
+        )
+        for i in range(count)
+    ]
+    return TypeAdapter(List[ActivityResponse]).dump_python(items, mode="json")
+
+
+def hike_list_payload(count: int = 100) -> list:
+    """GET /api/v1/hikes at its default page size"""
+    now = datetime(2026, 5, 1, 6)
+    hikes = [
+        HikeResponse(
+            id=i,
+            name=f"Trail {i}",
+            location="Aberdare Ranges",
+            difficulty=("Easy", "Moderate", "Hard", "Extreme")[i % 4],
+            distance_km=5 + i % 20,
+            elevation_gain_m=300.0 + 10 * i,
+            estimated_duration_hours=2 + i % 6,
+            description="A forest trail through bamboo and moorland with views of the valley. " * 3,
+            trail_type="Loop",
+            best_season="June-September, December-February",
+            latitude=-0.35 + i / 100,
+            longitude=36.75 + i / 100,
+            image_url=f"https://res.cloudinary.com/kilele/image/upload/v1/hikes/trail{i}.jpg",
+            avg_rating=4.2,
+            review_count=17,
+            rating_histogram={1: 0, 2: 1, 3: 2, 4: 6, 5: 8},
+            created_at=now,
+            updated_at=now
+        )
+        for i in range(count)
+    ]
+    return TypeAdapter(List[HikeResponse]).dump_python(hikes, mode="json")
+
+
+def best_of(func, repeats: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeats))
+
+
+def report(name: str, content, repeats: int):
+    stdlib = best_of(lambda: JSONResponse(content), repeats)
+    fast = best_of(lambda: FastJSONResponse(content), repeats)
+    body = FastJSONResponse(content).body
+
+    print(f"{name}")
+    print(f"  json.dumps (JSONResponse)      {stdlib * 1000:8.2f} ms")
+    print(f"  orjson (FastJSONResponse)      {fast * 1000:8.2f} ms   {stdlib / fast:5.1f}x")
+    print(f"  identity                       {len(body) / 1024:8.1f} KB")
+
+    level = settings.COMPRESSION_GZIP_LEVEL
+    gzip_time = best_of(lambda: gzip.compress(body, level), repeats)
+    gzipped = gzip.compress(body, level)
+    print(f"  gzip {level}                         {len(gzipped) / 1024:8.1f} KB   {len(body) / len(gzipped):5.1f}x smaller, {gzip_time * 1000:7.2f} ms")
+
+    if brotli is not None:
+        quality = settings.COMPRESSION_BROTLI_QUALITY
+        brotli_time = best_of(lambda: brotli.compress(body, quality=quality), repeats)
+        compressed = brotli.compress(body, quality=quality)
+        print(f"  brotli {quality}                       {len(compressed) / 1024:8.1f} KB   {len(body) / len(compressed):5.1f}x smaller, {brotli_time * 1000:7.2f} ms")
+    else:
+        print("  brotli                         not installed")
+    print()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    report(f"Route, {count:,} points", route_payload(count), repeats)
+    report("Feed, 100 items", feed_payload(), repeats)
+    report("Hike list, 100 hikes", hike_list_payload(), repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: track metrics on a long recording
+Compares the per-point Python loop the parsers used to run with the
+vectorized engine in utils/track_metrics.py.
+
+Usage (from backend/):
+    python benchmarks/bench_track_metrics.py [points] [repeats]
+"""
+import math
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.track_metrics import compute_track_metrics, track_arrays  # noqa: E402
+
+
+def synthetic_track(count: int, seed: int = 7):
+    """A 1 Hz walk with heading drift, GPS jitter and a noisy climb"""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.05, count))
+    step = 1.2 / 111_000
+    latitude = -0.35 + np.cumsum(step * np.cos(heading)) + rng.normal(0, 1.5e-5, count)
+    longitude = 36.75 + np.cumsum(step * np.sin(heading)) + rng.normal(0, 1.5e-5, count)
+    elevation = 2000 + 400 * np.sin(np.linspace(0, 3 * np.pi, count)) + rng.normal(0, 1.5, count)
+    time = 1_777_600_000 + np.arange(count, dtype=np.float64)
+    return [
+        {'latitude': lat, 'longitude': lng, 'elevation': ele, 'time': t}
+        for lat, lng, ele, t in zip(latitude.tolist(), longitude.tolist(), elevation.tolist(), time.tolist())
+    ]
+
+
+def legacy_metrics(all_points):
+    """The previous per-point implementation from parse_tcx/parse_fit"""
+    total_distance = 0
+    if len(all_points) > 1:
+        for i in range(1, len(all_points)):
+            lat1, lon1 = all_points[i-1]['latitude'], all_points[i-1]['longitude']
+            lat2, lon2 = all_points[i]['latitude'], all_points[i]['longitude']
+            import math
+            R = 6371
+            dlat = math.radians(lat2 - lat1)
+            dlon = math.radians(lon2 - lon1)
+            a = (math.sin(dlat/2) * math.sin(dlat/2) +
+                 math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+                 math.sin(dlon/2) * math.sin(dlon/2))
+            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+            total_distance += R * c
+    elevations = [p.get('elevation', 0) for p in all_points if 'elevation' in p]
+    elevation_gain = max(elevations) - min(elevations) if elevations else 0
+    center_lat = sum(p['latitude'] for p in all_points) / len(all_points) if all_points else 0
+    center_lon = sum(p['longitude'] for p in all_points) / len(all_points) if all_points else 0
+    return total_distance, elevation_gain, center_lat, center_lon
+
+
+def best_of(func, repeats: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeats))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    points = synthetic_track(count)
+    arrays = track_arrays(points)
+
+    legacy = best_of(lambda: legacy_metrics(points), repeats)
+    conversion = best_of(lambda: track_arrays(points), repeats)
+    engine = best_of(lambda: compute_track_metrics(*arrays), repeats)
+
+    distance, span, _, _ = legacy_metrics(points)
+    metrics = compute_track_metrics(*arrays)
+
+    print(f"{count:,} points, best of {repeats}")
+    print(f"  legacy loop (distance, max-min, centroid)   {legacy * 1000:8.1f} ms")
+    print(f"  vectorized engine (all metrics)             {engine * 1000:8.1f} ms   {legacy / engine:6.1f}x")
+    print(f"  engine + dict -> array conversion           {(engine + conversion) * 1000:8.1f} ms   {legacy / (engine + conversion):6.1f}x")
+    print()
+    print(f"  distance      legacy {distance:9.3f} km   engine {metrics.distance_km:9.3f} km")
+    print(f"  elevation     legacy max-min {span:7.1f} m   engine gain {metrics.elevation_gain_m:7.1f} m, loss {metrics.elevation_loss_m:7.1f} m")
+    print(f"  moving time   {metrics.moving_hours:.2f} h of {metrics.elapsed_hours:.2f} h, pace {metrics.pace_min_per_km:.1f} min/km")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Load test: login latency under concurrent traffic
+Starts the API with uvicorn on a scratch SQLite database (or targets --url),
+registers users, then sends concurrent logins while a probe requests
+/health, and prints latency percentiles for both. The probe shows whether
+a burst of bcrypt work stalls unrelated requests.
+
+Usage (from backend/):
+    python benchmarks/load_login.py [--logins 200] [--concurrency 16] [--url http://host:port]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent
+PASSWORD = "load-test-password"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summary(name: str, latencies: List[float]):
+    milliseconds = [value * 1000 for value in latencies]
+    print(
+        f"  {name:<8} n={len(milliseconds):<5} p50 {percentile(milliseconds, 0.5):7.1f} ms   "
+        f"p95 {percentile(milliseconds, 0.95):7.1f} ms   p99 {percentile(milliseconds, 0.99):7.1f} ms   "
+        f"max {max(milliseconds):7.1f} ms"
+    )
+
+
+def start_server() -> (subprocess.Popen, str):
+    """uvicorn on a free port with a scratch database"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    database = os.path.join(tempfile.mkdtemp(), "load_login.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}", "DEBUG": "False"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/health", timeout=1)
+            return server, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("API did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--url", help="Running API to test instead of starting one")
+    args = parser.parse_args()
+
+    server, url = (None, args.url) if args.url else start_server()
+    try:
+        with httpx.Client(base_url=url, timeout=60) as client:
+            run_id = int(time.time())
+            usernames = [f"load{run_id}_{i}" for i in range(args.users)]
+            for username in usernames:
+                client.post("/api/v1/auth/register", json={
+                    "username": username, "email": f"{username}@example.com", "password": PASSWORD
+                })
+
+        login_latencies, probe_latencies, statuses = [], [], {}
+        done = threading.Event()
+
+        def login(i: int):
+            with httpx.Client(base_url=url, timeout=60) as client:
+                started = time.perf_counter()
+                response = client.post("/api/v1/auth/login", json={
+                    "username": usernames[i % len(usernames)], "password": PASSWORD
+                })
+                login_latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        def probe():
+            with httpx.Client(base_url=url, timeout=60) as client:
+                while not done.is_set():
+                    started = time.perf_counter()
+                    client.get("/health")
+                    probe_latencies.append(time.perf_counter() - started)
+                    time.sleep(0.01)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(login, range(args.logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+
+        status = httpx.get(f"{url}/api/status").json()
+        print(f"{args.logins} logins, {args.concurrency} concurrent, {elapsed:.1f} s ({args.logins / elapsed:.1f}/s), status codes {statuses}")
+        summary("login", login_latencies)
+        summary("/health", probe_latencies)
+        if "password_hashing" in status:
+            print(f"  hashing {status['password_hashing']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
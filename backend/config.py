@@ -15,7 +15,11 @@ class Settings:
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
     SESSION_EXPIRY_DAYS: int = int(os.getenv("SESSION_EXPIRY_DAYS", "30"))
-    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Older hashes are upgraded on the next login
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))  # bcrypt threads
+    PASSWORD_HASH_QUEUE_LIMIT: int = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))  # Waiting hashes before logins get a 503
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))  # Authenticated users kept per process, 0 disables
+    AUTH_USER_CACHE_SECONDS: int = int(os.getenv("AUTH_USER_CACHE_SECONDS", "30"))  # Upper bound on staleness across processes
     
     # Cloudinary
     CLOUDINARY_CLOUD_NAME: Optional[str] = os.getenv("CLOUDINARY_CLOUD_NAME")
@@ -53,6 +57,64 @@ class Settings:
     RATE_LIMIT_API: int = int(os.getenv("RATE_LIMIT_API", "60"))
     RATE_LIMIT_UPLOAD: int = int(os.getenv("RATE_LIMIT_UPLOAD", "10"))
     
+    # Response compression
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1000"))  # Smaller responses are sent as they are
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # 0-11, higher is smaller but much slower
+    
+    # HTTP caching of the trail catalogue (GET /api/v1/hikes), revalidated by ETag
+    CATALOGUE_CACHE_MAX_AGE: int = int(os.getenv("CATALOGUE_CACHE_MAX_AGE", "60"))  # Seconds clients may reuse a response unchecked
+    
+    # Social feed timelines
+    TIMELINE_MAX_LENGTH: int = int(os.getenv("TIMELINE_MAX_LENGTH", "800"))
+    TIMELINE_FANOUT_LIMIT: int = int(os.getenv("TIMELINE_FANOUT_LIMIT", "5000"))
+    TIMELINE_BACKFILL_SIZE: int = int(os.getenv("TIMELINE_BACKFILL_SIZE", "50"))
+    TIMELINE_FANOUT_CACHE_SECONDS: int = int(os.getenv("TIMELINE_FANOUT_CACHE_SECONDS", "300"))
+    TIMELINE_TRIM_MINUTES: float = float(os.getenv("TIMELINE_TRIM_MINUTES", "60"))  # How often timelines are cut back to TIMELINE_MAX_LENGTH
+    
+    # Strava sync
+    STRAVA_SYNC_WORKERS: int = int(os.getenv("STRAVA_SYNC_WORKERS", "4"))
+    STRAVA_INITIAL_SYNC_DAYS: int = int(os.getenv("STRAVA_INITIAL_SYNC_DAYS", "30"))
+    STRAVA_SYNC_OVERLAP_HOURS: int = int(os.getenv("STRAVA_SYNC_OVERLAP_HOURS", "48"))  # Catches late device uploads
+    STRAVA_SOCIAL_REFRESH_HOURS: int = int(os.getenv("STRAVA_SOCIAL_REFRESH_HOURS", "24"))
+    STRAVA_SOCIAL_REFRESH_DAYS: int = int(os.getenv("STRAVA_SOCIAL_REFRESH_DAYS", "30"))
+    STRAVA_RATE_LIMIT_15MIN: int = int(os.getenv("STRAVA_RATE_LIMIT_15MIN", "100"))
+    STRAVA_RATE_LIMIT_DAILY: int = int(os.getenv("STRAVA_RATE_LIMIT_DAILY", "1000"))
+    STRAVA_SYNC_MAX_WAIT_SECONDS: int = int(os.getenv("STRAVA_SYNC_MAX_WAIT_SECONDS", "900"))
+    STRAVA_RECONCILE_HOURS: int = int(os.getenv("STRAVA_RECONCILE_HOURS", "24"))  # Full sync cadence while webhooks are active
+    STRAVA_WEBHOOK_VERIFY_TOKEN: str = os.getenv("STRAVA_WEBHOOK_VERIFY_TOKEN", "kilele_hiking_app_2026")
+    STRAVA_WEBHOOK_WORKERS: int = int(os.getenv("STRAVA_WEBHOOK_WORKERS", "2"))
+    
+    # Strava trail matching
+    TRAIL_MATCH_RADIUS_KM: float = float(os.getenv("TRAIL_MATCH_RADIUS_KM", "5"))
+    TRAIL_MATCH_MAX_DISTANCE_M: float = float(os.getenv("TRAIL_MATCH_MAX_DISTANCE_M", "250"))
+    TRAIL_MATCH_MAX_POINTS: int = int(os.getenv("TRAIL_MATCH_MAX_POINTS", "500"))
+    TRAIL_MATCH_BATCH_RADIUS_KM: float = float(os.getenv("TRAIL_MATCH_BATCH_RADIUS_KM", "150"))  # Larger batches query per activity
+    
+    # Recorded route levels, Douglas-Peucker tolerances in metres
+    ROUTE_LEVEL_TOLERANCES_M: list = [float(t) for t in os.getenv("ROUTE_LEVEL_TOLERANCES_M", "2,5,10,25,50,100,250").split(",")]
+    ROUTE_ZOOM_PIXEL_TOLERANCE: float = float(os.getenv("ROUTE_ZOOM_PIXEL_TOLERANCE", "1"))  # Error allowed when served by ?zoom=
+    
+    # Wearable file imports
+    WEARABLE_MAX_FILE_MB: int = int(os.getenv("WEARABLE_MAX_FILE_MB", "100"))
+    WEARABLE_MAX_POINTS: int = int(os.getenv("WEARABLE_MAX_POINTS", "500000"))  # About 6 days at 1 Hz
+    WEARABLE_ARCHIVE_MAX_MB: int = int(os.getenv("WEARABLE_ARCHIVE_MAX_MB", "500"))
+    WEARABLE_ARCHIVE_MAX_FILES: int = int(os.getenv("WEARABLE_ARCHIVE_MAX_FILES", "1000"))
+    WEARABLE_IMPORT_WORKERS: int = int(os.getenv("WEARABLE_IMPORT_WORKERS", "2"))  # Parser processes shared by all archive imports
+    
+    # Background jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: int = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))  # Doubled after each failed attempt
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "5"))  # Idle workers also pick up jobs queued by other processes
+    JOB_TIMEOUT_MINUTES: int = int(os.getenv("JOB_TIMEOUT_MINUTES", "60"))  # Running jobs older than this are requeued
+    JOB_RECOVER_MINUTES: float = float(os.getenv("JOB_RECOVER_MINUTES", "5"))  # How often workers look for timed-out jobs
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+    JOB_UPLOAD_DIR: str = os.getenv("JOB_UPLOAD_DIR", "job_uploads")  # Uploaded files waiting for their job
+    
+    # Real-time messaging
+    REALTIME_BACKEND: str = os.getenv("REALTIME_BACKEND", "memory")
+    
     # AWS (for backups)
     AWS_ACCESS_KEY_ID: Optional[str] = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY: Optional[str] = os.getenv("AWS_SECRET_ACCESS_KEY")
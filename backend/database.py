@@ -66,5 +66,5 @@ def get_db_context():
 # Initialize database (create tables)
 def init_database():
     """Create all database tables"""
-    from models import user, hike, review, achievement, activity, bookmark, follow, hike_session, message
+    from models import user, hike, review, achievement, activity, timeline, bookmark, follow, hike_session, message, user_stats, job, cache_version
     Base.metadata.create_all(bind=engine)
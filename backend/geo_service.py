@@ -0,0 +1,49 @@
+"""
+Proximity search over hikes
+Uses the indexed geohash column to fetch candidates near a point, then ranks
+them by true great-circle distance.
+"""
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models.hike import Hike
+from utils.geo import covering_geohashes, geohash_range, haversine_km
+
+
+class GeoService:
+    """Find hikes near a coordinate"""
+
+    def nearby(
+        self,
+        db: Session,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[float, Hike]]:
+        """Return (distance_km, hike) pairs within radius_km of a point, nearest first"""
+        query = db.query(Hike).filter(Hike.geohash.isnot(None))
+
+        # Narrow to the geohash cells around the point with indexed range scans
+        prefixes = covering_geohashes(lat, lng, radius_km)
+        if prefixes:
+            query = query.filter(or_(*[
+                and_(Hike.geohash >= low, Hike.geohash <= high)
+                for low, high in map(geohash_range, prefixes)
+            ]))
+
+        results = []
+        for hike in query.all():
+            distance = haversine_km(lat, lng, hike.latitude, hike.longitude)
+            if distance <= radius_km:
+                results.append((distance, hike))
+
+        results.sort(key=lambda item: (item[0], item[1].id))
+        return results[:limit] if limit else results
+
+
+# Singleton instance
+geo_service = GeoService()
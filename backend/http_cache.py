@@ -0,0 +1,77 @@
+"""
+Conditional GET for read-mostly resources
+Responses carry a strong ETag built from the resource's version counter
+(models/cache_version.py), which every write bumps in its own transaction.
+Each resource (e.g. one hike) has its own counter, so writers to different
+resources never update the same row; a collection's version is the sum of
+its resources' counters. A client revalidating with If-None-Match gets a 304
+without the resource being loaded or serialized.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.cache_version import CacheVersion, version_name
+
+
+class HttpCache:
+    """ETag and Cache-Control handling keyed by resource version counters"""
+
+    def __init__(self, max_age: int):
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+    @staticmethod
+    def version(db: Session, collection: str, resource_id: int) -> int:
+        """Counter of one resource; a primary key lookup"""
+        name = version_name(collection, resource_id)
+        return db.query(CacheVersion.version).filter(CacheVersion.name == name).scalar() or 0
+
+    @staticmethod
+    def collection_version(db: Session, collection: str) -> int:
+        """Changes with any resource of the collection; counters only grow, so their sum does too"""
+        return db.query(func.sum(CacheVersion.version)).filter(
+            CacheVersion.name.like(f"{collection}:%")
+        ).scalar() or 0
+
+    def etag(self, db: Session, collection: str, resource_id: int, *variant) -> str:
+        """Strong ETag of one representation of a single resource"""
+        return self._tag(collection, resource_id, self.version(db, collection, resource_id), *variant)
+
+    def collection_etag(self, db: Session, collection: str, *variant) -> str:
+        """Strong ETag of one representation (e.g. one page) of a whole collection"""
+        return self._tag(collection, self.collection_version(db, collection), *variant)
+
+    @staticmethod
+    def _tag(*key) -> str:
+        return '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def matches(request: Request, etag: str) -> bool:
+        """If-None-Match check; the comparison is weak as RFC 9110 prescribes for it"""
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+    def not_modified(self, request: Request, etag: str) -> Optional[Response]:
+        """A 304 response if the client's copy is current, else None"""
+        if self.matches(request, etag):
+            return Response(status_code=304, headers=self.headers(etag))
+        return None
+
+    def headers(self, etag: str) -> dict:
+        return {"ETag": etag, "Cache-Control": self.cache_control}
+
+    def apply(self, response: Response, etag: str):
+        response.headers.update(self.headers(etag))
+
+
+# Singleton instance
+catalogue_cache = HttpCache(max_age=settings.CATALOGUE_CACHE_MAX_AGE)
@@ -0,0 +1,333 @@
+"""
+Background jobs
+Multi-second work (wearable imports, Strava syncs, backups) is recorded in
+the jobs table and worked off by background threads, so requests return a
+job id at once and clients poll GET /api/v1/jobs/{id}. Jobs are claimed with
+a conditional UPDATE, so several API processes can share the table, and
+failed attempts are retried with exponential backoff.
+"""
+
+import importlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# job_type -> "module:function", imported on first use. A handler is called as
+# handler(db, job, payload) and returns a JSON-serializable result.
+JOB_HANDLERS = {
+    "wearable_import": "wearable_import:run_file_job",
+    "wearable_archive_import": "wearable_import:run_archive_job",
+    "strava_sync": "strava_service:run_sync_job",
+    "backup": "backup_service:run_backup_job",
+    "timeline_trim": "timeline_service:run_trim_job",
+}
+
+UNFINISHED = ("queued", "running")
+FINISHED = ("succeeded", "failed")
+
+
+class JobFailed(Exception):
+    """Raise from a handler to fail a job without retrying it"""
+
+
+class JobQueue:
+    """Persisted job queue worked off by background threads, one database session per job"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+        self.backoff_seconds = settings.JOB_RETRY_BACKOFF_SECONDS
+        self.poll_seconds = settings.JOB_POLL_SECONDS
+        self.timeout = timedelta(minutes=settings.JOB_TIMEOUT_MINUTES)
+        self.recover_seconds = settings.JOB_RECOVER_MINUTES * 60
+        self.retention = timedelta(days=settings.JOB_RETENTION_DAYS)
+        self.upload_dir = settings.JOB_UPLOAD_DIR
+        self._handlers: Dict[str, Callable] = {}
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._next_recover = 0.0
+        self._periodic: Dict[str, List[float]] = {}  # job_type -> [interval seconds, next due]
+        self._lock = threading.Lock()
+        self._metrics = {"enqueued": 0, "succeeded": 0, "retried": 0, "failed": 0}
+
+    # ---------- Producers ----------
+
+    def enqueue(
+        self,
+        db: Session,
+        job_type: str,
+        payload: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        dedupe: bool = False
+    ) -> Job:
+        """
+        Record a job and wake a worker; commits the caller's transaction.
+        With dedupe, an unfinished job of the same type, owner and payload is returned instead.
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        if dedupe:
+            unfinished = db.query(Job).filter(
+                Job.job_type == job_type,
+                Job.user_id == user_id,
+                Job.status.in_(UNFINISHED)
+            ).order_by(Job.id).all()
+            for existing in unfinished:
+                if json.loads(existing.payload or "{}") == (payload or {}):
+                    return existing
+
+        job = Job(
+            job_type=job_type,
+            user_id=user_id,
+            status="queued",
+            payload=json.dumps(payload or {}),
+            max_attempts=max_attempts or self.max_attempts
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        with self._lock:
+            self._metrics["enqueued"] += 1
+        # Workers in other processes pick the job up on their next poll
+        self._wakeup.set()
+        return job
+
+    def schedule(self, job_type: str, interval_seconds: float):
+        """Enqueue job_type every interval_seconds while the workers run, skipping it if still unfinished"""
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        with self._lock:
+            self._periodic[job_type] = [interval_seconds, time.monotonic() + interval_seconds]
+
+    def save_upload(self, source: BinaryIO, suffix: str = "") -> str:
+        """
+        Copy an uploaded file to the job upload directory and return its path.
+        Put it in the payload as upload_path; it is deleted when the job finishes.
+        """
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.abspath(os.path.join(self.upload_dir, f"{uuid.uuid4().hex}{suffix}"))
+        with open(path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        return path
+
+    # ---------- Lifecycle ----------
+
+    def start(self):
+        """
+        Requeue jobs orphaned by a crashed process, purge old ones and start
+        the workers. Called at API startup; other processes only enqueue.
+        Workers keep requeueing timed-out jobs every JOB_RECOVER_MINUTES
+        and enqueue the jobs registered with schedule().
+        """
+        db = SessionLocal()
+        try:
+            self.recover(db)
+            self.purge(db)
+        finally:
+            db.close()
+        with self._lock:
+            self._next_recover = time.monotonic() + self.recover_seconds
+            self._start()
+        self._wakeup.set()
+
+    def stop(self):
+        """Let running jobs finish and stop the workers"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stopping = True
+        self._wakeup.set()
+        for thread in threads:
+            thread.join()
+        with self._lock:
+            self._stopping = False
+
+    def recover(self, db: Session) -> int:
+        """Requeue running jobs that started longer ago than the job timeout"""
+        count = db.query(Job).filter(
+            Job.status == "running",
+            Job.started_at < datetime.utcnow() - self.timeout
+        ).update({Job.status: "queued", Job.run_after: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        if count:
+            logger.warning(f"Requeued {count} interrupted jobs")
+        return count
+
+    def purge(self, db: Session) -> int:
+        """Delete finished jobs older than the retention period"""
+        count = db.query(Job).filter(
+            Job.status.in_(FINISHED),
+            Job.finished_at < datetime.utcnow() - self.retention
+        ).delete(synchronize_session=False)
+        db.commit()
+        return count
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "workers": len(self._threads)}
+
+    # ---------- Workers ----------
+
+    def run_next(self) -> bool:
+        """Claim and run one due job in the calling thread; returns False if none was due"""
+        db = SessionLocal()
+        try:
+            job = self._claim(db)
+            if job is None:
+                return False
+            self._run(db, job)
+            return True
+        finally:
+            db.close()
+
+    def _start(self):
+        """Start worker threads (caller holds the lock)"""
+        while len(self._threads) < self.workers and not self._stopping:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        while not self._stopping:
+            try:
+                self._housekeeping()
+                ran = self.run_next()
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+                ran = False
+            if not ran:
+                # Clear only after an empty poll: a set() from enqueue() between the
+                # poll and here makes wait() return at once and the loop polls again
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def _housekeeping(self):
+        """From one worker: run recover() every recover_seconds and enqueue due scheduled jobs"""
+        with self._lock:
+            now = time.monotonic()
+            recover_due = now >= self._next_recover
+            if recover_due:
+                self._next_recover = now + self.recover_seconds
+            scheduled = []
+            for job_type, timing in self._periodic.items():
+                if now >= timing[1]:
+                    timing[1] = now + timing[0]
+                    scheduled.append(job_type)
+        if not recover_due and not scheduled:
+            return
+
+        db = SessionLocal()
+        try:
+            if recover_due:
+                self.recover(db)
+            for job_type in scheduled:
+                self.enqueue(db, job_type, dedupe=True)
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> Optional[Job]:
+        """Take the oldest due job; the conditional update makes sure only one worker gets it"""
+        now = datetime.utcnow()
+        candidates = db.query(Job.id).filter(
+            Job.status == "queued",
+            Job.run_after <= now
+        ).order_by(Job.run_after, Job.id).limit(self.workers + 1).all()
+
+        for (job_id,) in candidates:
+            claimed = db.query(Job).filter(Job.id == job_id, Job.status == "queued").update({
+                Job.status: "running",
+                Job.started_at: now,
+                Job.attempts: Job.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return db.get(Job, job_id)
+        return None
+
+    def _run(self, db: Session, job: Job):
+        job_id, job_type, started_at = job.id, job.job_type, job.started_at
+        try:
+            payload = json.loads(job.payload) if job.payload else {}
+            result = self._handler(job_type)(db, job, payload)
+            job = self._reclaim(db, job_id, started_at)
+            if job is None:
+                return
+            job.status = "succeeded"
+            job.result = json.dumps(result, default=str)
+            job.error = None
+            outcome = "succeeded"
+        except Exception as e:
+            db.rollback()
+            job = self._reclaim(db, job_id, started_at)
+            if job is None:
+                return
+            job.error = str(e)[:2000]
+            if not isinstance(e, JobFailed) and job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.run_after = datetime.utcnow() + timedelta(seconds=self.backoff_seconds * 2 ** (job.attempts - 1))
+                outcome = "retried"
+            else:
+                job.status = "failed"
+                outcome = "failed"
+            logger.log(
+                logging.WARNING if outcome == "retried" else logging.ERROR,
+                f"Job {job_id} ({job_type}) attempt {job.attempts} failed: {e}"
+            )
+
+        if outcome != "retried":
+            job.finished_at = datetime.utcnow()
+        db.commit()
+
+        if outcome != "retried":
+            self._remove_upload(job)
+        with self._lock:
+            self._metrics[outcome] += 1
+
+    @staticmethod
+    def _reclaim(db: Session, job_id: int, started_at: datetime) -> Optional[Job]:
+        """The job row, or None if recover() requeued it while this attempt ran"""
+        job = db.query(Job).populate_existing().filter(Job.id == job_id).first()
+        if job is None or job.status != "running" or job.started_at != started_at:
+            logger.warning(f"Job {job_id} was requeued after timing out; discarding this attempt's outcome")
+            return None
+        return job
+
+    def _handler(self, job_type: str) -> Callable:
+        handler = self._handlers.get(job_type)
+        if handler is None:
+            if job_type not in JOB_HANDLERS:
+                raise JobFailed(f"Unknown job type: {job_type}")
+            module_name, function_name = JOB_HANDLERS[job_type].split(":")
+            handler = getattr(importlib.import_module(module_name), function_name)
+            self._handlers[job_type] = handler
+        return handler
+
+    @staticmethod
+    def _remove_upload(job: Job):
+        try:
+            path = json.loads(job.payload or "{}").get("upload_path")
+        except ValueError:
+            return
+        if path and os.path.exists(path):
+            os.remove(path)
+
+
+# Singleton instance
+job_queue = JobQueue(workers=settings.JOB_WORKERS)
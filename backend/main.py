@@ -16,8 +16,9 @@ except:
     pass
 
 from database import engine, Base, init_database
-from routers import hikes, auth, user_activity, social, messaging, wearable, strava
+from routers import hikes, auth, user_activity, social, messaging, wearable, strava, jobs
 from config import settings
+from http_encoding import CompressionMiddleware, FastJSONResponse
 from rate_limiter import limiter, rate_limit_handler
 from slowapi.errors import RateLimitExceeded
 
@@ -43,12 +44,21 @@ app = FastAPI(
     debug=settings.DEBUG,
     docs_url="/docs" if not settings.is_production else None,  # Hide docs in production
     redoc_url="/redoc" if not settings.is_production else None,
+    default_response_class=FastJSONResponse,
 )
 
 # Add rate limiting
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
+# Compress larger responses (brotli or gzip, as the client accepts)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -78,6 +88,7 @@ app.include_router(social.router, prefix="/api/v1/social", tags=["social"])
 app.include_router(messaging.router, tags=["messaging"])
 app.include_router(wearable.router, tags=["wearable"])
 app.include_router(strava.router, tags=["strava"])
+app.include_router(jobs.router, tags=["jobs"])
 
 # Mount static files for images
 try:
@@ -95,6 +106,15 @@ async def startup_event():
     logger.info(f"📧 Email: {'✅ Enabled' if settings.has_email else '❌ Disabled'}")
     logger.info(f"🔍 Sentry: {'✅ Enabled' if settings.has_sentry else '❌ Disabled'}")
     
+    # Start background job workers
+    try:
+        from job_queue import job_queue
+        job_queue.schedule("timeline_trim", settings.TIMELINE_TRIM_MINUTES * 60)
+        job_queue.start()
+        logger.info("⚙️ Background job workers started")
+    except Exception as e:
+        logger.warning(f"⚠️ Job workers not started: {e}")
+    
     # Start Strava auto-sync scheduler
     try:
         from strava_scheduler import start_scheduler
@@ -106,6 +126,30 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    try:
+        from realtime import message_hub
+        await message_hub.close()
+    except:
+        pass
+    
+    try:
+        from strava_webhooks import strava_event_queue
+        strava_event_queue.stop()
+    except:
+        pass
+    
+    try:
+        from job_queue import job_queue
+        job_queue.stop()
+    except:
+        pass
+    
+    try:
+        from wearable_import import wearable_import_service
+        wearable_import_service.shutdown()
+    except:
+        pass
+    
     try:
         from strava_scheduler import stop_scheduler
         stop_scheduler()
@@ -134,7 +178,10 @@ def health_check():
 
 @app.get("/api/status")
 def api_status():
-    """API status and feature flags"""
+    """API status, feature flags, background job, cache and password hashing counters"""
+    from auth import password_hasher, user_cache
+    from job_queue import job_queue
+    
     return {
         "status": "operational",
         "version": "2.0.0",
@@ -149,6 +196,9 @@ def api_status():
             "achievements": settings.ENABLE_ACHIEVEMENTS,
         },
         "database": "PostgreSQL" if settings.use_postgresql else "SQLite",
+        "jobs": job_queue.metrics(),
+        "auth_user_cache": user_cache.metrics(),
+        "password_hashing": password_hasher.metrics(),
     }
 
 if __name__ == "__main__":
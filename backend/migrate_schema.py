@@ -0,0 +1,316 @@
+"""
+Schema migration script for existing Kilele databases
+Creates new tables, adds missing columns and builds missing indexes
+Run with: python migrate_schema.py
+"""
+from sqlalchemy import LargeBinary
+
+from database import engine, Base, init_database
+# Import all models to ensure every table and index is registered
+import models
+from models import strava
+from utils.schema_migration import add_missing_columns, create_missing_indexes
+
+# Columns added to tables that may already exist: (table, column, DDL or SQLAlchemy type)
+NEW_COLUMNS = [
+    ("hike_sessions", "elevation_gain_m", "FLOAT"),
+    ("hike_sessions", "route_data", "TEXT"),
+    ("hike_sessions", "route_blob", LargeBinary()),
+    ("hike_sessions", "route_point_count", "INTEGER"),
+    ("hike_sessions", "content_hash", "VARCHAR(64)"),
+    ("hike_sessions", "route_signature", "VARCHAR(32)"),
+    ("hikes", "review_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_sum", "FLOAT NOT NULL DEFAULT 0"),
+    ("hikes", "avg_rating", "FLOAT"),
+    ("hikes", "rating_1_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_2_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_3_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_4_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_5_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "geohash", "VARCHAR(12)"),
+    ("hikes", "route_polyline", "TEXT"),
+    ("strava_tokens", "last_social_refresh", "TIMESTAMP"),
+    ("strava_activities", "route_signature", "VARCHAR(32)"),
+    ("conversation_participants", "last_read_message_id", "INTEGER"),
+    ("users", "is_admin", "BOOLEAN DEFAULT FALSE"),
+]
+
+
+def backfill_timelines():
+    """Build home timelines for existing users if none have been written yet"""
+    from database import SessionLocal
+    from models.timeline import TimelineEntry
+    from models.user import User
+    from timeline_service import timeline_service
+
+    db = SessionLocal()
+    try:
+        if db.query(TimelineEntry.id).first():
+            print("  ℹ️  Timelines already populated")
+            return
+
+        user_ids = [row[0] for row in db.query(User.id).all()]
+        for user_id in user_ids:
+            timeline_service.rebuild(db, user_id)
+        db.commit()
+        print(f"  ✅ Built timelines for {len(user_ids)} users")
+    finally:
+        db.close()
+
+
+def backfill_user_stats():
+    """Build the statistics rollup for existing users if it is empty"""
+    from database import SessionLocal
+    from models.user_stats import UserStats
+    from stats_service import stats_service
+
+    db = SessionLocal()
+    try:
+        if db.query(UserStats.user_id).first():
+            print("  ℹ️  User statistics already populated")
+            return
+
+        count = stats_service.rebuild_all(db)
+        db.commit()
+        print(f"  ✅ Built statistics for {count} users")
+    finally:
+        db.close()
+
+
+def backfill_read_markers():
+    """Derive message read markers from the older timestamp markers"""
+    from sqlalchemy import func, select
+    from database import SessionLocal
+    from models.message import ConversationParticipant, Message
+
+    db = SessionLocal()
+    try:
+        newest_read = select(func.max(Message.id)).where(
+            Message.conversation_id == ConversationParticipant.conversation_id,
+            Message.created_at <= ConversationParticipant.last_read_at
+        ).scalar_subquery()
+        count = db.query(ConversationParticipant).filter(
+            ConversationParticipant.last_read_message_id.is_(None),
+            ConversationParticipant.last_read_at.isnot(None)
+        ).update({ConversationParticipant.last_read_message_id: newest_read}, synchronize_session=False)
+        db.commit()
+        print(f"  ✅ Read markers set for {count} conversation participants")
+    finally:
+        db.close()
+
+
+def backfill_hike_ratings():
+    """Compute rating aggregates for hikes that have reviews but no counts yet"""
+    from database import SessionLocal
+    from rating_service import rating_service
+
+    db = SessionLocal()
+    try:
+        count = rating_service.rebuild(db, only_missing=True)
+        db.commit()
+        print(f"  ✅ Rating aggregates computed for {count} hikes")
+    finally:
+        db.close()
+
+
+def backfill_geohashes():
+    """Compute geohashes for hikes that have coordinates but no geohash"""
+    from database import SessionLocal
+    from models.hike import Hike
+    from utils.geo import geohash_encode
+
+    db = SessionLocal()
+    try:
+        hikes = db.query(Hike).filter(
+            Hike.geohash.is_(None),
+            Hike.latitude.isnot(None),
+            Hike.longitude.isnot(None)
+        ).all()
+        for hike in hikes:
+            hike.geohash = geohash_encode(hike.latitude, hike.longitude)
+        db.commit()
+        print(f"  ✅ Geohashes computed for {len(hikes)} hikes")
+    finally:
+        db.close()
+
+
+def backfill_cache_versions():
+    """Create the per-hike cache version counters, so concurrent first writes don't race to insert them"""
+    from sqlalchemy import String, cast, literal, select
+    from database import SessionLocal
+    from models.cache_version import CacheVersion
+    from models.hike import Hike
+
+    db = SessionLocal()
+    try:
+        name = literal("hikes:").concat(cast(Hike.id, String))
+        missing = select(name, literal(0)).where(
+            ~select(CacheVersion.name).where(CacheVersion.name == name).exists()
+        )
+        count = db.execute(CacheVersion.__table__.insert().from_select(["name", "version"], missing)).rowcount
+        db.commit()
+        print(f"  ✅ Cache versions created for {count} hikes")
+    finally:
+        db.close()
+
+
+def convert_session_routes(batch_size: int = 100):
+    """Re-encode legacy JSON session routes in the compact binary format"""
+    import json
+    from sqlalchemy.orm import undefer
+    from database import SessionLocal
+    from models.hike_session import HikeSession
+    from route_service import route_service
+    from utils.track_metrics import track_arrays
+
+    db = SessionLocal()
+    try:
+        converted = failed = 0
+        last_id = 0
+        while True:
+            # Walk by id so converted rows drop out of the filter without shifting pages
+            sessions = db.query(HikeSession).options(undefer(HikeSession.route_data)).filter(
+                HikeSession.id > last_id,
+                HikeSession.route_data.isnot(None),
+                HikeSession.route_blob.is_(None)
+            ).order_by(HikeSession.id).limit(batch_size).all()
+            if not sessions:
+                break
+
+            for session in sessions:
+                last_id = session.id
+                try:
+                    route_service.store(session, track_arrays(json.loads(session.route_data)))
+                except (TypeError, ValueError, KeyError) as e:
+                    failed += 1
+                    print(f"  ⚠️  Session {session.id}: route not converted ({e})")
+                    continue
+                converted += 1
+            db.commit()
+            db.expunge_all()
+
+        print(f"  ✅ Converted {converted} session routes" + (f", {failed} left as JSON" if failed else ""))
+    finally:
+        db.close()
+
+
+def backfill_route_levels(batch_size: int = 100):
+    """Build simplified map levels for stored routes that have none"""
+    from database import SessionLocal
+    from models.hike_session import HikeSession
+    from route_service import route_service
+
+    db = SessionLocal()
+    try:
+        built = 0
+        last_id = 0
+        while True:
+            sessions = db.query(HikeSession).filter(
+                HikeSession.id > last_id,
+                HikeSession.route_blob.isnot(None),
+                ~HikeSession.route_levels.any()
+            ).order_by(HikeSession.id).limit(batch_size).all()
+            if not sessions:
+                break
+
+            for session in sessions:
+                last_id = session.id
+                if route_service.rebuild_levels(db, session):
+                    built += 1
+            db.commit()
+            db.expunge_all()
+
+        print(f"  ✅ Route levels built for {built} sessions")
+    finally:
+        db.close()
+
+
+def backfill_route_signatures(batch_size: int = 500):
+    """Fingerprint stored sessions and Strava activities for duplicate detection on import"""
+    import json
+    import numpy as np
+    from sqlalchemy.orm import undefer
+    from database import SessionLocal
+    from models.hike_session import HikeSession
+    from models.strava import StravaActivity
+    from utils.fingerprint import route_signature
+    from utils.route_codec import decode_arrays
+
+    db = SessionLocal()
+    try:
+        sessions = activities = 0
+        last_id = 0
+        while True:
+            batch = db.query(HikeSession).options(undefer(HikeSession.route_blob)).filter(
+                HikeSession.id > last_id,
+                HikeSession.route_blob.isnot(None),
+                HikeSession.route_signature.is_(None)
+            ).order_by(HikeSession.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for session in batch:
+                last_id = session.id
+                route = decode_arrays(session.route_blob)
+                start_time = session.started_at
+                if route.time is not None and not np.isnan(route.time).all():
+                    start_time = float(route.time[~np.isnan(route.time)][0])
+                session.route_signature = route_signature(start_time, float(route.latitude[0]), float(route.longitude[0]))
+                sessions += session.route_signature is not None
+            db.commit()
+            db.expunge_all()
+
+        last_id = 0
+        while True:
+            batch = db.query(StravaActivity).filter(
+                StravaActivity.id > last_id,
+                StravaActivity.route_signature.is_(None),
+                StravaActivity.start_date.isnot(None),
+                StravaActivity.start_latlng.isnot(None)
+            ).order_by(StravaActivity.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for activity in batch:
+                last_id = activity.id
+                try:
+                    latitude, longitude = json.loads(activity.start_latlng)
+                except (TypeError, ValueError):
+                    continue
+                activity.route_signature = route_signature(activity.start_date, latitude, longitude)
+                activities += activity.route_signature is not None
+            db.commit()
+            db.expunge_all()
+
+        print(f"  ✅ Route signatures computed for {sessions} sessions and {activities} Strava activities")
+    finally:
+        db.close()
+
+
+def migrate():
+    """Bring an existing database up to the current models"""
+    print("Creating new tables...")
+    init_database()
+
+    print("Adding new columns...")
+    add_missing_columns(engine, NEW_COLUMNS)
+
+    print("Creating indexes...")
+    create_missing_indexes(engine, Base.metadata)
+
+    print("Backfilling data...")
+    backfill_timelines()
+    backfill_user_stats()
+    backfill_read_markers()
+    backfill_hike_ratings()
+    backfill_geohashes()
+    backfill_cache_versions()
+    convert_session_routes()
+    backfill_route_levels()
+    backfill_route_signatures()
+
+    print("\n✅ Migration complete!")
+
+
+if __name__ == "__main__":
+    migrate()
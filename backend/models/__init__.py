@@ -1,18 +1,23 @@
 from models.hike import Hike
 from models.user import User
-from models.hike_session import HikeSession, SavedHike
+from models.hike_session import HikeSession, SessionRouteLevel, SavedHike
 from models.review import Review, ReviewPhoto, ReviewHelpful
 from models.bookmark import Bookmark
 from models.follow import Follow
 from models.achievement import Achievement, UserAchievement
 from models.activity import Activity
+from models.timeline import TimelineEntry
+from models.user_stats import UserStats
 from models.message import Message, Conversation, ConversationParticipant
 from models.equipment import Equipment, PlannedHike
+from models.job import Job
+from models.cache_version import CacheVersion
 
 __all__ = [
     "Hike",
     "User",
     "HikeSession",
+    "SessionRouteLevel",
     "SavedHike",
     "Review",
     "ReviewPhoto",
@@ -22,9 +27,13 @@ __all__ = [
     "Achievement",
     "UserAchievement",
     "Activity",
+    "TimelineEntry",
+    "UserStats",
     "Message",
     "Conversation",
     "ConversationParticipant",
     "Equipment",
     "PlannedHike",
+    "Job",
+    "CacheVersion",
 ]
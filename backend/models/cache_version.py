@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String
+from database import Base
+
+
+class CacheVersion(Base):
+    """Version counter of a cached resource, bumped in the transaction of every write to it"""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)  # <collection>:<id>, e.g. hikes:42
+    version = Column(Integer, default=0, nullable=False)
+
+
+def version_name(collection: str, resource_id: int) -> str:
+    return f"{collection}:{resource_id}"
+
+
+def bump_version(connection, name: str):
+    """Increment a version counter on the writer's connection"""
+    table = CacheVersion.__table__
+    updated = connection.execute(
+        table.update().where(table.c.name == name).values(version=table.c.version + 1)
+    )
+    if not updated.rowcount:
+        connection.execute(table.insert().values(name=name, version=1))
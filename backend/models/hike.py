@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, event, select
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session as OrmSession
 from database import Base
+from models.cache_version import bump_version, version_name
+from utils.geo import geohash_encode
 
 class Hike(Base):
     __tablename__ = "hikes"
@@ -18,7 +20,20 @@ class Hike(Base):
     best_season = Column(String(200))  # e.g., "June-September, December-February"
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String(12), index=True)  # Derived from latitude/longitude for nearby search
+    route_polyline = Column(Text)  # Trail geometry, Google encoded polyline
     image_url = Column(String(500))
+    
+    # Rating aggregates, maintained by rating_service as reviews are added and removed
+    review_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Float, default=0.0, nullable=False)
+    avg_rating = Column(Float, nullable=True, index=True)
+    rating_1_count = Column(Integer, default=0, nullable=False)
+    rating_2_count = Column(Integer, default=0, nullable=False)
+    rating_3_count = Column(Integer, default=0, nullable=False)
+    rating_4_count = Column(Integer, default=0, nullable=False)
+    rating_5_count = Column(Integer, default=0, nullable=False)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -27,6 +42,11 @@ class Hike(Base):
     bookmarks = relationship("Bookmark", back_populates="hike")
     equipment = relationship("Equipment", back_populates="hike")
 
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating"""
+        return {stars: getattr(self, f"rating_{stars}_count") or 0 for stars in range(1, 6)}
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -42,6 +62,40 @@ class Hike(Base):
             "latitude": self.latitude,
             "longitude": self.longitude,
             "image_url": self.image_url,
+            "route_polyline": self.route_polyline,
+            "avg_rating": self.avg_rating,
+            "review_count": self.review_count,
+            "rating_histogram": self.rating_histogram,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+@event.listens_for(Hike, "before_insert")
+@event.listens_for(Hike, "before_update")
+def _set_geohash(mapper, connection, hike):
+    """Keep the geohash column in step with the coordinates"""
+    if hike.latitude is not None and hike.longitude is not None:
+        hike.geohash = geohash_encode(hike.latitude, hike.longitude)
+    else:
+        hike.geohash = None
+
+
+@event.listens_for(Hike, "after_insert")
+@event.listens_for(Hike, "after_update")
+@event.listens_for(Hike, "after_delete")
+def _hike_changed(mapper, connection, hike):
+    """Invalidate cached responses of this hike and of the catalogue (see http_cache.py)"""
+    bump_version(connection, version_name("hikes", hike.id))
+
+
+@event.listens_for(OrmSession, "do_orm_execute")
+def _hikes_bulk_changed(state):
+    """Same for bulk updates and deletes, e.g. rating aggregates, bumping only the hikes they touch"""
+    if (state.is_update or state.is_delete) and state.bind_mapper is Hike.__mapper__:
+        connection = state.session.connection()
+        touched = select(Hike.id)
+        if state.statement.whereclause is not None:
+            touched = touched.where(state.statement.whereclause)
+        for hike_id in connection.execute(touched).scalars().all():
+            bump_version(connection, version_name("hikes", hike_id))
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from database import Base
 
 class HikeSession(Base):
     """Track active and completed hikes by users"""
     __tablename__ = "hike_sessions"
+    __table_args__ = (
+        # Duplicate checks on import (see utils/fingerprint.py)
+        Index("ix_hike_sessions_user_content_hash", "user_id", "content_hash"),
+        Index("ix_hike_sessions_user_route_signature", "user_id", "route_signature"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -21,11 +26,28 @@ class HikeSession(Base):
     current_longitude = Column(Float, nullable=True)
     distance_covered_km = Column(Float, default=0.0)
     duration_minutes = Column(Integer, default=0)
+    elevation_gain_m = Column(Float, nullable=True)
+    
+    # Recorded route, loaded only when asked for (see route_service.py)
+    route_blob = deferred(Column(LargeBinary, nullable=True))
+    route_point_count = Column(Integer, nullable=True)
+    # Legacy JSON route, converted to route_blob by migrate_schema.py
+    route_data = deferred(Column(Text, nullable=True))
+    
+    # Import fingerprints: SHA-256 of the uploaded file and the recording's route signature
+    content_hash = Column(String(64), nullable=True)
+    route_signature = Column(String(32), nullable=True)
     
     # Notes and rating
     notes = Column(String(500), nullable=True)
     rating = Column(Integer, nullable=True)  # 1-5 stars
     
+    # Simplified copies of the route for map rendering, coarsest last
+    route_levels = relationship(
+        "SessionRouteLevel", back_populates="session", order_by="SessionRouteLevel.tolerance_m",
+        cascade="all, delete-orphan"
+    )
+    
     # Relationship to Strava activity
     strava_activity = relationship("StravaActivity", back_populates="hike_session", uselist=False)
     
@@ -41,11 +63,28 @@ class HikeSession(Base):
             "current_longitude": self.current_longitude,
             "distance_covered_km": self.distance_covered_km,
             "duration_minutes": self.duration_minutes,
+            "elevation_gain_m": self.elevation_gain_m,
             "notes": self.notes,
             "rating": self.rating
         }
 
 
+class SessionRouteLevel(Base):
+    """A session route simplified with Douglas-Peucker at one tolerance"""
+    __tablename__ = "session_route_levels"
+    __table_args__ = (
+        UniqueConstraint("session_id", "tolerance_m", name="uq_session_route_level"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("hike_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    tolerance_m = Column(Float, nullable=False)
+    point_count = Column(Integer, nullable=False)
+    route_blob = Column(LargeBinary, nullable=False)  # utils/route_codec.py format
+    
+    session = relationship("HikeSession", back_populates="route_levels")
+
+
 class SavedHike(Base):
     """User's saved/favorite hikes"""
     __tablename__ = "saved_hikes"
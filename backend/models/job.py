@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
+from datetime import datetime
+from database import Base
+
+class Job(Base):
+    """Background job, worked off by job_queue.py"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the oldest due job of a status with one index range scan
+        Index("ix_jobs_status_run_after", "status", "run_after", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(50), nullable=False)  # Handler name, e.g. wearable_import
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)  # Owner, None for system jobs
+
+    # queued -> running -> succeeded / failed (running -> queued again on a retry)
+    status = Column(String(20), nullable=False, default="queued")
+    payload = Column(Text, nullable=True)  # JSON handler arguments
+    result = Column(Text, nullable=True)  # JSON handler result
+    error = Column(Text, nullable=True)  # Last failure
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+
+    # Naive UTC times
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)  # Not picked up before this (retry backoff)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -18,11 +18,16 @@ class Conversation(Base):
 class ConversationParticipant(Base):
     """Model for users participating in a conversation"""
     __tablename__ = "conversation_participants"
+    __table_args__ = (
+        Index("ix_conversation_participants_user_conversation", "user_id", "conversation_id"),
+        Index("ix_conversation_participants_conversation_id", "conversation_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     last_read_at = Column(DateTime(timezone=True))
+    last_read_message_id = Column(Integer)  # Newest message read; ids order messages exactly, timestamps may tie
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -32,12 +37,16 @@ class ConversationParticipant(Base):
 class Message(Base):
     """Model for individual messages in conversations"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # Latest-message lookups and history windows per conversation
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
-    is_read = Column(Boolean, default=False)
+    is_read = Column(Boolean, default=False)  # Deprecated: read state comes from ConversationParticipant.last_read_message_id
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
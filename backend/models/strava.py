@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -16,6 +16,7 @@ class StravaToken(Base):
     scope = Column(String(500))  # Permissions granted
     connected_at = Column(DateTime, default=datetime.utcnow)
     last_synced = Column(DateTime)  # Last successful sync
+    last_social_refresh = Column(DateTime)  # Last re-fetch of older activities' kudos/comments
     sync_enabled = Column(Boolean, default=True)  # Auto-sync toggle
     
     # Relationship
@@ -26,6 +27,10 @@ class StravaToken(Base):
 class StravaActivity(Base):
     """Store synced Strava activities"""
     __tablename__ = "strava_activities"
+    __table_args__ = (
+        # Links file imports of the same recording (see utils/fingerprint.py)
+        Index("ix_strava_activities_user_route_signature", "user_id", "route_signature"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     token_id = Column(Integer, ForeignKey("strava_tokens.id"))
@@ -47,6 +52,7 @@ class StravaActivity(Base):
     start_latlng = Column(String(100))  # "[lat, lng]"
     end_latlng = Column(String(100))
     map_summary_polyline = Column(Text)  # Encoded polyline
+    route_signature = Column(String(32))  # Start minute and start cell
     
     # Stats
     average_speed = Column(Float)  # m/s
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from database import Base
+
+class TimelineEntry(Base):
+    """Precomputed home timeline row: one per (reader, activity)"""
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        # Reading a timeline is a single range scan on (user_id, created_at, id)
+        Index("ix_timeline_entries_user_created_activity", "user_id", "created_at", "activity_id"),
+        UniqueConstraint("user_id", "activity_id", name="uq_timeline_entries_user_activity"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Timeline owner
+    activity_id = Column(Integer, ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)  # Activity author
+    created_at = Column(DateTime(timezone=True), nullable=False)  # Copied from the activity
+    
+    # Relationships
+    activity = relationship("Activity")
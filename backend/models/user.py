@@ -12,6 +12,7 @@ class User(Base):
     full_name = Column(String(100))
     hashed_password = Column(String(200), nullable=False)
     is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False)
     profile_picture = Column(String(255), nullable=True)  # Path to profile picture
     two_fa_enabled = Column(Boolean, default=False)
     two_fa_secret = Column(String(32), nullable=True)  # Secret for 2FA
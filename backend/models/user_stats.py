@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from database import Base
+
+class UserStats(Base):
+    """Per-user statistics rollup, maintained incrementally on writes"""
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    
+    # Completed hikes
+    total_hikes = Column(Integer, default=0, nullable=False)
+    total_distance_km = Column(Float, default=0.0, nullable=False)
+    total_elevation_m = Column(Float, default=0.0, nullable=False)
+    total_duration_hours = Column(Float, default=0.0, nullable=False)
+    
+    # Reviews (average rating = rating_sum / total_reviews)
+    total_reviews = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Float, default=0.0, nullable=False)
+    
+    # Achievements and social
+    achievements_earned = Column(Integer, default=0, nullable=False)
+    followers_count = Column(Integer, default=0, nullable=False)
+    following_count = Column(Integer, default=0, nullable=False)
+    bookmarks_count = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def average_rating_given(self) -> float:
+        return self.rating_sum / self.total_reviews if self.total_reviews else 0.0
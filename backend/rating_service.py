@@ -0,0 +1,10 @@
+"""
+Denormalized rating aggregates on hikes, see utils/ratings.py
+"""
+
+from models.hike import Hike
+from models.review import Review
+from utils.ratings import RatingService
+
+# Singleton instance
+rating_service = RatingService(Hike, Review)
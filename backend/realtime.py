@@ -0,0 +1,141 @@
+"""
+Real-time delivery of messaging events over WebSockets
+An asyncio hub tracks connected sockets per user and relays events through a
+pluggable broadcast backend, so several workers can share one event stream
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Set
+
+from fastapi import WebSocket
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Listener = Callable[[dict], Awaitable[None]]
+
+
+class BroadcastBackend(ABC):
+    """Transport that fans published events out to every subscribed hub"""
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: dict):
+        """Deliver payload to every listener subscribed to channel"""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, listener: Listener):
+        """Call listener with each payload published to channel"""
+
+    @abstractmethod
+    async def unsubscribe(self, channel: str, listener: Listener):
+        """Stop calling listener for channel"""
+
+
+class MemoryBackend(BroadcastBackend):
+    """
+    In-process stand-in for a shared broker such as Redis pub/sub.
+    Every hub subscribed in this process receives every event; payloads are
+    round-tripped through JSON so they behave like they would on the wire.
+    """
+
+    def __init__(self):
+        self._listeners: Dict[str, List[Listener]] = {}
+
+    async def publish(self, channel: str, payload: dict):
+        data = json.dumps(payload)
+        for listener in list(self._listeners.get(channel, [])):
+            try:
+                await listener(json.loads(data))
+            except Exception as e:
+                logger.error(f"Realtime listener failed on '{channel}': {e}")
+
+    async def subscribe(self, channel: str, listener: Listener):
+        self._listeners.setdefault(channel, []).append(listener)
+
+    async def unsubscribe(self, channel: str, listener: Listener):
+        if listener in self._listeners.get(channel, []):
+            self._listeners[channel].remove(listener)
+
+
+# Available broadcast backends, selected with the REALTIME_BACKEND setting
+BACKENDS: Dict[str, Callable[[], BroadcastBackend]] = {
+    "memory": MemoryBackend,
+}
+
+_shared_backends: Dict[str, BroadcastBackend] = {}
+
+
+def get_backend(name: str) -> BroadcastBackend:
+    """Return the process-wide backend instance registered under `name`"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown realtime backend: {name}. Available: {', '.join(BACKENDS)}")
+    if name not in _shared_backends:
+        _shared_backends[name] = BACKENDS[name]()
+    return _shared_backends[name]
+
+
+class MessageHub:
+    """Track WebSocket connections per user and push events to them"""
+
+    CHANNEL = "messages"
+
+    def __init__(self, backend: BroadcastBackend):
+        self.backend = backend
+        self._connections: Dict[int, Set[WebSocket]] = {}
+        self._subscribed = False
+        self._lock = asyncio.Lock()
+
+    async def connect(self, user_id: int, websocket: WebSocket):
+        """Accept a socket and start routing the user's events to it"""
+        await websocket.accept()
+        async with self._lock:
+            if not self._subscribed:
+                await self.backend.subscribe(self.CHANNEL, self._deliver)
+                self._subscribed = True
+            self._connections.setdefault(user_id, set()).add(websocket)
+
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        """Stop routing events to a socket"""
+        sockets = self._connections.get(user_id)
+        if sockets:
+            sockets.discard(websocket)
+            if not sockets:
+                del self._connections[user_id]
+
+    async def publish(self, user_ids: List[int], event: dict):
+        """Send an event to every connected socket of the given users, on any worker"""
+        await self.backend.publish(self.CHANNEL, {"user_ids": list(user_ids), "event": event})
+
+    async def close(self):
+        """Close all sockets and detach from the backend"""
+        for user_id, sockets in list(self._connections.items()):
+            for websocket in list(sockets):
+                try:
+                    await websocket.close()
+                except Exception:
+                    pass
+        self._connections.clear()
+        if self._subscribed:
+            await self.backend.unsubscribe(self.CHANNEL, self._deliver)
+            self._subscribed = False
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(sockets) for sockets in self._connections.values())
+
+    async def _deliver(self, payload: dict):
+        """Push an event from the backend to this hub's local sockets"""
+        for user_id in payload.get("user_ids", []):
+            for websocket in list(self._connections.get(user_id, ())):
+                try:
+                    await websocket.send_json(payload["event"])
+                except Exception:
+                    self.disconnect(user_id, websocket)
+
+
+# Global instance
+message_hub = MessageHub(get_backend(settings.REALTIME_BACKEND))
@@ -0,0 +1,148 @@
+"""
+Recorded route storage and multi-resolution serving
+Session routes are stored once at full resolution and again as a few
+Douglas-Peucker levels, so maps can be served a few hundred points at the
+detail their zoom level can actually show.
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, undefer
+
+from config import settings
+from models.hike import Hike
+from models.hike_session import HikeSession, SessionRouteLevel
+from utils.route_codec import RouteArrays, decode_arrays, encode_arrays, take, to_points
+from utils.route_simplify import douglas_peucker_ranks, project_metres, simplify_indices, zoom_tolerance
+
+
+class EncodedRoute(NamedTuple):
+    """A route ready to store: the full blob and (tolerance_m, point_count, blob) per level"""
+    blob: Optional[bytes]
+    point_count: int
+    levels: List[Tuple[float, int, bytes]]
+
+
+class RouteService:
+    """Store session routes and serve them at a requested level of detail"""
+
+    def __init__(self):
+        self.tolerances = sorted(settings.ROUTE_LEVEL_TOLERANCES_M)
+        self.zoom_pixels = settings.ROUTE_ZOOM_PIXEL_TOLERANCE
+
+    def store(self, session: HikeSession, track: RouteArrays):
+        """Set a session's route and rebuild its simplified levels"""
+        self.store_encoded(session, self.encode(track))
+
+    def encode(self, track: RouteArrays) -> EncodedRoute:
+        """
+        Encode a route and its levels without touching the database, so the
+        work can be done away from the request (e.g. in an import worker).
+        """
+        if not len(track.latitude):
+            return EncodedRoute(None, 0, [])
+        blob = encode_arrays(track)
+        # Levels are built from the stored (fixed-point) coordinates
+        return EncodedRoute(blob, len(track.latitude), self.encode_levels(decode_arrays(blob)))
+
+    @staticmethod
+    def store_encoded(session: HikeSession, route: EncodedRoute):
+        """Set a session's route from encode()"""
+        session.route_blob = route.blob
+        session.route_point_count = route.point_count
+        if route.blob:
+            session.route_data = None
+        session.route_levels = [
+            SessionRouteLevel(tolerance_m=tolerance, point_count=count, route_blob=blob)
+            for tolerance, count, blob in route.levels
+        ]
+
+    def build_levels(self, arrays: RouteArrays) -> List[SessionRouteLevel]:
+        """Simplified copies of a route as SessionRouteLevel rows, finest first"""
+        return [
+            SessionRouteLevel(tolerance_m=tolerance, point_count=count, route_blob=blob)
+            for tolerance, count, blob in self.encode_levels(arrays)
+        ]
+
+    def encode_levels(self, arrays: RouteArrays) -> List[Tuple[float, int, bytes]]:
+        """
+        Simplified copies of a route, finest first. A level is only kept if
+        it drops points compared with the next finer one.
+        """
+        if not self.tolerances:
+            return []
+
+        ranks = douglas_peucker_ranks(
+            project_metres(arrays.latitude, arrays.longitude),
+            min_tolerance=self.tolerances[0]
+        )
+
+        levels = []
+        previous_count = len(arrays.latitude)
+        for tolerance in self.tolerances:
+            indices = simplify_indices(ranks, tolerance)
+            if len(indices) >= previous_count:
+                continue
+            levels.append((tolerance, len(indices), encode_arrays(take(arrays, indices))))
+            previous_count = len(indices)
+        return levels
+
+    def tolerance_for_zoom(self, db: Session, session: HikeSession, zoom: float) -> float:
+        """Simplification tolerance that is invisible at a web map zoom level"""
+        latitude = db.query(Hike.latitude).filter(Hike.id == session.hike_id).scalar()
+        return zoom_tolerance(zoom, latitude, self.zoom_pixels)
+
+    def route(
+        self,
+        db: Session,
+        session: HikeSession,
+        tolerance_m: Optional[float] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Route points at the coarsest stored level within tolerance_m metres of
+        the recording, and the tolerance actually used (0 for full resolution).
+        Only the chosen level is loaded and decoded.
+        """
+        if tolerance_m:
+            level = db.query(SessionRouteLevel).filter(
+                SessionRouteLevel.session_id == session.id,
+                SessionRouteLevel.tolerance_m <= tolerance_m
+            ).order_by(SessionRouteLevel.tolerance_m.desc()).first()
+            if level:
+                return to_points(decode_arrays(level.route_blob)), level.tolerance_m
+
+        full = self._load(db, session)
+        if full.route_blob:
+            return to_points(decode_arrays(full.route_blob)), 0.0
+        if not full.route_data:
+            return [], 0.0
+
+        # Legacy JSON routes have no stored levels; simplify on the fly
+        points = json.loads(full.route_data)
+        if tolerance_m and len(points) > 2:
+            latitude = np.array([p["latitude"] for p in points], dtype=np.float64)
+            longitude = np.array([p["longitude"] for p in points], dtype=np.float64)
+            ranks = douglas_peucker_ranks(project_metres(latitude, longitude), min_tolerance=tolerance_m)
+            points = [points[i] for i in simplify_indices(ranks, tolerance_m)]
+            return points, tolerance_m
+        return points, 0.0
+
+    def rebuild_levels(self, db: Session, session: HikeSession) -> int:
+        """Recompute stored levels from the full-resolution route, returns the level count"""
+        full = self._load(db, session)
+        session.route_levels = self.build_levels(decode_arrays(full.route_blob)) if full.route_blob else []
+        return len(session.route_levels)
+
+    @staticmethod
+    def _load(db: Session, session: HikeSession) -> HikeSession:
+        """The session with its deferred route columns loaded in one query"""
+        return db.query(HikeSession).options(
+            undefer(HikeSession.route_blob),
+            undefer(HikeSession.route_data)
+        ).filter(HikeSession.id == session.id).populate_existing().one()
+
+
+# Singleton instance
+route_service = RouteService()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import Optional
 import pyotp
 import qrcode
 import io
@@ -16,13 +18,30 @@ from schemas.two_fa import (
     TwoFASetupRequest, TwoFASetupResponse, TwoFAVerifyRequest,
     TwoFALoginRequest, TwoFADisableRequest
 )
-from auth import get_password_hash, verify_password, create_access_token, get_current_active_user
+from auth import create_access_token, get_current_active_user, password_hasher
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse, status_code=201)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
+def _load_user(db: Session, username: str) -> Optional[User]:
+    """
+    Load a user for a sign-in and end the read transaction, so no pooled
+    connection is held while the password is checked
+    """
+    db_user = db.query(User).filter(User.username == username).first()
+    if db_user is not None:
+        db.expunge(db_user)
+    db.rollback()
+    return db_user
+
+def _record_login(db: Session, db_user: User) -> User:
+    """Save the login time (and any rehashed password) of a user from _load_user"""
+    db.add(db_user)
+    db_user.last_login = datetime.utcnow()
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+def _check_registration(db: Session, user: UserCreate):
     try:
         # Check if username exists
         if db.query(User).filter(User.username == user.username).first():
@@ -37,45 +56,60 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
                 status_code=400,
                 detail="Email already registered"
             )
-        
-        # Create new user
-        db_user = User(
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            hashed_password=get_password_hash(user.password)
-        )
-        
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        
-        return db_user
+    finally:
+        db.rollback()
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+    db_user = User(
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        hashed_password=hashed_password
+    )
+    
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+@router.post("/register", response_model=UserResponse, status_code=201)
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    """
+    Register a new user. Database work runs in the thread pool and the
+    password is hashed on the bcrypt executor, so the event loop never blocks.
+    """
+    try:
+        await run_in_threadpool(_check_registration, db, user)
+        hashed_password = await password_hasher.hash(user.password)
+        return await run_in_threadpool(_create_user, db, user, hashed_password)
     except HTTPException:
         raise
     except Exception as e:
         print(f"REGISTRATION ERROR: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 @router.post("/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    """Login user and return access token"""
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    """Login user and return access token (the password is checked on the bcrypt executor)"""
     # Find user
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await run_in_threadpool(_load_user, db, user.username)
     
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await password_hasher.verify(user.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade hashes made at another bcrypt cost
+    if password_hasher.needs_rehash(db_user.hashed_password):
+        await password_hasher.rehash(db_user, user.password)
+    
     # Update last login
-    db_user.last_login = datetime.utcnow()
-    db.commit()
+    db_user = await run_in_threadpool(_record_login, db, db_user)
     
     # Create access token
     access_token = create_access_token(
@@ -142,23 +176,18 @@ async def upload_profile_picture(
         "profile_picture": current_user.profile_picture
     }
 
-@router.post("/2fa/setup", response_model=TwoFASetupResponse)
-def setup_two_fa(
-    request: TwoFASetupRequest,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
-):
-    """Setup 2FA for user account"""
-    # Verify password
-    if not verify_password(request.password, current_user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect password")
-    
+def _password_hash(db: Session, user: User) -> str:
+    """The stored hash of the current user; not kept in the user cache, so loaded here"""
+    return user.hashed_password
+
+def _start_two_fa_setup(db: Session, user: User) -> dict:
+    """Store a new TOTP secret (enabled once verified) and render its QR code"""
     # Generate secret
     secret = pyotp.random_base32()
     
     # Create provisioning URI for QR code
     totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(
-        name=current_user.email,
+        name=user.email,
         issuer_name="Kilele Hiking App"
     )
     
@@ -173,7 +202,7 @@ def setup_two_fa(
     img_str = base64.b64encode(buffer.getvalue()).decode()
     
     # Store secret temporarily (will be enabled after verification)
-    current_user.two_fa_secret = secret
+    user.two_fa_secret = secret
     db.commit()
     
     return {
@@ -182,6 +211,20 @@ def setup_two_fa(
         "manual_entry_key": secret
     }
 
+@router.post("/2fa/setup", response_model=TwoFASetupResponse)
+async def setup_two_fa(
+    request: TwoFASetupRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Setup 2FA for user account"""
+    # Verify password
+    hashed_password = await run_in_threadpool(_password_hash, db, current_user)
+    if not await password_hasher.verify(request.password, hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect password")
+    
+    return await run_in_threadpool(_start_two_fa_setup, db, current_user)
+
 @router.post("/2fa/verify")
 def verify_two_fa(
     request: TwoFAVerifyRequest,
@@ -203,37 +246,42 @@ def verify_two_fa(
     
     return {"message": "2FA enabled successfully", "two_fa_enabled": True}
 
+def _disable_two_fa(db: Session, user: User, two_fa_token: str):
+    """Check the 2FA token, if enabled, then turn 2FA off"""
+    # Verify 2FA token
+    if user.two_fa_enabled and user.two_fa_secret:
+        totp = pyotp.TOTP(user.two_fa_secret)
+        if not totp.verify(two_fa_token):
+            raise HTTPException(status_code=400, detail="Invalid 2FA token")
+    
+    # Disable 2FA
+    user.two_fa_enabled = False
+    user.two_fa_secret = None
+    db.commit()
+
 @router.post("/2fa/disable")
-def disable_two_fa(
+async def disable_two_fa(
     request: TwoFADisableRequest,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Disable 2FA for user account"""
     # Verify password
-    if not verify_password(request.password, current_user.hashed_password):
+    hashed_password = await run_in_threadpool(_password_hash, db, current_user)
+    if not await password_hasher.verify(request.password, hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect password")
     
-    # Verify 2FA token
-    if current_user.two_fa_enabled and current_user.two_fa_secret:
-        totp = pyotp.TOTP(current_user.two_fa_secret)
-        if not totp.verify(request.two_fa_token):
-            raise HTTPException(status_code=400, detail="Invalid 2FA token")
-    
-    # Disable 2FA
-    current_user.two_fa_enabled = False
-    current_user.two_fa_secret = None
-    db.commit()
+    await run_in_threadpool(_disable_two_fa, db, current_user, request.two_fa_token)
     
     return {"message": "2FA disabled successfully", "two_fa_enabled": False}
 
 @router.post("/login-2fa", response_model=Token)
-def login_with_two_fa(user_data: TwoFALoginRequest, db: Session = Depends(get_db)):
+async def login_with_two_fa(user_data: TwoFALoginRequest, db: Session = Depends(get_db)):
     """Login with 2FA token"""
     # Find user
-    db_user = db.query(User).filter(User.username == user_data.username).first()
+    db_user = await run_in_threadpool(_load_user, db, user_data.username)
     
-    if not db_user or not verify_password(user_data.password, db_user.hashed_password):
+    if not db_user or not await password_hasher.verify(user_data.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -253,9 +301,12 @@ def login_with_two_fa(user_data: TwoFALoginRequest, db: Session = Depends(get_db
                 headers={"WWW-Authenticate": "Bearer"},
             )
     
+    # Upgrade hashes made at another bcrypt cost
+    if password_hasher.needs_rehash(db_user.hashed_password):
+        await password_hasher.rehash(db_user, user_data.password)
+    
     # Update last login
-    db_user.last_login = datetime.utcnow()
-    db.commit()
+    db_user = await run_in_threadpool(_record_login, db, db_user)
     
     # Create access token
     access_token = create_access_token(
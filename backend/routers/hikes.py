@@ -1,38 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session, defer
+from typing import List, Optional
 
 from database import get_db
 from models.hike import Hike
-from schemas.hike import HikeCreate, HikeUpdate, HikeResponse
+from schemas.hike import HikeCreate, HikeUpdate, HikeResponse, HikeDetailResponse, HikeNearbyResponse
+from geo_service import geo_service
+from http_cache import catalogue_cache
 
 router = APIRouter()
 
 @router.get("", response_model=List[HikeResponse])
 def get_hikes(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     difficulty: str = None,
+    sort: Optional[str] = Query(None, pattern="^(rating|reviews|name|newest)$"),
     db: Session = Depends(get_db)
 ):
-    """Get all hikes with optional filtering"""
-    query = db.query(Hike)
+    """Get all hikes with optional filtering and sorting (conditional GET by ETag)"""
+    etag = catalogue_cache.collection_etag(db, "hikes", "list", skip, limit, difficulty, sort)
+    not_modified = catalogue_cache.not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    catalogue_cache.apply(response, etag)
+    
+    # Trail geometry is only returned by the detail endpoint
+    query = db.query(Hike).options(defer(Hike.route_polyline))
     
     if difficulty:
         query = query.filter(Hike.difficulty == difficulty)
     
+    if sort == "rating":
+        # Unrated hikes last, then best average, most reviewed first on ties
+        query = query.order_by(Hike.avg_rating.is_(None), Hike.avg_rating.desc(), Hike.review_count.desc(), Hike.id)
+    elif sort == "reviews":
+        query = query.order_by(Hike.review_count.desc(), Hike.id)
+    elif sort == "name":
+        query = query.order_by(Hike.name, Hike.id)
+    elif sort == "newest":
+        query = query.order_by(Hike.created_at.desc(), Hike.id.desc())
+    else:
+        query = query.order_by(Hike.id)
+    
     hikes = query.offset(skip).limit(limit).all()
     return hikes
 
-@router.get("/{hike_id}", response_model=HikeResponse)
-def get_hike(hike_id: int, db: Session = Depends(get_db)):
-    """Get a specific hike by ID"""
+@router.get("/nearby", response_model=List[HikeNearbyResponse])
+def get_nearby_hikes(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=1000),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Get hikes within radius_km of a point, nearest first"""
+    results = geo_service.nearby(db, lat, lng, radius_km, limit)
+    return [
+        HikeNearbyResponse(**HikeResponse.from_orm(hike).dict(), distance_away_km=round(distance, 3))
+        for distance, hike in results
+    ]
+
+@router.get("/{hike_id}", response_model=HikeDetailResponse)
+def get_hike(hike_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get a specific hike by ID (conditional GET by ETag)"""
+    etag = catalogue_cache.etag(db, "hikes", hike_id, "detail")
+    not_modified = catalogue_cache.not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
     hike = db.query(Hike).filter(Hike.id == hike_id).first()
     if not hike:
         raise HTTPException(status_code=404, detail="Hike not found")
+    catalogue_cache.apply(response, etag)
     return hike
 
-@router.post("", response_model=HikeResponse, status_code=201)
+@router.post("", response_model=HikeDetailResponse, status_code=201)
 def create_hike(hike: HikeCreate, db: Session = Depends(get_db)):
     """Create a new hike"""
     db_hike = Hike(**hike.model_dump())
@@ -41,7 +86,7 @@ def create_hike(hike: HikeCreate, db: Session = Depends(get_db)):
     db.refresh(db_hike)
     return db_hike
 
-@router.put("/{hike_id}", response_model=HikeResponse)
+@router.put("/{hike_id}", response_model=HikeDetailResponse)
 def update_hike(hike_id: int, hike: HikeUpdate, db: Session = Depends(get_db)):
     """Update an existing hike"""
     db_hike = db.query(Hike).filter(Hike.id == hike_id).first()
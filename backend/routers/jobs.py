@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from database import get_db
+from models.user import User
+from models.job import Job
+from schemas.job import JobResponse
+from auth import get_current_active_user
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+@router.get("", response_model=List[JobResponse])
+def list_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the current user's most recent background jobs"""
+    return db.query(Job).filter(
+        Job.user_id == current_user.id
+    ).order_by(Job.id.desc()).limit(limit).all()
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status of a background job, with its result once it has succeeded"""
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import or_, and_, func, select
+from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
+from database import get_db, SessionLocal
 from models.user import User
 from models.message import Message, Conversation, ConversationParticipant
 from schemas.message import (
@@ -15,6 +15,8 @@ from schemas.message import (
     ConversationParticipantResponse
 )
 from routers.auth import get_current_active_user
+from auth import get_user_from_token
+from realtime import message_hub
 
 router = APIRouter(prefix="/api/v1/messages", tags=["messaging"])
 
@@ -52,58 +54,117 @@ def get_or_create_conversation(db: Session, user1_id: int, user2_id: int) -> Con
     
     return new_conversation
 
+def unread_filter(user_id: int):
+    """Messages from others newer than the participant's read marker"""
+    return and_(
+        Message.sender_id != user_id,
+        or_(
+            ConversationParticipant.last_read_message_id == None,
+            Message.id > ConversationParticipant.last_read_message_id
+        )
+    )
+
+def is_message_read(message: Message, user_id: int, my_last_read_id: Optional[int], others_last_read_ids: List) -> bool:
+    """
+    Derive read state from participants' read markers (last read message ids).
+    Own messages count as read once any other participant has read past them.
+    """
+    if message.sender_id == user_id:
+        return any(read_id and read_id >= message.id for read_id in others_last_read_ids)
+    return bool(my_last_read_id and my_last_read_id >= message.id)
+
 @router.get("/conversations", response_model=List[ConversationResponse])
 def get_conversations(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all conversations for the current user"""
-    # Get all conversation IDs where user is a participant
-    user_conversations = db.query(Conversation).join(
-        ConversationParticipant
-    ).filter(
-        ConversationParticipant.user_id == current_user.id
+    """
+    Get all conversations for the current user.
+    Built from two set-based queries: one for conversations with their last
+    message and unread count, one for the other participants.
+    """
+    # Last message per conversation: one index probe on (conversation_id, created_at, id)
+    last_message_id = select(Message.id).where(
+        Message.conversation_id == Conversation.id
+    ).order_by(
+        Message.created_at.desc(), Message.id.desc()
+    ).limit(1).correlate(Conversation).scalar_subquery()
+    
+    unread_counts = select(
+        Message.conversation_id,
+        func.count(Message.id).label("unread_count")
+    ).join(
+        ConversationParticipant, and_(
+            ConversationParticipant.conversation_id == Message.conversation_id,
+            ConversationParticipant.user_id == current_user.id
+        )
+    ).where(
+        unread_filter(current_user.id)
+    ).group_by(Message.conversation_id).subquery()
+    
+    LastMessage = aliased(Message)
+    LastSender = aliased(User)
+    
+    rows = db.query(
+        Conversation,
+        ConversationParticipant.last_read_message_id,
+        LastMessage,
+        LastSender.username,
+        func.coalesce(unread_counts.c.unread_count, 0)
+    ).join(
+        ConversationParticipant, and_(
+            ConversationParticipant.conversation_id == Conversation.id,
+            ConversationParticipant.user_id == current_user.id
+        )
+    ).outerjoin(
+        LastMessage, LastMessage.id == last_message_id
+    ).outerjoin(
+        LastSender, LastSender.id == LastMessage.sender_id
+    ).outerjoin(
+        unread_counts, unread_counts.c.conversation_id == Conversation.id
     ).order_by(
         Conversation.updated_at.desc()
     ).all()
     
-    result = []
-    for conv in user_conversations:
-        # Get participants info
-        participants = []
-        for participant in conv.participants:
-            if participant.user_id != current_user.id:  # Don't include current user
-                participants.append(ConversationParticipantResponse(
-                    user_id=participant.user.id,
-                    username=participant.user.username,
-                    profile_picture=participant.user.profile_picture,
-                    last_read_at=participant.last_read_at
-                ))
+    # Other participants of every conversation, loaded in one batch
+    participants_by_conversation = {}
+    if rows:
+        participant_rows = db.query(ConversationParticipant, User).join(
+            User, User.id == ConversationParticipant.user_id
+        ).filter(
+            ConversationParticipant.conversation_id.in_([row[0].id for row in rows]),
+            ConversationParticipant.user_id != current_user.id  # Don't include current user
+        ).all()
         
-        # Get last message
+        for participant, user in participant_rows:
+            participants_by_conversation.setdefault(participant.conversation_id, []).append(
+                ConversationParticipantResponse(
+                    user_id=user.id,
+                    username=user.username,
+                    profile_picture=user.profile_picture,
+                    last_read_at=participant.last_read_at,
+                    last_read_message_id=participant.last_read_message_id
+                )
+            )
+    
+    result = []
+    for conv, my_last_read_id, last_msg, last_sender_username, unread_count in rows:
         last_message = None
-        if conv.messages:
-            last_msg = conv.messages[-1]
+        if last_msg:
+            others_last_read_ids = [p.last_read_message_id for p in participants_by_conversation.get(conv.id, [])]
             last_message = MessageResponse(
                 id=last_msg.id,
                 conversation_id=last_msg.conversation_id,
                 sender_id=last_msg.sender_id,
-                sender_username=last_msg.sender.username,
+                sender_username=last_sender_username,
                 content=last_msg.content,
-                is_read=last_msg.is_read,
+                is_read=is_message_read(last_msg, current_user.id, my_last_read_id, others_last_read_ids),
                 created_at=last_msg.created_at
             )
         
-        # Count unread messages
-        unread_count = db.query(Message).filter(
-            Message.conversation_id == conv.id,
-            Message.sender_id != current_user.id,
-            Message.is_read == False
-        ).count()
-        
         result.append(ConversationResponse(
             id=conv.id,
-            participants=participants,
+            participants=participants_by_conversation.get(conv.id, []),
             last_message=last_message,
             unread_count=unread_count,
             created_at=conv.created_at,
@@ -115,54 +176,81 @@ def get_conversations(
 @router.get("/conversations/{conversation_id}", response_model=ConversationDetailResponse)
 def get_conversation(
     conversation_id: int,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific conversation with all messages"""
+    """
+    Get a specific conversation with a window of its messages.
+    Returns the newest `limit` messages; pass `next_before_id` as `?before_id=`
+    to page back through older history.
+    """
     conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # Verify user is a participant
-    is_participant = db.query(ConversationParticipant).filter(
-        ConversationParticipant.conversation_id == conversation_id,
-        ConversationParticipant.user_id == current_user.id
-    ).first()
+    # Load participants with their users, verifying the caller is one of them
+    participant_rows = db.query(ConversationParticipant, User).join(
+        User, User.id == ConversationParticipant.user_id
+    ).filter(
+        ConversationParticipant.conversation_id == conversation_id
+    ).all()
     
+    is_participant = next((p for p, _ in participant_rows if p.user_id == current_user.id), None)
     if not is_participant:
         raise HTTPException(status_code=403, detail="You are not a participant in this conversation")
     
-    # Mark messages as read
-    db.query(Message).filter(
-        Message.conversation_id == conversation_id,
-        Message.sender_id != current_user.id,
-        Message.is_read == False
-    ).update({"is_read": True})
+    # Keyset window on (created_at, id), newest first
+    query = db.query(Message, User.username).join(
+        User, User.id == Message.sender_id
+    ).filter(
+        Message.conversation_id == conversation_id
+    )
     
-    # Update last_read_at
-    is_participant.last_read_at = datetime.utcnow()
-    db.commit()
+    if before_id:
+        before_created_at = select(Message.created_at).where(
+            Message.id == before_id,
+            Message.conversation_id == conversation_id
+        ).scalar_subquery()
+        query = query.filter(or_(
+            Message.created_at < before_created_at,
+            and_(Message.created_at == before_created_at, Message.id < before_id)
+        ))
+    
+    window = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    has_more = len(window) > limit
+    window = list(reversed(window[:limit]))
+    
+    # Viewing the newest window moves the read marker up to the latest message
+    if not before_id and window:
+        newest = max((msg for msg, _ in window), key=lambda msg: msg.id)
+        if not is_participant.last_read_message_id or is_participant.last_read_message_id < newest.id:
+            is_participant.last_read_message_id = newest.id
+            is_participant.last_read_at = newest.created_at
+            db.commit()
     
-    # Get participants
     participants = []
-    for participant in conversation.participants:
+    for participant, user in participant_rows:
         participants.append(ConversationParticipantResponse(
-            user_id=participant.user.id,
-            username=participant.user.username,
-            profile_picture=participant.user.profile_picture,
-            last_read_at=participant.last_read_at
+            user_id=user.id,
+            username=user.username,
+            profile_picture=user.profile_picture,
+            last_read_at=participant.last_read_at,
+            last_read_message_id=participant.last_read_message_id
         ))
     
-    # Get messages
+    others_last_read_ids = [p.last_read_message_id for p, _ in participant_rows if p.user_id != current_user.id]
+    
     messages = []
-    for msg in conversation.messages:
+    for msg, sender_username in window:
         messages.append(MessageResponse(
             id=msg.id,
             conversation_id=msg.conversation_id,
             sender_id=msg.sender_id,
-            sender_username=msg.sender.username,
+            sender_username=sender_username,
             content=msg.content,
-            is_read=msg.is_read,
+            is_read=is_message_read(msg, current_user.id, is_participant.last_read_message_id, others_last_read_ids),
             created_at=msg.created_at
         ))
     
@@ -170,12 +258,15 @@ def get_conversation(
         id=conversation.id,
         participants=participants,
         messages=messages,
-        created_at=conversation.created_at
+        created_at=conversation.created_at,
+        has_more=has_more,
+        next_before_id=messages[0].id if has_more else None
     )
 
 @router.post("/send", response_model=MessageResponse)
 def send_message(
     message_data: MessageCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -196,8 +287,7 @@ def send_message(
     new_message = Message(
         conversation_id=conversation.id,
         sender_id=current_user.id,
-        content=message_data.content,
-        is_read=False
+        content=message_data.content
     )
     db.add(new_message)
     
@@ -206,15 +296,61 @@ def send_message(
     db.commit()
     db.refresh(new_message)
     
-    return MessageResponse(
+    response = MessageResponse(
         id=new_message.id,
         conversation_id=new_message.conversation_id,
         sender_id=new_message.sender_id,
         sender_username=current_user.username,
         content=new_message.content,
-        is_read=new_message.is_read,
+        is_read=False,  # No other participant has read past a message just sent
         created_at=new_message.created_at
     )
+    
+    # Push to connected participants once the response has been sent
+    participant_ids = [
+        row[0] for row in db.query(ConversationParticipant.user_id).filter(
+            ConversationParticipant.conversation_id == conversation.id
+        ).all()
+    ]
+    background_tasks.add_task(
+        message_hub.publish,
+        participant_ids,
+        {"type": "message", "message": response.model_dump(mode="json")}
+    )
+    
+    return response
+
+@router.websocket("/ws")
+async def messages_websocket(websocket: WebSocket, token: str = Query(...)):
+    """
+    Receive new messages in real time instead of polling.
+    Connect with the access token as `?token=`; every message sent to a
+    conversation you take part in is pushed as {"type": "message", "message": {...}}.
+    Send "ping" to keep the connection alive.
+    """
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        user_id, is_active = user.id, user.is_active
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        db.close()
+    
+    if not is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await message_hub.connect(user_id, websocket)
+    try:
+        while True:
+            if await websocket.receive_text() == "ping":
+                await websocket.send_json({"type": "pong"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        message_hub.disconnect(user_id, websocket)
 
 @router.delete("/conversations/{conversation_id}")
 def delete_conversation(
@@ -255,17 +391,14 @@ def get_unread_count(
     db: Session = Depends(get_db)
 ):
     """Get total count of unread messages"""
-    # Get all conversation IDs where user is a participant
-    conversation_ids = db.query(ConversationParticipant.conversation_id).filter(
-        ConversationParticipant.user_id == current_user.id
-    ).all()
-    conversation_ids = [c[0] for c in conversation_ids]
-    
-    # Count unread messages in those conversations
-    unread_count = db.query(Message).filter(
-        Message.conversation_id.in_(conversation_ids),
-        Message.sender_id != current_user.id,
-        Message.is_read == False
-    ).count()
+    # Count unread messages across the user's conversations in one query
+    unread_count = db.query(func.count(Message.id)).join(
+        ConversationParticipant, and_(
+            ConversationParticipant.conversation_id == Message.conversation_id,
+            ConversationParticipant.user_id == current_user.id
+        )
+    ).filter(
+        unread_filter(current_user.id)
+    ).scalar()
     
     return {"unread_count": unread_count}
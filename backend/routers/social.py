@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
@@ -15,13 +15,15 @@ from models.bookmark import Bookmark
 from models.follow import Follow
 from models.achievement import Achievement, UserAchievement
 from models.activity import Activity
-from models.hike_session import HikeSession
 from schemas.social import (
     ReviewCreate, ReviewResponse, BookmarkCreate, BookmarkResponse,
     FollowCreate, FollowResponse, AchievementResponse, ActivityResponse,
     UserStatistics
 )
 from auth import get_current_active_user
+from timeline_service import timeline_service
+from stats_service import stats_service
+from rating_service import rating_service
 
 router = APIRouter()
 
@@ -62,6 +64,9 @@ def create_review(
         description=f"Reviewed {hike.name} - {review.rating}★"
     )
     db.add(activity)
+    timeline_service.publish(db, activity)
+    rating_service.review_added(db, review.hike_id, review.rating)
+    stats_service.increment(db, current_user.id, total_reviews=1, rating_sum=review.rating)
     
     db.commit()
     db.refresh(db_review)
@@ -71,6 +76,34 @@ def create_review(
     response.user_profile_picture = current_user.profile_picture
     return response
 
+@router.delete("/reviews/{review_id}")
+def delete_review(
+    review_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Delete one of your reviews"""
+    review = db.query(Review).filter(
+        Review.id == review_id,
+        Review.user_id == current_user.id
+    ).first()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+    
+    db.query(ReviewHelpful).filter(ReviewHelpful.review_id == review.id).delete(synchronize_session=False)
+    # One review per user and hike, so this matches the review's feed activity
+    for activity in db.query(Activity).filter(
+        Activity.user_id == current_user.id,
+        Activity.activity_type == "review",
+        Activity.hike_id == review.hike_id
+    ).all():
+        timeline_service.retract(db, activity)
+    db.delete(review)
+    rating_service.review_removed(db, review.hike_id, review.rating)
+    stats_service.increment(db, current_user.id, total_reviews=-1, rating_sum=-review.rating)
+    db.commit()
+    return {"message": "Review deleted"}
+
 @router.get("/reviews/hike/{hike_id}", response_model=List[ReviewResponse])
 def get_hike_reviews(
     hike_id: int,
@@ -182,6 +215,7 @@ def create_bookmark(
     
     db_bookmark = Bookmark(**bookmark.dict(), user_id=current_user.id)
     db.add(db_bookmark)
+    stats_service.increment(db, current_user.id, bookmarks_count=1)
     db.commit()
     db.refresh(db_bookmark)
     
@@ -229,6 +263,7 @@ def delete_bookmark(
         raise HTTPException(status_code=404, detail="Bookmark not found")
     
     db.delete(bookmark)
+    stats_service.increment(db, current_user.id, bookmarks_count=-1)
     db.commit()
     return {"message": "Bookmark removed"}
 
@@ -254,6 +289,9 @@ def follow_user(
     
     db_follow = Follow(follower_id=current_user.id, following_id=follow.following_id)
     db.add(db_follow)
+    timeline_service.on_follow(db, current_user.id, follow.following_id)
+    stats_service.increment(db, current_user.id, following_count=1)
+    stats_service.increment(db, follow.following_id, followers_count=1)
     db.commit()
     db.refresh(db_follow)
     
@@ -280,6 +318,9 @@ def unfollow_user(
         raise HTTPException(status_code=404, detail="Not following")
     
     db.delete(follow)
+    timeline_service.on_unfollow(db, current_user.id, user_id)
+    stats_service.increment(db, current_user.id, following_count=-1)
+    stats_service.increment(db, user_id, followers_count=-1)
     db.commit()
     return {"message": "Unfollowed"}
 
@@ -323,35 +364,39 @@ def get_following(
 
 # ==================== ACTIVITY FEED ====================
 
+def _encode_feed_cursor(created_at: datetime, activity_id: int) -> str:
+    """Build the opaque `before` cursor for a feed row"""
+    return f"{created_at.isoformat()},{activity_id}"
+
+def _decode_feed_cursor(cursor: str):
+    """Parse a `<created_at>,<id>` cursor into its keyset parts"""
+    try:
+        created_at, activity_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(activity_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid feed cursor")
+
 @router.get("/feed", response_model=List[ActivityResponse])
 def get_activity_feed(
-    skip: int = 0,
-    limit: int = 20,
+    before: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get activity feed from followed users"""
-    # Get list of followed users
-    following_ids = db.query(Follow.following_id).filter(
-        Follow.follower_id == current_user.id
-    ).all()
-    following_ids = [f[0] for f in following_ids]
-    following_ids.append(current_user.id)  # Include own activities
-    
-    # Get activities
-    activities = db.query(Activity).filter(
-        Activity.user_id.in_(following_ids)
-    ).order_by(desc(Activity.created_at)).offset(skip).limit(limit).all()
+    """
+    Get activity feed from followed users, served from the precomputed home timeline.
+    Pass the `cursor` of the last item as `?before=` to fetch the next page.
+    """
+    cursor = _decode_feed_cursor(before) if before else None
+    rows = timeline_service.read(db, current_user.id, cursor, limit)
     
     result = []
-    for activity in activities:
+    for activity, username, profile_picture, hike_name in rows:
         response = ActivityResponse.from_orm(activity)
-        response.username = activity.user.username
-        response.user_profile_picture = activity.user.profile_picture
-        if activity.hike_id:
-            hike = db.query(Hike).filter(Hike.id == activity.hike_id).first()
-            if hike:
-                response.hike_name = hike.name
+        response.username = username
+        response.user_profile_picture = profile_picture
+        response.hike_name = hike_name
+        response.cursor = _encode_feed_cursor(activity.created_at, activity.id)
         result.append(response)
     
     return result
@@ -390,43 +435,18 @@ def get_user_statistics(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user statistics"""
-    # Count completed hikes
-    completed_sessions = db.query(HikeSession).filter(
-        HikeSession.user_id == current_user.id,
-        HikeSession.status == "completed"
-    ).all()
-    
-    total_hikes = len(completed_sessions)
-    total_distance = sum(s.distance_km or 0 for s in completed_sessions)
-    total_elevation = sum(s.elevation_gain_m or 0 for s in completed_sessions)
-    total_duration = sum(s.duration_hours or 0 for s in completed_sessions)
-    
-    # Review stats
-    reviews = db.query(Review).filter(Review.user_id == current_user.id).all()
-    total_reviews = len(reviews)
-    avg_rating = sum(r.rating for r in reviews) / total_reviews if total_reviews > 0 else 0
-    
-    # Achievement stats
-    achievements_earned = db.query(UserAchievement).filter(
-        UserAchievement.user_id == current_user.id,
-        UserAchievement.completed == True
-    ).count()
-    
-    # Social stats
-    followers_count = db.query(Follow).filter(Follow.following_id == current_user.id).count()
-    following_count = db.query(Follow).filter(Follow.follower_id == current_user.id).count()
-    bookmarks_count = db.query(Bookmark).filter(Bookmark.user_id == current_user.id).count()
+    """Get user statistics from the per-user rollup"""
+    stats = stats_service.get(db, current_user.id)
     
     return UserStatistics(
-        total_hikes=total_hikes,
-        total_distance_km=round(total_distance, 2),
-        total_elevation_m=round(total_elevation, 0),
-        total_duration_hours=round(total_duration, 2),
-        total_reviews=total_reviews,
-        average_rating_given=round(avg_rating, 2),
-        achievements_earned=achievements_earned,
-        followers_count=followers_count,
-        following_count=following_count,
-        bookmarks_count=bookmarks_count
+        total_hikes=stats.total_hikes,
+        total_distance_km=round(stats.total_distance_km, 2),
+        total_elevation_m=round(stats.total_elevation_m, 0),
+        total_duration_hours=round(stats.total_duration_hours, 2),
+        total_reviews=stats.total_reviews,
+        average_rating_given=round(stats.average_rating_given, 2),
+        achievements_earned=stats.achievements_earned,
+        followers_count=stats.followers_count,
+        following_count=stats.following_count,
+        bookmarks_count=stats.bookmarks_count
     )
@@ -2,17 +2,20 @@
 Strava API routes for OAuth, activity sync, and webhooks
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
 from database import get_db
-from auth import get_current_user
+from auth import get_current_active_user, get_current_admin_user, get_current_user
+from models.user import User
+from config import settings
 from strava_service import strava_service
+from strava_webhooks import active_subscription, strava_event_queue
+from job_queue import job_queue
 from models.strava import StravaActivity, StravaToken
-import os
 
 router = APIRouter(prefix="/api/strava", tags=["strava"])
 
@@ -97,42 +100,47 @@ async def strava_callback(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 async def sync_activities(
-    background_tasks: BackgroundTasks,
     days: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: User = Depends(get_current_active_user)
 ):
     """
-    Sync activities from Strava
+    Sync activities from Strava in the background.
+    Returns a job id; poll GET /api/v1/jobs/{job_id} for the result.
     """
-    try:
-        # Check if user is connected
-        token = db.query(StravaToken).filter(StravaToken.user_id == current_user['id']).first()
-        
-        if not token:
-            raise HTTPException(status_code=404, detail="Strava not connected")
-        
-        # Sync activities in background
-        after_date = datetime.utcnow() - timedelta(days=days)
-        
-        activities = strava_service.sync_activities(
-            user_id=current_user['id'],
-            db=db,
-            after=after_date
-        )
-        
-        return {
-            "success": True,
-            "synced_count": len(activities),
-            "message": f"Synced {len(activities)} activities from the last {days} days"
-        }
+    # Check if user is connected
+    token = db.query(StravaToken).filter(StravaToken.user_id == current_user.id).first()
     
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sync failed: {str(e)}")
+    if not token:
+        raise HTTPException(status_code=404, detail="Strava not connected")
+    
+    # A sync already waiting for this user is reused
+    job = job_queue.enqueue(db, "strava_sync", {"days": days}, user_id=current_user.id, dedupe=True)
+    
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/v1/jobs/{job.id}",
+        "message": f"Syncing activities from the last {days} days"
+    }
+
+
+@router.get("/sync/status")
+async def sync_status(current_user: User = Depends(get_current_admin_user)):
+    """
+    Metrics of the last scheduled sync run and the shared API quota (admins only)
+    """
+    import strava_scheduler
+    from strava_rate_limiter import strava_rate_limiter
+    
+    return {
+        "last_run": strava_scheduler.last_run_metrics,
+        "rate_limit": strava_rate_limiter.metrics(),
+        "webhook_events": strava_event_queue.metrics()
+    }
 
 
 @router.get("/activities", response_model=List[StravaActivityResponse])
@@ -213,9 +221,6 @@ async def disconnect_strava(
 
 
 # Webhook endpoints
-WEBHOOK_VERIFY_TOKEN = os.getenv("STRAVA_WEBHOOK_VERIFY_TOKEN", "kilele_hiking_app_2026")
-
-
 @router.get("/webhook")
 async def webhook_verify(request: Request):
     """
@@ -224,7 +229,8 @@ async def webhook_verify(request: Request):
     params = dict(request.query_params)
     
     # Strava sends: hub.mode, hub.challenge, hub.verify_token
-    if params.get("hub.verify_token") == WEBHOOK_VERIFY_TOKEN:
+    if params.get("hub.mode", "subscribe") == "subscribe" and \
+            params.get("hub.verify_token") == settings.STRAVA_WEBHOOK_VERIFY_TOKEN:
         return {"hub.challenge": params.get("hub.challenge")}
     
     raise HTTPException(status_code=403, detail="Invalid verify token")
@@ -233,75 +239,39 @@ async def webhook_verify(request: Request):
 @router.post("/webhook")
 async def webhook_event(
     request: Request,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
     Handle webhook events from Strava
-    Events: create, update, delete activities
+    Events: activity create/update/delete and athlete deauthorization.
+    Strava expects an answer within two seconds, so events are only queued here.
     """
     try:
         data = await request.json()
-        
-        # Strava webhook event structure:
-        # {
-        #   "object_type": "activity",
-        #   "object_id": 123456,
-        #   "aspect_type": "create|update|delete",
-        #   "owner_id": 789,  # Strava athlete ID
-        #   "subscription_id": 123,
-        #   "event_time": 1516126040
-        # }
-        
-        if data.get("object_type") != "activity":
-            return {"status": "ignored"}
-        
-        athlete_id = data.get("owner_id")
-        aspect_type = data.get("aspect_type")
-        activity_id = data.get("object_id")
-        
-        # Find user by athlete ID
-        token = db.query(StravaToken).filter(StravaToken.athlete_id == athlete_id).first()
-        
-        if not token or not token.sync_enabled:
-            return {"status": "ignored"}
-        
-        # Handle different event types
-        if aspect_type == "create":
-            # Sync new activity in background
-            background_tasks.add_task(
-                strava_service.sync_activities,
-                token.user_id,
-                db,
-                datetime.utcnow() - timedelta(hours=1),
-                limit=5
-            )
-        
-        elif aspect_type == "delete":
-            # Delete activity from our database
-            activity = db.query(StravaActivity).filter(
-                StravaActivity.strava_activity_id == str(activity_id)
-            ).first()
-            
-            if activity:
-                db.delete(activity)
-                db.commit()
-        
-        elif aspect_type == "update":
-            # Re-sync activity
-            background_tasks.add_task(
-                strava_service.sync_activities,
-                token.user_id,
-                db,
-                datetime.utcnow() - timedelta(hours=1),
-                limit=5
-            )
-        
-        return {"status": "processed"}
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid event payload")
     
-    except Exception as e:
-        print(f"Webhook error: {e}")
-        return {"status": "error", "message": str(e)}
+    # Strava webhook event structure:
+    # {
+    #   "object_type": "activity|athlete",
+    #   "object_id": 123456,
+    #   "aspect_type": "create|update|delete",
+    #   "owner_id": 789,  # Strava athlete ID
+    #   "subscription_id": 123,
+    #   "event_time": 1516126040,
+    #   "updates": {"title": "...", "authorized": "false"}
+    # }
+    if not isinstance(data, dict) or data.get("object_type") not in ("activity", "athlete") \
+            or not data.get("owner_id") or not data.get("object_id"):
+        return {"status": "ignored"}
+    
+    # Ignore events for subscriptions other than ours
+    subscription = active_subscription(db)
+    if subscription and data.get("subscription_id") != subscription.subscription_id:
+        return {"status": "ignored"}
+    
+    queued = strava_event_queue.enqueue(data)
+    return {"status": "queued" if queued else "duplicate"}
 
 
 @router.post("/toggle-autosync")
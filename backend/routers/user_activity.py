@@ -7,11 +7,14 @@ from database import get_db
 from models.user import User
 from models.hike import Hike
 from models.hike_session import HikeSession, SavedHike
+from models.activity import Activity
 from schemas.hike_session import (
     HikeSessionCreate, HikeSessionUpdate, HikeSessionResponse,
     SavedHikeCreate, SavedHikeResponse
 )
 from auth import get_current_active_user
+from timeline_service import timeline_service
+from stats_service import stats_service
 
 router = APIRouter()
 
@@ -100,13 +103,30 @@ def update_session(
     
     # Update fields
     update_data = session_update.model_dump(exclude_unset=True)
+    was_active = db_session.is_active
+    contribution_before = stats_service.session_contribution(db_session)
     
     for key, value in update_data.items():
         setattr(db_session, key, value)
     
     # If marking as inactive (completed), set completed timestamp
-    if update_data.get('is_active') == False and db_session.is_active:
+    if update_data.get('is_active') == False and was_active:
         db_session.completed_at = datetime.utcnow()
+        
+        hike = db.query(Hike).filter(Hike.id == db_session.hike_id).first()
+        activity = Activity(
+            user_id=current_user.id,
+            activity_type="completed_hike",
+            hike_id=db_session.hike_id,
+            related_id=db_session.id,
+            description=f"Completed {hike.name}" if hike else "Completed a hike"
+        )
+        db.add(activity)
+        timeline_service.publish(db, activity)
+    
+    stats_service.session_changed(
+        db, current_user.id, contribution_before, stats_service.session_contribution(db_session)
+    )
     
     db.commit()
     db.refresh(db_session)
@@ -128,7 +148,9 @@ def delete_session(
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    contribution = stats_service.session_contribution(db_session)
     db.delete(db_session)
+    stats_service.session_changed(db, current_user.id, contribution, {})
     db.commit()
     return None
 
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pathlib import Path
-import json
+import zipfile
+import os
 
+from config import settings
 from database import get_db
 from models.user import User
+from models.hike import Hike
 from models.hike_session import HikeSession
-from routers.auth import get_current_active_user
-from utils.wearable_parser import WearableDataParser
+from auth import get_current_active_user
+from route_service import route_service
+from wearable_import import wearable_import_service
+from job_queue import job_queue
 
 router = APIRouter(prefix="/api/v1/wearable", tags=["wearable"])
 
-@router.post("/import")
-async def import_wearable_data(
+@router.post("/import", status_code=202)
+def import_wearable_data(
     file: UploadFile = File(...),
     hike_id: int = None,
     current_user: User = Depends(get_current_active_user),
@@ -22,6 +27,7 @@ async def import_wearable_data(
     """
     Import hiking data from wearable device files (GPX, FIT, TCX)
     Supports Garmin, Fitbit, Apple Watch, Strava, and other devices
+    The file is parsed in the background; poll GET /api/v1/jobs/{job_id} for the summary.
     """
     # Validate file extension
     file_extension = Path(file.filename).suffix.lower()
@@ -33,64 +39,96 @@ async def import_wearable_data(
             detail=f"Unsupported file format. Supported formats: {', '.join(supported_formats)}"
         )
     
+    max_bytes = settings.WEARABLE_MAX_FILE_MB * 1024 * 1024
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File is too large. Maximum is {settings.WEARABLE_MAX_FILE_MB} MB")
+    
+    if hike_id is not None and not db.query(Hike.id).filter(Hike.id == hike_id).first():
+        raise HTTPException(status_code=404, detail="Hike not found")
+    
+    upload_path = job_queue.save_upload(file.file, file_extension)
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Parse the file based on type
-        parsed_data = WearableDataParser.parse_file(file_content, file_extension)
-        
-        if not parsed_data['success']:
-            raise HTTPException(status_code=400, detail=parsed_data['error'])
+        if os.path.getsize(upload_path) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File is too large. Maximum is {settings.WEARABLE_MAX_FILE_MB} MB")
         
-        # Create hike session from parsed data
-        hike_session = HikeSession(
-            user_id=current_user.id,
-            hike_id=hike_id,  # Optional - can be matched later
-            started_at=parsed_data.get('start_time'),
-            ended_at=parsed_data.get('end_time'),
-            duration_hours=parsed_data.get('duration_hours', 0),
-            distance_covered_km=parsed_data.get('total_distance_km', 0),
-            elevation_gain_m=parsed_data.get('elevation_gain_m', 0),
-            status='completed',
-            route_data=json.dumps(parsed_data.get('route_coordinates', [])),
-            notes=f"Imported from {parsed_data['source']} file: {file.filename}"
-        )
+        job = job_queue.enqueue(db, "wearable_import", {
+            "upload_path": upload_path,
+            "filename": file.filename,
+            "hike_id": hike_id
+        }, user_id=current_user.id)
+    except Exception:
+        os.unlink(upload_path)
+        raise
+    
+    return {
+        "message": "Wearable data import started",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/v1/jobs/{job.id}"
+    }
+
+@router.post("/import/archive", status_code=202)
+def import_wearable_archive(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import a ZIP archive of GPX, FIT and TCX files (e.g. a Garmin Connect export).
+    Files are parsed in parallel worker processes and matched to trails;
+    all imported sessions are saved together. Poll GET /api/v1/jobs/{job_id}
+    for the per-file report.
+    """
+    if Path(file.filename or '').suffix.lower() != '.zip':
+        raise HTTPException(status_code=400, detail="Upload a .zip archive of GPX, FIT or TCX files")
+    
+    max_bytes = settings.WEARABLE_ARCHIVE_MAX_MB * 1024 * 1024
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Archive is too large. Maximum is {settings.WEARABLE_ARCHIVE_MAX_MB} MB")
+    
+    # Worker processes open the archive by path
+    upload_path = job_queue.save_upload(file.file, '.zip')
+    try:
+        if os.path.getsize(upload_path) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Archive is too large. Maximum is {settings.WEARABLE_ARCHIVE_MAX_MB} MB")
+        if not zipfile.is_zipfile(upload_path):
+            raise HTTPException(status_code=400, detail="File is not a valid ZIP archive")
         
-        db.add(hike_session)
-        db.commit()
-        db.refresh(hike_session)
+        files = wearable_import_service.archive_entries(upload_path)
+        if not files:
+            raise HTTPException(status_code=400, detail="The archive has no GPX, FIT or TCX files")
         
-        return {
-            "message": "Wearable data imported successfully",
-            "session_id": hike_session.id,
-            "summary": {
-                "name": parsed_data.get('name'),
-                "distance_km": parsed_data.get('total_distance_km'),
-                "elevation_gain_m": parsed_data.get('elevation_gain_m'),
-                "duration_hours": parsed_data.get('duration_hours'),
-                "total_points": parsed_data.get('total_points'),
-                "source": parsed_data.get('source'),
-                "center": {
-                    "latitude": parsed_data.get('center_latitude'),
-                    "longitude": parsed_data.get('center_longitude')
-                }
-            },
-            "route_coordinates": parsed_data.get('route_coordinates', [])
-        }
-    
-    except HTTPException:
+        job = job_queue.enqueue(db, "wearable_archive_import", {
+            "upload_path": upload_path,
+            "filename": file.filename
+        }, user_id=current_user.id)
+    except ValueError as e:
+        os.unlink(upload_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        os.unlink(upload_path)
         raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    
+    return {
+        "message": f"Importing {len(files)} activities",
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/v1/jobs/{job.id}"
+    }
 
 @router.get("/sessions/{session_id}/route")
 def get_session_route(
     session_id: int,
+    tolerance: Optional[float] = Query(None, ge=0, description="Allowed deviation from the recorded route in metres"),
+    zoom: Optional[float] = Query(None, ge=0, le=24, description="Web map zoom level to simplify the route for"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get route coordinates for a specific hike session"""
+    """
+    Get route coordinates for a specific hike session.
+    Pass tolerance (metres) or a map zoom level to get a simplified route;
+    without either the full recording is returned.
+    """
     session = db.query(HikeSession).filter(
         HikeSession.id == session_id,
         HikeSession.user_id == current_user.id
@@ -99,19 +137,25 @@ def get_session_route(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    if not session.route_data:
-        raise HTTPException(status_code=404, detail="No route data available for this session")
+    if tolerance is None and zoom is not None:
+        tolerance = route_service.tolerance_for_zoom(db, session, zoom)
     
     try:
-        route_coordinates = json.loads(session.route_data)
-        return {
-            "session_id": session.id,
-            "hike_id": session.hike_id,
-            "route_coordinates": route_coordinates,
-            "total_points": len(route_coordinates)
-        }
-    except:
+        route_coordinates, tolerance_used = route_service.route(db, session, tolerance)
+    except (TypeError, ValueError, KeyError):
         raise HTTPException(status_code=500, detail="Failed to parse route data")
+    
+    if not route_coordinates:
+        raise HTTPException(status_code=404, detail="No route data available for this session")
+    
+    return {
+        "session_id": session.id,
+        "hike_id": session.hike_id,
+        "route_coordinates": route_coordinates,
+        "total_points": len(route_coordinates),
+        "recorded_points": session.route_point_count or len(route_coordinates),
+        "tolerance_m": tolerance_used
+    }
 
 @router.get("/supported-devices")
 def get_supported_devices():
@@ -1,4 +1,4 @@
-from schemas.hike import HikeBase, HikeCreate, HikeUpdate, HikeResponse
+from schemas.hike import HikeBase, HikeCreate, HikeUpdate, HikeResponse, HikeDetailResponse
 from schemas.user import UserBase, UserCreate, UserLogin, UserResponse, Token, TokenData
 from schemas.hike_session import (
     HikeSessionCreate, HikeSessionUpdate, HikeSessionResponse,
@@ -6,7 +6,7 @@ from schemas.hike_session import (
 )
 
 __all__ = [
-    "HikeBase", "HikeCreate", "HikeUpdate", "HikeResponse",
+    "HikeBase", "HikeCreate", "HikeUpdate", "HikeResponse", "HikeDetailResponse",
     "UserBase", "UserCreate", "UserLogin", "UserResponse", "Token", "TokenData",
     "HikeSessionCreate", "HikeSessionUpdate", "HikeSessionResponse",
     "SavedHikeCreate", "SavedHikeResponse"
@@ -1,7 +1,21 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional
 from datetime import datetime
 
+from utils.polyline import decode
+
+
+def check_route_polyline(value: Optional[str]) -> Optional[str]:
+    """Reject route polylines that don't decode to at least two valid coordinates"""
+    if value is None:
+        return value
+    points = decode(value)  # ValueError on malformed input
+    if len(points) < 2:
+        raise ValueError("Route polyline needs at least two points")
+    if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in points):
+        raise ValueError("Route polyline has coordinates out of range")
+    return value
+
 class HikeBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=200)
     location: str = Field(..., min_length=1, max_length=200)
@@ -17,7 +31,9 @@ class HikeBase(BaseModel):
     image_url: Optional[str] = Field(None, max_length=500)
 
 class HikeCreate(HikeBase):
-    pass
+    route_polyline: Optional[str] = None  # Google encoded polyline of the trail
+
+    _check_route_polyline = field_validator("route_polyline")(check_route_polyline)
 
 class HikeUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=200)
@@ -32,11 +48,24 @@ class HikeUpdate(BaseModel):
     latitude: Optional[float] = Field(None, ge=-90, le=90)
     longitude: Optional[float] = Field(None, ge=-180, le=180)
     image_url: Optional[str] = Field(None, max_length=500)
+    route_polyline: Optional[str] = None  # Google encoded polyline of the trail
+
+    _check_route_polyline = field_validator("route_polyline")(check_route_polyline)
 
 class HikeResponse(HikeBase):
     id: int
+    avg_rating: Optional[float] = None
+    review_count: int = 0
+    rating_histogram: Dict[int, int] = {}
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
 
     class Config:
         from_attributes = True
+
+class HikeDetailResponse(HikeResponse):
+    """A single hike, with its trail geometry; lists leave it out"""
+    route_polyline: Optional[str] = None
+
+class HikeNearbyResponse(HikeResponse):
+    distance_away_km: float  # From the search point
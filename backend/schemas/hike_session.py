@@ -8,6 +8,7 @@ class HikeSessionBase(BaseModel):
     current_longitude: Optional[float] = None
     distance_covered_km: Optional[float] = 0.0
     duration_minutes: Optional[int] = 0
+    elevation_gain_m: Optional[float] = None
     notes: Optional[str] = None
     rating: Optional[int] = Field(None, ge=1, le=5)
 
@@ -19,6 +20,7 @@ class HikeSessionUpdate(BaseModel):
     current_longitude: Optional[float] = None
     distance_covered_km: Optional[float] = None
     duration_minutes: Optional[int] = None
+    elevation_gain_m: Optional[float] = None
     notes: Optional[str] = None
     rating: Optional[int] = Field(None, ge=1, le=5)
     is_active: Optional[bool] = None
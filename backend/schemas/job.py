@@ -0,0 +1,25 @@
+from pydantic import BaseModel, field_validator
+from typing import Any, Optional
+from datetime import datetime
+import json
+
+class JobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: str  # queued, running, succeeded or failed
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def parse_result(cls, value):
+        # Stored as JSON text
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        from_attributes = True
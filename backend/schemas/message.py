@@ -26,6 +26,7 @@ class ConversationParticipantResponse(BaseModel):
     username: str
     profile_picture: Optional[str] = None
     last_read_at: Optional[datetime] = None
+    last_read_message_id: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -48,6 +49,8 @@ class ConversationDetailResponse(BaseModel):
     participants: List[ConversationParticipantResponse]
     messages: List[MessageResponse]
     created_at: datetime
+    has_more: bool = False
+    next_before_id: Optional[int] = None  # Pass as `before_id` to load older messages
     
     class Config:
         from_attributes = True
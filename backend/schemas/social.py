@@ -101,6 +101,7 @@ class ActivityResponse(BaseModel):
     username: Optional[str] = None
     user_profile_picture: Optional[str] = None
     hike_name: Optional[str] = None
+    cursor: Optional[str] = None  # Pass as `before` to load the next feed page
 
     class Config:
         from_attributes = True
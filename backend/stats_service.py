@@ -0,0 +1,155 @@
+"""
+Per-user statistics rollup
+Keeps the user_stats table in step with sessions, reviews, follows and bookmarks
+so profile and statistics pages are a single primary-key read.
+Rebuild from source tables with: python stats_service.py rebuild [user_id]
+"""
+
+import sys
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.achievement import UserAchievement
+from models.bookmark import Bookmark
+from models.follow import Follow
+from models.hike_session import HikeSession
+from models.review import Review
+from models.user_stats import UserStats
+
+# Rollup columns that hold running totals
+COUNTER_COLUMNS = (
+    "total_hikes", "total_distance_km", "total_elevation_m", "total_duration_hours",
+    "total_reviews", "rating_sum", "achievements_earned",
+    "followers_count", "following_count", "bookmarks_count",
+)
+
+
+class StatsService:
+    """Maintain and read the user_stats rollup"""
+
+    # ---------- Write path ----------
+
+    def increment(self, db: Session, user_id: int, **deltas: float):
+        """
+        Add deltas to a user's counters in the caller's transaction, e.g.
+        increment(db, user_id, total_reviews=1, rating_sum=5).
+        A missing rollup row is rebuilt from source instead, which already
+        includes the pending change.
+        """
+        deltas = {column: value for column, value in deltas.items() if value}
+        unknown = set(deltas) - set(COUNTER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown statistics columns: {', '.join(sorted(unknown))}")
+        if not deltas:
+            return
+
+        db.flush()  # Make the pending change visible to a rebuild
+
+        updated = db.query(UserStats).filter(UserStats.user_id == user_id).update(
+            {getattr(UserStats, column): getattr(UserStats, column) + value for column, value in deltas.items()},
+            synchronize_session=False
+        )
+        if not updated:
+            self.rebuild(db, user_id)
+
+    def session_changed(self, db: Session, user_id: int, before: Dict[str, float], after: Dict[str, float]):
+        """Apply the difference between two session contributions"""
+        self.increment(db, user_id, **{
+            column: after.get(column, 0) - before.get(column, 0)
+            for column in set(before) | set(after)
+        })
+
+    @staticmethod
+    def session_contribution(session: Optional[HikeSession]) -> Dict[str, float]:
+        """What a hike session adds to its owner's totals (completed sessions only)"""
+        if session is None or session.is_active is not False:
+            return {}
+        return {
+            "total_hikes": 1,
+            "total_distance_km": session.distance_covered_km or 0,
+            "total_elevation_m": session.elevation_gain_m or 0,
+            "total_duration_hours": (session.duration_minutes or 0) / 60,
+        }
+
+    def rebuild(self, db: Session, user_id: int) -> UserStats:
+        """Recompute a user's rollup from the source tables"""
+        hikes = db.query(
+            func.count(HikeSession.id),
+            func.coalesce(func.sum(HikeSession.distance_covered_km), 0),
+            func.coalesce(func.sum(HikeSession.elevation_gain_m), 0),
+            func.coalesce(func.sum(HikeSession.duration_minutes), 0)
+        ).filter(
+            HikeSession.user_id == user_id,
+            HikeSession.is_active == False
+        ).one()
+
+        reviews = db.query(
+            func.count(Review.id),
+            func.coalesce(func.sum(Review.rating), 0)
+        ).filter(Review.user_id == user_id).one()
+
+        stats = UserStats(
+            user_id=user_id,
+            total_hikes=hikes[0],
+            total_distance_km=float(hikes[1]),
+            total_elevation_m=float(hikes[2]),
+            total_duration_hours=float(hikes[3]) / 60,
+            total_reviews=reviews[0],
+            rating_sum=float(reviews[1]),
+            achievements_earned=db.query(func.count(UserAchievement.id)).filter(
+                UserAchievement.user_id == user_id,
+                UserAchievement.completed == True
+            ).scalar(),
+            followers_count=db.query(func.count(Follow.id)).filter(Follow.following_id == user_id).scalar(),
+            following_count=db.query(func.count(Follow.id)).filter(Follow.follower_id == user_id).scalar(),
+            bookmarks_count=db.query(func.count(Bookmark.id)).filter(Bookmark.user_id == user_id).scalar()
+        )
+        return db.merge(stats)
+
+    def rebuild_all(self, db: Session) -> int:
+        """Recompute the rollup for every user, returns the number of users"""
+        from models.user import User
+
+        user_ids = [row[0] for row in db.query(User.id).all()]
+        for user_id in user_ids:
+            self.rebuild(db, user_id)
+        db.flush()
+        return len(user_ids)
+
+    # ---------- Read path ----------
+
+    def get(self, db: Session, user_id: int) -> UserStats:
+        """Load a user's rollup, building it on first access"""
+        stats = db.query(UserStats).filter(UserStats.user_id == user_id).populate_existing().first()
+        if stats is None:
+            stats = self.rebuild(db, user_id)
+            db.commit()
+        return stats
+
+
+# Singleton instance
+stats_service = StatsService()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    import models  # Register all mappers
+    from models import strava
+
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python stats_service.py rebuild [user_id]")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        if len(sys.argv) > 2:
+            stats_service.rebuild(db, int(sys.argv[2]))
+            print(f"✅ Rebuilt statistics for user {sys.argv[2]}")
+        else:
+            count = stats_service.rebuild_all(db)
+            print(f"✅ Rebuilt statistics for {count} users")
+        db.commit()
+    finally:
+        db.close()
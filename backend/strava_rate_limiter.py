@@ -0,0 +1,117 @@
+"""
+Shared Strava API quota
+Two token buckets, one per Strava rate-limit window (15 minutes and daily),
+shared by every thread that calls the API. Plugs into stravalib's
+rate_limiter hook, which runs after each request with the response headers.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from stravalib.util.limiter import get_rates_from_response_headers
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExhausted(Exception):
+    """The quota frees up later than STRAVA_SYNC_MAX_WAIT_SECONDS; retry the sync later"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket; not thread-safe on its own"""
+
+    def __init__(self, capacity: int, period_seconds: float):
+        self.capacity = capacity
+        self.rate = capacity / period_seconds
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def seconds_until_available(self) -> float:
+        """Time until at least one token is available"""
+        self.refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def limit_to(self, remaining: int):
+        """Lower the level to what the server reports as remaining"""
+        self.refill()
+        self.tokens = min(self.tokens, float(remaining))
+
+
+class StravaRateLimiter:
+    """Honour Strava's 15-minute and daily request quotas across threads"""
+
+    def __init__(self, short_limit: int, daily_limit: int):
+        self.short = TokenBucket(short_limit, 15 * 60)
+        self.daily = TokenBucket(daily_limit, 24 * 60 * 60)
+        self._condition = threading.Condition()
+        self._metrics = {"requests": 0, "throttled": 0, "wait_seconds": 0.0, "rejected": 0}
+
+    def wait_for_capacity(self, max_wait: Optional[float] = None) -> bool:
+        """
+        Block until a request may be issued without consuming a token.
+        Returns False without waiting when the quota frees up later than max_wait.
+        """
+        with self._condition:
+            waited = False
+            started = time.monotonic()
+            while True:
+                delay = max(self.short.seconds_until_available(), self.daily.seconds_until_available())
+                if delay <= 0:
+                    break
+                if max_wait is not None and time.monotonic() - started + delay > max_wait:
+                    self._metrics["rejected"] += 1
+                    return False
+                if not waited:
+                    self._metrics["throttled"] += 1
+                    waited = True
+                self._condition.wait(delay)
+            if waited:
+                self._metrics["wait_seconds"] += time.monotonic() - started
+            return True
+
+    def __call__(self, headers: Dict[str, str], method: str):
+        """
+        stravalib hook: count the request just made, then wait if the quota is spent.
+        Raises QuotaExhausted rather than hold a worker past STRAVA_SYNC_MAX_WAIT_SECONDS.
+        """
+        with self._condition:
+            self.short.refill()
+            self.daily.refill()
+            self.short.tokens -= 1
+            self.daily.tokens -= 1
+            self._metrics["requests"] += 1
+
+            # The server's view includes requests from other processes sharing the app
+            rates = get_rates_from_response_headers(headers, method)
+            if rates:
+                self.short.limit_to(rates.short_limit - rates.short_usage)
+                self.daily.limit_to(rates.long_limit - rates.long_usage)
+
+        # Hold this thread's next request (e.g. the next page) until a token is free
+        if not self.wait_for_capacity(max_wait=settings.STRAVA_SYNC_MAX_WAIT_SECONDS):
+            raise QuotaExhausted("Strava rate limit reached, retrying later")
+
+    def metrics(self) -> Dict[str, float]:
+        """Counters since start plus the current bucket levels"""
+        with self._condition:
+            self.short.refill()
+            self.daily.refill()
+            return {
+                **self._metrics,
+                "wait_seconds": round(self._metrics["wait_seconds"], 3),
+                "short_remaining": int(max(0, self.short.tokens)),
+                "daily_remaining": int(max(0, self.daily.tokens)),
+            }
+
+
+# Singleton instance, shared by every Strava client in this process
+strava_rate_limiter = StravaRateLimiter(settings.STRAVA_RATE_LIMIT_15MIN, settings.STRAVA_RATE_LIMIT_DAILY)
@@ -1,56 +1,156 @@
 """
 Background scheduler for automatic Strava activity syncing.
 Runs every hour to sync activities for users who have enabled auto-sync.
+Users are synced concurrently by a bounded worker pool, each worker with its
+own database session, while a shared token bucket keeps the whole run within
+Strava's API quotas.
 """
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import settings
 from database import SessionLocal
 from models.strava import StravaToken
 from strava_service import strava_service
+from strava_rate_limiter import QuotaExhausted, strava_rate_limiter
 import logging
+import threading
+import time
 from datetime import datetime
+from typing import Dict, Optional
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def sync_all_users():
+# Metrics of the most recent run, see sync_all_users()
+last_run_metrics: Optional[Dict] = None
+_metrics_lock = threading.Lock()
+_last_full_sync: Optional[float] = None
+
+
+def webhooks_active() -> bool:
+    """Whether Strava is pushing activity events to us"""
+    from strava_webhooks import active_subscription
+    
+    db = SessionLocal()
+    try:
+        return active_subscription(db) is not None
+    finally:
+        db.close()
+
+
+def scheduled_sync():
+    """
+    Hourly job: poll every user unless webhook events are arriving,
+    in which case only run a reconciling full sync every STRAVA_RECONCILE_HOURS
+    """
+    if _last_full_sync is not None and webhooks_active():
+        if time.monotonic() - _last_full_sync < settings.STRAVA_RECONCILE_HOURS * 3600:
+            logger.info("Strava webhook subscription active, skipping poll")
+            return
+    sync_all_users()
+
+
+def sync_user(user_id: int) -> Dict:
+    """Sync one user in a worker thread with its own database session"""
+    # Don't start a user whose first request could not go out within the allowed wait
+    if not strava_rate_limiter.wait_for_capacity(max_wait=settings.STRAVA_SYNC_MAX_WAIT_SECONDS):
+        return {"user_id": user_id, "status": "skipped"}
+    
+    db = SessionLocal()
+    try:
+        # Incremental sync from the user's cursor
+        activities = strava_service.sync_activities(user_id=user_id, db=db)
+    except QuotaExhausted:
+        # Ran out mid-sync; the cursor wasn't advanced, so the next run picks it up
+        db.rollback()
+        return {"user_id": user_id, "status": "skipped"}
+    else:
+        return {
+            "user_id": user_id,
+            "status": "synced",
+            "synced": len(activities),
+            "matched": sum(1 for a in activities if a.is_matched_to_trail)
+        }
+    finally:
+        db.close()
+
+
+def sync_all_users() -> Dict:
     """Sync activities for all users with auto-sync enabled"""
+    global last_run_metrics, _last_full_sync
+    
+    started = time.monotonic()
+    limiter_before = strava_rate_limiter.metrics()
+    metrics = {
+        "started_at": datetime.utcnow().isoformat(),
+        "users": 0,
+        "users_synced": 0,
+        "users_failed": 0,
+        "users_skipped": 0,
+        "activities_synced": 0,
+        "activities_matched": 0
+    }
+    
     db = SessionLocal()
     try:
-        # Get all tokens with auto-sync enabled
-        tokens = db.query(StravaToken).filter(
+        # Get all users with auto-sync enabled
+        user_ids = [row[0] for row in db.query(StravaToken.user_id).filter(
             StravaToken.sync_enabled == True
-        ).all()
-        
-        logger.info(f"Starting auto-sync for {len(tokens)} users")
-        
-        for token in tokens:
-            try:
-                logger.info(f"Syncing activities for user {token.user_id}")
-                
-                # Sync last 7 days of activities
-                result = strava_service.sync_activities(
-                    db=db,
-                    user_id=token.user_id,
-                    days=7  # Only sync recent activities to avoid rate limits
-                )
-                
-                logger.info(
-                    f"User {token.user_id}: Synced {result['synced']} activities, "
-                    f"matched {result['matched']} to trails"
-                )
-                
-            except Exception as e:
-                logger.error(f"Failed to sync user {token.user_id}: {str(e)}")
-                continue
-        
-        logger.info("Auto-sync completed")
-        
+        ).all()]
     except Exception as e:
         logger.error(f"Auto-sync failed: {str(e)}")
+        return metrics
     finally:
         db.close()
+    
+    metrics["users"] = len(user_ids)
+    logger.info(f"Starting auto-sync for {len(user_ids)} users with {settings.STRAVA_SYNC_WORKERS} workers")
+    
+    with ThreadPoolExecutor(max_workers=settings.STRAVA_SYNC_WORKERS, thread_name_prefix="strava-sync") as pool:
+        futures = {pool.submit(sync_user, user_id): user_id for user_id in user_ids}
+        
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                metrics["users_failed"] += 1
+                logger.error(f"Failed to sync user {user_id}: {str(e)}")
+                continue
+            
+            if result["status"] == "skipped":
+                metrics["users_skipped"] += 1
+                logger.warning(f"User {user_id}: skipped, Strava quota exhausted")
+                continue
+            
+            metrics["users_synced"] += 1
+            metrics["activities_synced"] += result["synced"]
+            metrics["activities_matched"] += result["matched"]
+            logger.info(
+                f"User {user_id}: Synced {result['synced']} activities, "
+                f"matched {result['matched']} to trails"
+            )
+    
+    elapsed = time.monotonic() - started
+    limiter_after = strava_rate_limiter.metrics()
+    metrics.update({
+        "duration_seconds": round(elapsed, 2),
+        "users_per_minute": round(metrics["users_synced"] / elapsed * 60, 2) if elapsed else 0.0,
+        "api_requests": limiter_after["requests"] - limiter_before["requests"],
+        "throttled": limiter_after["throttled"] - limiter_before["throttled"],
+        "throttle_wait_seconds": round(limiter_after["wait_seconds"] - limiter_before["wait_seconds"], 2),
+        "quota_short_remaining": limiter_after["short_remaining"],
+        "quota_daily_remaining": limiter_after["daily_remaining"]
+    })
+    
+    with _metrics_lock:
+        last_run_metrics = metrics
+        _last_full_sync = started
+    
+    logger.info(f"Auto-sync completed: {metrics}")
+    return metrics
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
@@ -59,7 +159,7 @@ def start_scheduler():
     """Start the background scheduler"""
     # Add job to run every hour
     scheduler.add_job(
-        func=sync_all_users,
+        func=scheduled_sync,
         trigger=IntervalTrigger(hours=1),
         id='strava_auto_sync',
         name='Sync Strava activities for all users',
@@ -4,16 +4,58 @@ Handles authentication, activity sync, and webhook events
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import os
 import requests
 from stravalib import Client
+from itertools import islice
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
+from config import settings
 from models.strava import StravaToken, StravaActivity
 from models.hike_session import HikeSession
-from models.hike import Hike
+from trail_matcher import trail_matcher
+from strava_rate_limiter import strava_rate_limiter
+from job_queue import JobFailed
+from utils.fingerprint import route_signature, same_length
 import json
 
+# Activity types we import
+SYNCED_ACTIVITY_TYPES = ('Hike', 'Walk', 'Trail Run', 'Run')
+
+# Activities written per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 200
+
+# Columns refreshed when an activity is synced again, and those whose change triggers the refresh
+UPSERT_CHANGE_COLUMNS = ('name', 'kudos_count', 'comment_count')
+UPSERT_UPDATE_COLUMNS = UPSERT_CHANGE_COLUMNS + ('updated_at',)
+
+
+def activity_type(strava_activity) -> Optional[str]:
+    """Activity type as a string; stravalib 2.x wraps it in a pydantic root model"""
+    value = strava_activity.type
+    return getattr(value, "root", value)
+
+
+def seconds(value) -> Optional[int]:
+    """Whole seconds from a stravalib Duration (an int) or a timedelta"""
+    if value is None:
+        return None
+    if hasattr(value, "total_seconds"):
+        return int(value.total_seconds())
+    return int(value)
+
+
+def latlng(value) -> Optional[Tuple[float, float]]:
+    """(lat, lng) from a stravalib LatLon model (or a plain pair), None if missing"""
+    if not value:
+        return None
+    if hasattr(value, "lat"):
+        return float(value.lat), float(value.lon)
+    return float(value[0]), float(value[1])
+
 class StravaService:
     """Service for Strava API integration"""
     
@@ -112,135 +154,237 @@ class StravaService:
         
         return token
     
-    def sync_activities(self, user_id: int, db: Session, after: datetime = None, limit: int = 100) -> List[StravaActivity]:
-        """Sync activities from Strava"""
+    def sync_activities(self, user_id: int, db: Session, after: datetime = None, limit: int = None) -> List[StravaActivity]:
+        """
+        Sync activities from Strava, returning the ones that were new or changed.
+        Without `after`, only activities newer than the user's sync cursor are
+        fetched; kudos and comments of older activities are refreshed on a
+        slower cadence (STRAVA_SOCIAL_REFRESH_HOURS).
+        """
         token = self.get_valid_token(user_id, db)
         
         if not token:
             raise ValueError("User not connected to Strava")
         
-        client = Client(access_token=token.access_token)
+        client = Client(access_token=token.access_token, rate_limiter=strava_rate_limiter)
+        now = datetime.utcnow()
         
-        # Default to last 30 days if no after date
         if not after:
-            after = datetime.utcnow() - timedelta(days=30)
+            after = self._sync_cursor(token, db)
+            
+            # Periodically widen the window to pick up new kudos and comments
+            refresh_due = not token.last_social_refresh or \
+                token.last_social_refresh < now - timedelta(hours=settings.STRAVA_SOCIAL_REFRESH_HOURS)
+            if refresh_due:
+                after = min(after, now - timedelta(days=settings.STRAVA_SOCIAL_REFRESH_DAYS))
+                token.last_social_refresh = now
         
-        # Fetch activities
-        activities = client.get_activities(after=after, limit=limit)
+        # Fetch activities (all pages unless limited), storing them a page at a time
+        activities = iter(client.get_activities(after=after, limit=limit))
         
         synced_activities = []
         
-        for activity in activities:
-            # Only sync hiking/walking activities
-            if activity.type not in ['Hike', 'Walk', 'Trail Run', 'Run']:
-                continue
-            
-            # Check if activity already exists
-            existing = db.query(StravaActivity).filter(
-                StravaActivity.strava_activity_id == str(activity.id)
-            ).first()
-            
-            if existing:
-                # Update existing activity
-                self._update_activity_from_strava(existing, activity, db)
-                synced_activities.append(existing)
-            else:
-                # Create new activity
-                new_activity = self._create_activity_from_strava(
-                    activity, token.id, user_id, db
-                )
-                synced_activities.append(new_activity)
+        while True:
+            page = list(islice(activities, UPSERT_BATCH_SIZE))
+            if not page:
+                break
+            synced_activities.extend(self._upsert_activities(page, token, db))
         
         # Update last synced time
-        token.last_synced = datetime.utcnow()
+        token.last_synced = now
         db.commit()
         
         return synced_activities
     
-    def _create_activity_from_strava(
-        self, 
-        strava_activity, 
-        token_id: int, 
-        user_id: int, 
-        db: Session
-    ) -> StravaActivity:
-        """Create StravaActivity from Strava API data"""
-        
-        activity = StravaActivity(
-            token_id=token_id,
-            user_id=user_id,
-            strava_activity_id=str(strava_activity.id),
-            name=strava_activity.name,
-            activity_type=strava_activity.type,
-            distance=float(strava_activity.distance) if strava_activity.distance else None,
-            moving_time=int(strava_activity.moving_time.total_seconds()) if strava_activity.moving_time else None,
-            elapsed_time=int(strava_activity.elapsed_time.total_seconds()) if strava_activity.elapsed_time else None,
-            total_elevation_gain=float(strava_activity.total_elevation_gain) if strava_activity.total_elevation_gain else None,
-            start_date=strava_activity.start_date,
-            start_date_local=strava_activity.start_date_local,
-            start_latlng=json.dumps(strava_activity.start_latlng) if strava_activity.start_latlng else None,
-            end_latlng=json.dumps(strava_activity.end_latlng) if strava_activity.end_latlng else None,
-            map_summary_polyline=strava_activity.map.summary_polyline if strava_activity.map else None,
-            average_speed=float(strava_activity.average_speed) if strava_activity.average_speed else None,
-            max_speed=float(strava_activity.max_speed) if strava_activity.max_speed else None,
-            average_heartrate=float(strava_activity.average_heartrate) if strava_activity.average_heartrate else None,
-            max_heartrate=float(strava_activity.max_heartrate) if strava_activity.max_heartrate else None,
-            calories=float(strava_activity.calories) if strava_activity.calories else None,
-            achievement_count=int(strava_activity.achievement_count) if strava_activity.achievement_count else 0,
-            kudos_count=int(strava_activity.kudos_count) if strava_activity.kudos_count else 0,
-            comment_count=int(strava_activity.comment_count) if strava_activity.comment_count else 0,
-            photo_count=int(strava_activity.total_photo_count) if strava_activity.total_photo_count else 0
-        )
+    def _sync_cursor(self, token: StravaToken, db: Session) -> datetime:
+        """
+        Start of the next incremental sync: the later of the newest activity we
+        hold and the last sync, minus an overlap for activities uploaded late
+        from a device
+        """
+        newest = db.query(func.max(StravaActivity.start_date)).filter(
+            StravaActivity.user_id == token.user_id
+        ).scalar()
+        marks = [
+            mark.replace(tzinfo=None) if mark.tzinfo is not None else mark
+            for mark in (newest, token.last_synced) if mark is not None
+        ]
+        
+        if not marks:
+            return datetime.utcnow() - timedelta(days=settings.STRAVA_INITIAL_SYNC_DAYS)
+        
+        return max(marks) - timedelta(hours=settings.STRAVA_SYNC_OVERLAP_HOURS)
+    
+    def sync_activity(self, user_id: int, strava_activity_id: int, db: Session) -> Optional[StravaActivity]:
+        """Fetch and store a single activity, e.g. in response to a webhook event"""
+        token = self.get_valid_token(user_id, db)
         
-        db.add(activity)
-        db.commit()
-        db.refresh(activity)
+        if not token:
+            raise ValueError("User not connected to Strava")
+        
+        client = Client(access_token=token.access_token, rate_limiter=strava_rate_limiter)
+        activity = client.get_activity(strava_activity_id)
         
-        # Try to match activity to existing trail
-        self._match_activity_to_trail(activity, db)
+        stored = self._upsert_activities([activity], token, db)
+        db.commit()
         
-        return activity
+        return stored[0] if stored else None
     
-    def _update_activity_from_strava(
-        self, 
-        activity: StravaActivity, 
-        strava_activity, 
-        db: Session
-    ):
-        """Update existing activity with latest Strava data"""
-        activity.name = strava_activity.name
-        activity.kudos_count = int(strava_activity.kudos_count) if strava_activity.kudos_count else 0
-        activity.comment_count = int(strava_activity.comment_count) if strava_activity.comment_count else 0
-        activity.updated_at = datetime.utcnow()
+    def delete_activity(self, strava_activity_id: int, db: Session) -> bool:
+        """Remove an activity that was deleted on Strava"""
+        activity = db.query(StravaActivity).filter(
+            StravaActivity.strava_activity_id == str(strava_activity_id)
+        ).first()
         
+        if not activity:
+            return False
+        
+        db.delete(activity)
         db.commit()
+        return True
     
-    def _match_activity_to_trail(self, activity: StravaActivity, db: Session):
-        """Try to match Strava activity to a trail in our database"""
-        if not activity.start_latlng:
+    def _upsert_activities(self, strava_activities, token: StravaToken, db: Session) -> List[StravaActivity]:
+        """
+        Store a page of Strava activities in the caller's transaction:
+        one IN lookup for which already exist, one INSERT ... ON CONFLICT for
+        the page, then a batched trail-matching pass over the new ones.
+        Returns new and changed activities; other sports are ignored.
+        """
+        rows = {}
+        for strava_activity in strava_activities:
+            # Only sync hiking/walking activities
+            if activity_type(strava_activity) in SYNCED_ACTIVITY_TYPES:
+                values = self._activity_values(strava_activity, token)
+                rows[values["strava_activity_id"]] = values
+        
+        if not rows:
+            return []
+        
+        existing_ids = {
+            row[0] for row in db.query(StravaActivity.strava_activity_id).filter(
+                StravaActivity.strava_activity_id.in_(list(rows))
+            ).all()
+        }
+        
+        insert = self._dialect_insert(db)
+        if insert is not None:
+            stmt = insert(StravaActivity).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[StravaActivity.strava_activity_id],
+                set_={column: stmt.excluded[column] for column in UPSERT_UPDATE_COLUMNS},
+                # Skip the write (and the returned row) when nothing we refresh has changed
+                where=or_(*[
+                    getattr(StravaActivity, column).is_distinct_from(stmt.excluded[column])
+                    for column in UPSERT_CHANGE_COLUMNS
+                ])
+            ).returning(StravaActivity)
+            stored = list(db.scalars(stmt, execution_options={"populate_existing": True}))
+        else:
+            # Dialects without ON CONFLICT: plain inserts plus executemany updates
+            db.add_all([StravaActivity(**values) for key, values in rows.items() if key not in existing_ids])
+            db.flush()
+            stored = []
+            for activity in db.query(StravaActivity).filter(StravaActivity.strava_activity_id.in_(list(rows))).all():
+                values = rows[activity.strava_activity_id]
+                if activity.strava_activity_id not in existing_ids:
+                    stored.append(activity)
+                elif any(getattr(activity, column) != values[column] for column in UPSERT_CHANGE_COLUMNS):
+                    for column in UPSERT_UPDATE_COLUMNS:
+                        setattr(activity, column, values[column])
+                    stored.append(activity)
+        
+        # Try to match new activities to existing trails
+        new_activities = [activity for activity in stored if activity.strava_activity_id not in existing_ids]
+        self._match_activities_to_trails(new_activities, db)
+        self._link_imported_sessions(new_activities, token, db)
+        
+        return stored
+    
+    @staticmethod
+    def _dialect_insert(db: Session):
+        """INSERT construct supporting ON CONFLICT for the session's database, if any"""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql_insert
+        if dialect == "sqlite":
+            return sqlite_insert
+        return None
+    
+    @staticmethod
+    def _activity_values(strava_activity, token: StravaToken) -> Dict:
+        """Column values for a StravaActivity from Strava API data"""
+        now = datetime.utcnow()
+        start_latlng = latlng(strava_activity.start_latlng)
+        end_latlng = latlng(strava_activity.end_latlng)
+        return {
+            "token_id": token.id,
+            "user_id": token.user_id,
+            "strava_activity_id": str(strava_activity.id),
+            "name": strava_activity.name,
+            "activity_type": activity_type(strava_activity),
+            "distance": float(strava_activity.distance) if strava_activity.distance else None,
+            "moving_time": seconds(strava_activity.moving_time),
+            "elapsed_time": seconds(strava_activity.elapsed_time),
+            "total_elevation_gain": float(strava_activity.total_elevation_gain) if strava_activity.total_elevation_gain else None,
+            "start_date": strava_activity.start_date,
+            "start_date_local": strava_activity.start_date_local,
+            "start_latlng": json.dumps(start_latlng) if start_latlng else None,
+            "end_latlng": json.dumps(end_latlng) if end_latlng else None,
+            "map_summary_polyline": strava_activity.map.summary_polyline if strava_activity.map else None,
+            "route_signature": route_signature(strava_activity.start_date, *start_latlng) if start_latlng else None,
+            "average_speed": float(strava_activity.average_speed) if strava_activity.average_speed else None,
+            "max_speed": float(strava_activity.max_speed) if strava_activity.max_speed else None,
+            "average_heartrate": float(strava_activity.average_heartrate) if strava_activity.average_heartrate else None,
+            "max_heartrate": float(strava_activity.max_heartrate) if strava_activity.max_heartrate else None,
+            # Only on DetailedActivity; activity lists return SummaryActivity
+            "calories": float(strava_activity.calories) if getattr(strava_activity, "calories", None) else None,
+            "achievement_count": int(strava_activity.achievement_count) if strava_activity.achievement_count else 0,
+            "kudos_count": int(strava_activity.kudos_count) if strava_activity.kudos_count else 0,
+            "comment_count": int(strava_activity.comment_count) if strava_activity.comment_count else 0,
+            "photo_count": int(strava_activity.total_photo_count) if strava_activity.total_photo_count else 0,
+            "imported_at": now,
+            "updated_at": now,
+            "is_matched_to_trail": False
+        }
+    
+    def _match_activities_to_trails(self, activities: List[StravaActivity], db: Session):
+        """Try to match activities to trails in our database; saved with the caller's flush"""
+        if not activities:
             return
         
         try:
-            start_coords = json.loads(activity.start_latlng)
-            if len(start_coords) != 2:
-                return
-            
-            lat, lng = start_coords
-            
-            # Find trails within ~5km radius
-            trails = db.query(Hike).filter(
-                Hike.latitude.between(lat - 0.05, lat + 0.05),
-                Hike.longitude.between(lng - 0.05, lng + 0.05)
-            ).all()
-            
-            if len(trails) == 1:
-                # Only one trail nearby, likely a match
+            matches = trail_matcher.match_many(db, activities)
+        except Exception as e:
+            print(f"Error matching activities to trails: {e}")
+            return
+        
+        for activity, match in zip(activities, matches):
+            if match:
                 activity.is_matched_to_trail = True
-                activity.matched_hike_id = trails[0].id
-                db.commit()
+                activity.matched_hike_id = match[0]
+    
+    def _link_imported_sessions(self, activities: List[StravaActivity], token: StravaToken, db: Session):
+        """
+        Link new activities to sessions the user already imported from a file
+        of the same recording (same route signature and length), instead of
+        treating them as separate hikes; saved with the caller's flush
+        """
+        by_signature = {
+            activity.route_signature: activity for activity in activities
+            if activity.route_signature and activity.hike_session_id is None
+        }
+        if not by_signature:
+            return
         
-        except Exception as e:
-            print(f"Error matching activity to trail: {e}")
+        sessions = db.query(HikeSession.id, HikeSession.route_signature, HikeSession.distance_covered_km).filter(
+            HikeSession.user_id == token.user_id,
+            HikeSession.route_signature.in_(list(by_signature)),
+            ~HikeSession.strava_activity.has()
+        ).all()
+        for session_id, signature, distance_km in sessions:
+            activity = by_signature.pop(signature, None)
+            if activity and same_length(distance_km, (activity.distance or 0) / 1000):
+                activity.hike_session_id = session_id
     
     def disconnect_strava(self, user_id: int, db: Session) -> bool:
         """Disconnect Strava account"""
@@ -262,6 +406,17 @@ class StravaService:
         
         return True
     
+    def deauthorize_athlete(self, athlete_id: int, db: Session) -> bool:
+        """Forget an athlete who revoked access on Strava's side"""
+        token = db.query(StravaToken).filter(StravaToken.athlete_id == athlete_id).first()
+        
+        if not token:
+            return False
+        
+        db.delete(token)
+        db.commit()
+        return True
+    
     def get_user_stats(self, user_id: int, db: Session) -> Dict:
         """Get user's Strava activity statistics"""
         activities = db.query(StravaActivity).filter(
@@ -285,3 +440,18 @@ class StravaService:
 
 # Singleton instance
 strava_service = StravaService()
+
+
+def run_sync_job(db: Session, job, payload: Dict) -> Dict:
+    """Job handler for POST /api/strava/sync"""
+    days = payload.get("days")
+    after = datetime.utcnow() - timedelta(days=days) if days else None
+    try:
+        activities = strava_service.sync_activities(user_id=job.user_id, db=db, after=after)
+    except ValueError as e:
+        raise JobFailed(str(e))
+    
+    return {
+        "synced_count": len(activities),
+        "message": f"Synced {len(activities)} activities" + (f" from the last {days} days" if days else "")
+    }
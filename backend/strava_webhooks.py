@@ -0,0 +1,253 @@
+"""
+Strava webhook ingestion
+Strava pushes an event per created, updated or deleted activity (and per
+athlete deauthorization) to /api/strava/webhook. Events are queued and worked
+off by background threads, each fetching just the one activity involved, so
+the cost follows new activities instead of users x days of polling.
+
+Usage:
+    python strava_webhooks.py subscribe <callback_url>
+    python strava_webhooks.py unsubscribe
+    python strava_webhooks.py status
+    python strava_webhooks.py emit <callback_url> <athlete_id> <activity_id> [create|update|delete]
+"""
+
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models.strava import StravaToken, StravaWebhookSubscription
+from strava_service import strava_service
+
+logger = logging.getLogger(__name__)
+
+PUSH_SUBSCRIPTIONS_URL = "https://www.strava.com/api/v3/push_subscriptions"
+
+
+class StravaEventQueue:
+    """Work off webhook events on background threads, one database session per worker"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._metrics = {"received": 0, "duplicates": 0, "processed": 0, "failed": 0}
+
+    def enqueue(self, event: dict) -> bool:
+        """Queue an event; returns False if the same event is already waiting"""
+        key = self._key(event)
+        with self._lock:
+            self._metrics["received"] += 1
+            if key in self._pending:
+                self._metrics["duplicates"] += 1
+                return False
+            self._pending.add(key)
+            self._start()
+        self._queue.put(event)
+        return True
+
+    def join(self):
+        """Block until every queued event has been handled"""
+        self._queue.join()
+
+    def stop(self):
+        """Finish queued events and stop the workers"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "queued": self._queue.qsize()}
+
+    def process(self, event: dict, db: Session):
+        """Apply one Strava event"""
+        object_type = event.get("object_type")
+        aspect_type = event.get("aspect_type")
+        owner_id = event.get("owner_id")
+        object_id = event.get("object_id")
+        updates = event.get("updates") or {}
+
+        if object_type == "athlete":
+            if str(updates.get("authorized")).lower() == "false":
+                strava_service.deauthorize_athlete(owner_id, db)
+            return
+
+        if object_type != "activity":
+            return
+
+        token = db.query(StravaToken).filter(StravaToken.athlete_id == owner_id).first()
+        if not token or not token.sync_enabled:
+            return
+
+        if aspect_type == "delete":
+            strava_service.delete_activity(object_id, db)
+        elif aspect_type in ("create", "update"):
+            strava_service.sync_activity(token.user_id, object_id, db)
+
+    def _start(self):
+        """Start worker threads on first use (caller holds the lock)"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"strava-webhook-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is None:
+                    return
+                db = SessionLocal()
+                try:
+                    self.process(event, db)
+                    outcome = "processed"
+                except Exception as e:
+                    db.rollback()
+                    outcome = "failed"
+                    logger.error(f"Strava webhook event {event} failed: {e}")
+                finally:
+                    db.close()
+                with self._lock:
+                    self._metrics[outcome] += 1
+                    self._pending.discard(self._key(event))
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _key(event: dict):
+        return event.get("object_type"), event.get("object_id"), event.get("aspect_type")
+
+
+# ---------- Subscription management ----------
+
+def active_subscription(db: Session) -> Optional[StravaWebhookSubscription]:
+    """The subscription Strava is currently pushing to, if any"""
+    return db.query(StravaWebhookSubscription).filter(
+        StravaWebhookSubscription.is_active == True
+    ).order_by(StravaWebhookSubscription.created_at.desc()).first()
+
+
+def create_subscription(callback_url: str, db: Session) -> StravaWebhookSubscription:
+    """
+    Ask Strava to push events to callback_url.
+    Strava validates the callback with a GET handshake before answering,
+    so the API must already be reachable at that URL.
+    """
+    response = requests.post(PUSH_SUBSCRIPTIONS_URL, data={
+        "client_id": strava_service.client_id,
+        "client_secret": strava_service.client_secret,
+        "callback_url": callback_url,
+        "verify_token": settings.STRAVA_WEBHOOK_VERIFY_TOKEN
+    }, timeout=30)
+    response.raise_for_status()
+
+    subscription = StravaWebhookSubscription(
+        subscription_id=response.json()["id"],
+        callback_url=callback_url,
+        verify_token=settings.STRAVA_WEBHOOK_VERIFY_TOKEN
+    )
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+
+def delete_subscription(db: Session) -> bool:
+    """Stop Strava pushing events and fall back to polling"""
+    subscription = active_subscription(db)
+    if not subscription:
+        return False
+
+    response = requests.delete(f"{PUSH_SUBSCRIPTIONS_URL}/{subscription.subscription_id}", params={
+        "client_id": strava_service.client_id,
+        "client_secret": strava_service.client_secret
+    }, timeout=30)
+    if response.status_code not in (204, 404):
+        response.raise_for_status()
+
+    subscription.is_active = False
+    db.commit()
+    return True
+
+
+# ---------- Local stand-in for Strava ----------
+
+def emit_event(
+    callback_url: str,
+    owner_id: int,
+    object_id: int,
+    aspect_type: str = "create",
+    object_type: str = "activity",
+    updates: Optional[dict] = None,
+    subscription_id: int = 0
+) -> requests.Response:
+    """POST an event shaped like Strava's to a webhook callback, for local testing"""
+    return requests.post(callback_url, json={
+        "aspect_type": aspect_type,
+        "event_time": int(time.time()),
+        "object_id": object_id,
+        "object_type": object_type,
+        "owner_id": owner_id,
+        "subscription_id": subscription_id,
+        "updates": updates or {}
+    }, timeout=10)
+
+
+def emit_handshake(callback_url: str, verify_token: str = None) -> bool:
+    """Run Strava's subscription validation against a callback, for local testing"""
+    challenge = f"kilele-{int(time.time())}"
+    response = requests.get(callback_url, params={
+        "hub.mode": "subscribe",
+        "hub.challenge": challenge,
+        "hub.verify_token": verify_token or settings.STRAVA_WEBHOOK_VERIFY_TOKEN
+    }, timeout=10)
+    return response.ok and response.json().get("hub.challenge") == challenge
+
+
+# Global instance
+strava_event_queue = StravaEventQueue(settings.STRAVA_WEBHOOK_WORKERS)
+
+
+if __name__ == "__main__":
+    import models  # Register all mappers
+    from models import strava
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    db = SessionLocal()
+    try:
+        if command == "subscribe" and len(sys.argv) == 3:
+            subscription = create_subscription(sys.argv[2], db)
+            print(f"✅ Subscribed (id {subscription.subscription_id}) -> {subscription.callback_url}")
+        elif command == "unsubscribe":
+            print("✅ Unsubscribed" if delete_subscription(db) else "ℹ️  No active subscription")
+        elif command == "status":
+            subscription = active_subscription(db)
+            print(f"Active subscription {subscription.subscription_id} -> {subscription.callback_url}"
+                  if subscription else "No active subscription (hourly polling in use)")
+        elif command == "emit" and len(sys.argv) in (5, 6):
+            subscription = active_subscription(db)
+            response = emit_event(
+                sys.argv[2], int(sys.argv[3]), int(sys.argv[4]),
+                aspect_type=sys.argv[5] if len(sys.argv) == 6 else "create",
+                subscription_id=subscription.subscription_id if subscription else 0
+            )
+            print(f"{response.status_code} {response.text}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+    finally:
+        db.close()
@@ -0,0 +1,114 @@
+"""
+Shared fixtures: the backend modules run against a scratch SQLite database,
+configured before config.py and database.py are first imported.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+_scratch = tempfile.mkdtemp(prefix="kilele-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["JOB_UPLOAD_DIR"] = os.path.join(_scratch, "job_uploads")
+os.environ.setdefault("DEBUG", "False")
+
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(BACKEND / "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Create every table once for the test session"""
+    from database import init_database
+    # Import all models so every table and relationship is registered
+    import models  # noqa: F401
+    from models import strava  # noqa: F401
+
+    init_database()
+
+
+@pytest.fixture
+def db(database):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Factory for committed users with unique names"""
+    import uuid
+    from models.user import User
+
+    def make_user(**values) -> User:
+        name = f"hiker-{uuid.uuid4().hex[:8]}"
+        user = User(**{"username": name, "email": f"{name}@example.com", "hashed_password": "x", **values})
+        db.add(user)
+        db.commit()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def make_hike(db):
+    """Factory for committed hikes"""
+    from models.hike import Hike
+
+    def make_hike(**values) -> Hike:
+        hike = Hike(**{
+            "name": "Ngong Hills",
+            "location": "Kajiado",
+            "difficulty": "Moderate",
+            "distance_km": 12.0,
+            "estimated_duration_hours": 4.0,
+            **values
+        })
+        db.add(hike)
+        db.commit()
+        return hike
+
+    return make_hike
+
+
+def auth_headers(user) -> dict:
+    """Bearer headers with a valid access token for user"""
+    from auth import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+
+
+@pytest.fixture
+def client():
+    """TestClient without the startup hooks, so no background workers run"""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+
+@contextmanager
+def count_statements():
+    """Count the SQL statements run inside the block; yields a list holding them"""
+    from sqlalchemy import event
+    from database import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
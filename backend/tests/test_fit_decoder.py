@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from bench_fit_decoder import synthetic_fit
+from utils.fit_decoder import FIT_EPOCH, FitFormatError, decode_fit
+from utils.wearable_parser import WearableDataParser
+
+
+def assert_matches_fitparse(data: bytes):
+    fast = decode_fit(data)
+    reference = WearableDataParser._parse_fit_fitparse(data, max_points=None)
+
+    for column in ("latitude", "longitude", "elevation", "time"):
+        np.testing.assert_allclose(getattr(fast.track, column), getattr(reference.track, column))
+    np.testing.assert_array_equal(fast.heart_rate, reference.heart_rate)
+    for key in ("total_distance", "total_elapsed_time", "total_timer_time", "total_calories"):
+        if key in reference.session:
+            assert fast.session[key] == pytest.approx(reference.session[key])
+    return fast
+
+
+def test_matches_fitparse():
+    fast = assert_matches_fitparse(synthetic_fit(1000))
+
+    # The first three records have no position fix and are dropped
+    assert len(fast.track.latitude) == 997
+    assert fast.track.time[0] == 1_100_000_000 + 3 + FIT_EPOCH
+
+
+def test_matches_fitparse_with_compressed_timestamps():
+    fast = assert_matches_fitparse(synthetic_fit(700, compressed_every=4))
+
+    assert np.all(np.diff(fast.track.time) == 1)
+
+
+def test_chained_segments_are_concatenated():
+    single = decode_fit(synthetic_fit(100))
+    chained = decode_fit(synthetic_fit(100) + synthetic_fit(100, seed=8))
+
+    assert len(chained.track.latitude) == 2 * len(single.track.latitude)
+    np.testing.assert_array_equal(chained.track.latitude[:97], single.track.latitude)
+
+
+def test_max_points_limits_records():
+    with pytest.raises(ValueError):
+        decode_fit(synthetic_fit(100), max_points=50)
+    assert len(decode_fit(synthetic_fit(100), max_points=100).track.latitude) == 97
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"\x0e\x20", "too short"),
+    (b"<?xml version='1.0'?><TrainingCenterDatabase/>", "Not a FIT file"),
+])
+def test_rejects_non_fit_data(data, message):
+    with pytest.raises(FitFormatError, match=message):
+        decode_fit(data)
+
+
+def test_rejects_truncated_file():
+    with pytest.raises(FitFormatError, match="truncated"):
+        decode_fit(synthetic_fit(100)[:-200])
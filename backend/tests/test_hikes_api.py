@@ -0,0 +1,57 @@
+from conftest import auth_headers
+
+
+def get(client, url, etag=None):
+    return client.get(url, headers={"If-None-Match": etag} if etag else {})
+
+
+def test_matching_etag_gets_304(client, make_hike):
+    hike = make_hike()
+
+    for url in ("/api/v1/hikes", f"/api/v1/hikes/{hike.id}"):
+        first = get(client, url)
+        assert first.status_code == 200
+        revalidated = get(client, url, first.headers["etag"])
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == first.headers["etag"]
+        assert not revalidated.content
+
+
+def test_review_changes_only_its_hike_version(client, make_user, make_hike):
+    reviewed, other = make_hike(), make_hike()
+    etags = {url: get(client, url).headers["etag"] for url in (
+        "/api/v1/hikes", f"/api/v1/hikes/{reviewed.id}", f"/api/v1/hikes/{other.id}"
+    )}
+
+    response = client.post(
+        "/api/v1/social/reviews", json={"hike_id": reviewed.id, "rating": 5}, headers=auth_headers(make_user())
+    )
+    assert response.status_code == 201, response.text
+
+    # Lists show ratings, so they change too; other hikes stay cached
+    assert get(client, "/api/v1/hikes", etags["/api/v1/hikes"]).status_code == 200
+    assert get(client, f"/api/v1/hikes/{reviewed.id}", etags[f"/api/v1/hikes/{reviewed.id}"]).status_code == 200
+    assert get(client, f"/api/v1/hikes/{other.id}", etags[f"/api/v1/hikes/{other.id}"]).status_code == 304
+
+
+TRAIL = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"  # Three points from the polyline format documentation
+HIKE = {"name": "Ngong Hills", "location": "Kajiado", "difficulty": "Moderate", "distance_km": 12, "estimated_duration_hours": 4}
+
+
+def test_route_polyline_only_in_hike_detail(client):
+    created = client.post("/api/v1/hikes", json={**HIKE, "route_polyline": TRAIL})
+    assert created.status_code == 201, created.text
+    hike_id = created.json()["id"]
+
+    assert client.get(f"/api/v1/hikes/{hike_id}").json()["route_polyline"] == TRAIL
+    listed = next(hike for hike in client.get("/api/v1/hikes?limit=1000").json() if hike["id"] == hike_id)
+    assert "route_polyline" not in listed
+
+
+def test_invalid_route_polyline_is_rejected(client, make_hike):
+    hike = make_hike()
+
+    for polyline in ("_p~iF~ps|U_ulLnnqC_mqNvxq", "?", "not a polyline!"):
+        assert client.post("/api/v1/hikes", json={**HIKE, "route_polyline": polyline}).status_code == 422
+        assert client.put(f"/api/v1/hikes/{hike.id}", json={"route_polyline": polyline}).status_code == 422
+    assert client.put(f"/api/v1/hikes/{hike.id}", json={"route_polyline": TRAIL}).status_code == 200
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.testclient import TestClient
+
+from http_encoding import CompressionMiddleware, FastJSONResponse, brotli, negotiate
+from main import app
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br; q=0.9, gzip;q=0.9", "br"),
+    ("GZIP", "gzip"),
+    ("*", "br"),
+    ("*;q=0.2, br;q=0", "gzip"),
+    ("gzip;q=0, identity", None),
+    ("deflate", None),
+    ("gzip;q=abc", None),
+])
+def test_negotiate(header, expected):
+    assert negotiate(header, ("br", "gzip")) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    def large():
+        return Response("x" * 1000, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" * 500, media_type="image/png")
+
+    @app.get("/text")
+    def text():
+        return PlainTextResponse("trail " * 200)
+
+    return TestClient(app)
+
+
+def test_compresses_large_json_with_gzip(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < 1000
+    assert response.text == "x" * 1000
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_prefers_brotli(client):
+    response = client.get("/text", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == "trail " * 200
+
+
+@pytest.mark.parametrize("path, accept", [
+    ("/small", "gzip"),
+    ("/image", "gzip"),
+    ("/large", "identity"),
+])
+def test_leaves_response_uncompressed(client, path, accept):
+    response = client.get(path, headers={"Accept-Encoding": accept})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_fast_json_response_renders_non_string_keys_and_sets():
+    body = FastJSONResponse({"histogram": {1: 0, 5: 2}, "tags": {"forest"}}).body
+
+    assert body == b'{"histogram":{"1":0,"5":2},"tags":["forest"]}'
+
+
+
+def test_api_response_is_compressed_and_renders_datetimes(make_hike):
+    hike = make_hike(description="A ridge walk with views of the Rift Valley. " * 40)
+
+    response = TestClient(app).get(f"/api/v1/hikes/{hike.id}", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(hike.description)
+    body = response.json()
+    assert body["description"] == hike.description
+    assert datetime.fromisoformat(body["created_at"]).replace(tzinfo=None) == hike.created_at.replace(tzinfo=None)
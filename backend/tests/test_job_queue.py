@@ -0,0 +1,200 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue as job_queue_module
+from job_queue import JobFailed, JobQueue
+from models.job import Job
+
+
+@pytest.fixture
+def queue(db, monkeypatch):
+    """A JobQueue with a "test" job type whose handler each test sets"""
+    db.query(Job).delete()
+    db.commit()
+    monkeypatch.setitem(job_queue_module.JOB_HANDLERS, "test", "tests:unused")
+    queue = JobQueue(workers=4)
+    queue.max_attempts = 3
+    queue.backoff_seconds = 10
+    yield queue
+    queue.stop()
+
+
+def handle(queue, handler):
+    queue._handlers["test"] = handler
+
+
+def reload(db, job_id):
+    db.expire_all()
+    return db.get(Job, job_id)
+
+
+def test_run_next_runs_job_and_stores_result(queue, db):
+    handle(queue, lambda db, job, payload: {"doubled": payload["value"] * 2})
+    job = queue.enqueue(db, "test", {"value": 21})
+
+    assert queue.run_next()
+    job = reload(db, job.id)
+    assert job.status == "succeeded"
+    assert job.result == '{"doubled": 42}'
+    assert job.attempts == 1
+    assert job.finished_at is not None
+    assert not queue.run_next()
+
+
+def test_concurrent_workers_claim_each_job_once(queue, db):
+    runs = []
+    handle(queue, lambda db, job, payload: runs.append(payload["n"]))
+    for n in range(20):
+        queue.enqueue(db, "test", {"n": n})
+
+    # Start the workers together so their candidate reads and claims overlap
+    start = threading.Barrier(4)
+
+    def worker():
+        start.wait()
+        while queue.run_next():
+            pass
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(runs) == list(range(20))
+    assert db.query(Job).filter(Job.status == "succeeded").count() == 20
+
+
+def test_claim_skips_job_taken_by_another_worker(queue, db):
+    handle(queue, lambda db, job, payload: None)
+    first = queue.enqueue(db, "test")
+    second = queue.enqueue(db, "test")
+
+    claimed = queue._claim(db)
+    assert claimed.id == first.id
+
+    # A second worker's claim never returns the running job
+    from database import SessionLocal
+    other = SessionLocal()
+    try:
+        assert queue._claim(other).id == second.id
+        assert queue._claim(other) is None
+    finally:
+        other.close()
+
+
+def test_failed_attempts_back_off_exponentially(queue, db):
+    def fail(db, job, payload):
+        raise ValueError("device offline")
+
+    handle(queue, fail)
+    job = queue.enqueue(db, "test")
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        before = datetime.utcnow()
+        assert queue.run_next()
+        job = reload(db, job.id)
+        assert job.status == "queued"
+        assert job.attempts == attempt
+        assert job.error == "device offline"
+        assert before + timedelta(seconds=delay - 1) <= job.run_after <= datetime.utcnow() + timedelta(seconds=delay)
+        assert job.finished_at is None
+
+        # Not due yet
+        assert not queue.run_next()
+        job.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    assert queue.run_next()
+    job = reload(db, job.id)
+    assert job.status == "failed"
+    assert job.attempts == 3
+    assert job.finished_at is not None
+    assert queue.metrics()["retried"] == 2
+    assert queue.metrics()["failed"] == 1
+
+
+def test_job_failed_is_not_retried(queue, db):
+    def reject(db, job, payload):
+        raise JobFailed("unsupported file")
+
+    handle(queue, reject)
+    job = queue.enqueue(db, "test")
+
+    assert queue.run_next()
+    job = reload(db, job.id)
+    assert job.status == "failed"
+    assert job.attempts == 1
+    assert job.error == "unsupported file"
+
+
+def test_dedupe_matches_type_owner_and_payload(queue, db):
+    first = queue.enqueue(db, "test", {"days": 7}, user_id=1, dedupe=True)
+
+    assert queue.enqueue(db, "test", {"days": 7}, user_id=1, dedupe=True).id == first.id
+    assert queue.enqueue(db, "test", {"days": 30}, user_id=1, dedupe=True).id != first.id
+    assert queue.enqueue(db, "test", {"days": 7}, user_id=2, dedupe=True).id != first.id
+    assert queue.enqueue(db, "test", {"days": 7}, user_id=1).id != first.id
+
+
+def test_recover_requeues_timed_out_jobs(queue, db):
+    stale = queue.enqueue(db, "test")
+    fresh = queue.enqueue(db, "test")
+    for job, started in ((stale, queue.timeout + timedelta(minutes=1)), (fresh, timedelta(minutes=1))):
+        job.status = "running"
+        job.started_at = datetime.utcnow() - started
+    db.commit()
+
+    assert queue.recover(db) == 1
+    assert reload(db, stale.id).status == "queued"
+    assert reload(db, fresh.id).status == "running"
+
+
+def test_attempt_requeued_while_running_does_not_finish_job(queue, db):
+    def outlive_timeout(db, job, payload):
+        # The job overruns and recover() hands it to another worker meanwhile
+        job.started_at = datetime.utcnow() - queue.timeout - timedelta(minutes=1)
+        db.commit()
+        queue.recover(db)
+        return {"done": True}
+
+    handle(queue, outlive_timeout)
+    job = queue.enqueue(db, "test")
+
+    assert queue.run_next()
+    job = reload(db, job.id)
+    assert job.status == "queued"
+    assert job.result is None
+    assert job.finished_at is None
+
+
+def test_idle_worker_wakes_for_new_job(queue, db):
+    ran = threading.Event()
+    handle(queue, lambda db, job, payload: ran.set())
+    queue.workers = 1
+    queue.poll_seconds = 30
+    queue.start()
+    time.sleep(0.2)  # Let the worker go idle
+
+    queue.enqueue(db, "test")
+    assert ran.wait(5)
+
+
+def test_scheduled_job_is_enqueued_once_per_interval(queue, db):
+    queue.schedule("test", 0.05)
+
+    queue._housekeeping()
+    assert db.query(Job).count() == 0
+
+    time.sleep(0.1)
+    queue._housekeeping()
+    queue._housekeeping()
+    assert db.query(Job).filter(Job.job_type == "test", Job.status == "queued").count() == 1
+
+    # Still queued when due again, so dedupe skips it
+    time.sleep(0.1)
+    queue._housekeeping()
+    assert db.query(Job).count() == 1
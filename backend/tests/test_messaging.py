@@ -0,0 +1,85 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import count_statements
+from main import app
+from models.user import User
+from routers.auth import get_current_active_user
+
+
+@pytest.fixture
+def users(db):
+    created = []
+    for _ in range(2):
+        name = f"hiker-{uuid.uuid4().hex[:8]}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+        created.append(user)
+    db.commit()
+    return created
+
+
+@pytest.fixture
+def client_as(db):
+    """TestClient factory authenticated as the given user"""
+    def client_as(user):
+        app.dependency_overrides[get_current_active_user] = lambda: db.merge(user)
+        return client
+
+    client = TestClient(app)
+    yield client_as
+    app.dependency_overrides.clear()
+
+
+def send(client, recipient, content):
+    response = client.post("/api/v1/messages/send", json={"recipient_id": recipient.id, "content": content})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_read_state_follows_message_ids_within_one_second(users, client_as):
+    alice, bob = users
+
+    # All sent within the same second, so their timestamps can tie
+    sent = [send(client_as(alice), bob, f"message {i}") for i in range(3)]
+    assert not any(message["is_read"] for message in sent)
+    conversation_id = sent[0]["conversation_id"]
+
+    opened = client_as(bob).get(f"/api/v1/messages/conversations/{conversation_id}").json()
+    assert all(message["is_read"] for message in opened["messages"])
+
+    late = send(client_as(alice), bob, "one more")
+    assert late["is_read"] is False
+
+    bob_view = client_as(bob).get("/api/v1/messages/conversations").json()
+    conversation = next(c for c in bob_view if c["id"] == conversation_id)
+    assert conversation["unread_count"] == 1
+    assert conversation["last_message"]["is_read"] is False
+
+    alice_view = client_as(alice).get(f"/api/v1/messages/conversations/{conversation_id}").json()
+    assert [message["is_read"] for message in alice_view["messages"]] == [True, True, True, False]
+
+
+def test_inbox_unread_counts_take_constant_queries(db, client_as, make_user):
+    reader = make_user()
+    senders = [make_user() for _ in range(3)]
+
+    def inbox():
+        client = client_as(reader)
+        with count_statements() as statements:
+            conversations = client.get("/api/v1/messages/conversations").json()
+        return conversations, len(statements)
+
+    send(client_as(senders[0]), reader, "hello")
+    _, single_conversation_statements = inbox()
+
+    for count, sender in enumerate(senders[1:], start=2):
+        for i in range(count):
+            send(client_as(sender), reader, f"message {i}")
+    conversations, statements = inbox()
+
+    unread = {c["participants"][0]["user_id"]: c["unread_count"] for c in conversations}
+    assert unread == {senders[0].id: 1, senders[1].id: 2, senders[2].id: 3}
+    assert statements == single_conversation_statements
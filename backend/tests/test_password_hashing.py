@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from auth import get_password_hash, password_hasher
+from conftest import auth_headers
+from main import app
+
+PASSWORD = "correct horse"
+
+
+@pytest.fixture
+def hashed_user(make_user):
+    return make_user(hashed_password=get_password_hash(PASSWORD, password_hasher.rounds))
+
+
+def login(user):
+    return {"url": "/api/v1/auth/login", "json": {"username": user.username, "password": PASSWORD}}
+
+
+def setup_two_fa(user):
+    return {"url": "/api/v1/auth/2fa/setup", "json": {"password": PASSWORD}, "headers": auth_headers(user)}
+
+
+@pytest.mark.parametrize("request_for", [login, setup_two_fa])
+def test_requests_are_served_while_hash_is_in_progress(hashed_user, request_for):
+    async def scenario():
+        # Occupy every bcrypt worker, so the request's password check has to wait
+        release = threading.Event()
+        blockers = [password_hasher.submit(release.wait) for _ in range(password_hasher.workers)]
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                hashing = asyncio.create_task(client.post(**request_for(hashed_user)))
+                await asyncio.sleep(0.1)
+
+                status = await asyncio.wait_for(client.get("/api/status"), 5)
+                assert status.status_code == 200
+                assert not hashing.done()
+
+                release.set()
+                return await asyncio.wait_for(hashing, 10)
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200, response.text
@@ -0,0 +1,38 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from auth import create_access_token
+from conftest import auth_headers
+
+
+def websocket(client, user):
+    return client.websocket_connect(f"/api/v1/messages/ws?token={create_access_token({'sub': user.username})}")
+
+
+def test_sent_message_is_pushed_to_recipient(client, make_user):
+    sender, recipient = make_user(), make_user()
+
+    with websocket(client, recipient) as socket:
+        socket.send_text("ping")
+        assert socket.receive_json() == {"type": "pong"}
+
+        response = client.post(
+            "/api/v1/messages/send",
+            json={"recipient_id": recipient.id, "content": "See you at the trailhead"},
+            headers=auth_headers(sender)
+        )
+        assert response.status_code == 200, response.text
+
+        event = socket.receive_json()
+        assert event["type"] == "message"
+        assert event["message"]["id"] == response.json()["id"]
+        assert event["message"]["content"] == "See you at the trailhead"
+        assert event["message"]["sender_id"] == sender.id
+
+
+def test_invalid_token_is_refused(client):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/api/v1/messages/ws?token=not-a-token") as socket:
+            socket.receive_json()
+
+    assert refused.value.code == 1008
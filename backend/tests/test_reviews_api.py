@@ -0,0 +1,45 @@
+from conftest import auth_headers
+from models.activity import Activity
+from models.hike import Hike
+from models.timeline import TimelineEntry
+from rating_service import rating_service
+
+
+def review(client, user, hike, rating=4):
+    response = client.post(
+        "/api/v1/social/reviews",
+        json={"hike_id": hike.id, "rating": rating, "title": "Great views"},
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_delete_review_retracts_feed_activity(db, client, make_user, make_hike):
+    user, hike = make_user(), make_hike()
+    created = review(client, user, hike)
+    activity_id = db.query(Activity.id).filter(Activity.user_id == user.id, Activity.activity_type == "review").scalar()
+
+    response = client.delete(f"/api/v1/social/reviews/{created['id']}", headers=auth_headers(user))
+
+    assert response.status_code == 200, response.text
+    assert db.query(Activity).filter(Activity.id == activity_id).count() == 0
+    assert db.query(TimelineEntry).filter(TimelineEntry.activity_id == activity_id).count() == 0
+
+
+def test_rating_aggregates_match_rebuild(db, client, make_user, make_hike):
+    hike, users = make_hike(), [make_user() for _ in range(3)]
+    reviews = [review(client, user, hike, rating) for user, rating in zip(users, (5, 4, 1.5))]
+    client.delete(f"/api/v1/social/reviews/{reviews[1]['id']}", headers=auth_headers(users[1]))
+
+    def aggregates():
+        db.expire_all()
+        hike_row = db.get(Hike, hike.id)
+        return [hike_row.review_count, hike_row.rating_sum, hike_row.avg_rating] + [
+            getattr(hike_row, f"rating_{stars}_count") for stars in range(1, 6)
+        ]
+
+    maintained = aggregates()
+    assert maintained == [2, 6.5, 3.25, 0, 1, 0, 0, 1]
+    rating_service.rebuild(db, hike.id)
+    assert aggregates() == maintained
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from bench_track_metrics import synthetic_track
+from utils.route_codec import (
+    COORDINATE_SCALE,
+    ELEVATION_SCALE,
+    decode_arrays,
+    decode_route,
+    encode_arrays,
+    encode_route,
+    is_encoded,
+    point_count,
+    take,
+    to_points,
+)
+from utils.track_metrics import TrackArrays, track_arrays
+
+
+def assert_round_trips(arrays: TrackArrays, compress: bool = True):
+    decoded = decode_arrays(encode_arrays(arrays, compress))
+    np.testing.assert_allclose(decoded.latitude, arrays.latitude, rtol=0, atol=0.5 / COORDINATE_SCALE)
+    np.testing.assert_allclose(decoded.longitude, arrays.longitude, rtol=0, atol=0.5 / COORDINATE_SCALE)
+    for original, restored, tolerance in (
+        (arrays.elevation, decoded.elevation, 0.5 / ELEVATION_SCALE),
+        (arrays.time, decoded.time, 0.0005)
+    ):
+        if original is None:
+            assert restored is None
+        else:
+            np.testing.assert_array_equal(np.isnan(restored), np.isnan(original))
+            np.testing.assert_allclose(restored, original, rtol=0, atol=tolerance, equal_nan=True)
+    return decoded
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_track_round_trips_within_fixed_point_precision(compress):
+    arrays = track_arrays(synthetic_track(2000))
+    blob = encode_arrays(arrays, compress)
+
+    assert is_encoded(blob)
+    assert point_count(blob) == 2000
+    assert_round_trips(arrays, compress)
+
+
+def test_missing_elevations_and_times_stay_missing():
+    arrays = track_arrays(synthetic_track(500))
+    arrays.elevation[[0, 7, 8, 499]] = np.nan
+    arrays.time[[0, 1, 250, 498]] = np.nan
+
+    assert_round_trips(arrays)
+
+
+def test_optional_columns_absent():
+    arrays = track_arrays(synthetic_track(100))
+
+    assert_round_trips(TrackArrays(arrays.latitude, arrays.longitude, None, None))
+    assert_round_trips(TrackArrays(arrays.latitude, arrays.longitude, arrays.elevation, None))
+
+
+def test_coordinates_survive_antimeridian_and_pole_jumps():
+    latitude = np.array([89.9999999, -89.9999999, 0.0, -0.0000001, 45.1234567])
+    longitude = np.array([179.9999999, -179.9999999, 180.0, -180.0, 0.0000001])
+
+    assert_round_trips(TrackArrays(latitude, longitude, None, None))
+
+
+def test_empty_route():
+    empty = np.array([], dtype=np.float64)
+    blob = encode_arrays(TrackArrays(empty, empty, None, None))
+
+    assert point_count(blob) == 0
+    assert len(decode_arrays(blob).latitude) == 0
+    assert decode_route(blob) == []
+
+
+def test_point_dicts_round_trip():
+    points = [
+        {"latitude": -0.3512345, "longitude": 36.7512345, "elevation": 2012.34, "time": "2026-05-01T06:00:00Z"},
+        {"latitude": -0.3512001, "longitude": 36.7512999, "elevation": None, "time": "2026-05-01T06:00:01.250Z"},
+        {"latitude": -0.3511000, "longitude": 36.7514000, "elevation": 2013.0, "time": None},
+    ]
+
+    decoded = decode_route(encode_route(points))
+
+    assert [p["time"] for p in decoded] == ["2026-05-01T06:00:00.000Z", "2026-05-01T06:00:01.250Z", None]
+    assert [p["elevation"] for p in decoded] == [pytest.approx(2012.34), None, pytest.approx(2013.0)]
+    for original, restored in zip(points, decoded):
+        assert restored["latitude"] == pytest.approx(original["latitude"], abs=1e-7)
+        assert restored["longitude"] == pytest.approx(original["longitude"], abs=1e-7)
+
+
+def test_take_subsets_every_column():
+    arrays = decode_arrays(encode_arrays(track_arrays(synthetic_track(50))))
+    indices = np.array([0, 10, 49])
+
+    subset = take(arrays, indices)
+
+    for column, original in zip(subset, arrays):
+        np.testing.assert_array_equal(column, original[indices])
+    assert len(to_points(subset)) == 3
+    assert not is_encoded(b"[]")
@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import auth_headers
+from models.user_stats import UserStats
+from stats_service import COUNTER_COLUMNS, stats_service
+
+
+def call(client, method, url, user, **kwargs):
+    response = client.request(method, url, headers=auth_headers(user), **kwargs)
+    assert response.status_code < 300, response.text
+    return response.json() if response.content else None
+
+
+def counters(stats: UserStats) -> dict:
+    return {column: getattr(stats, column) for column in COUNTER_COLUMNS}
+
+
+def test_increments_match_rebuild(db, client, make_user, make_hike):
+    user, friend = make_user(), make_user()
+    hikes = [make_hike(), make_hike(), make_hike()]
+    stats_service.get(db, user.id)  # Start from an existing rollup row, as increments do in production
+
+    # Completed, edited after completion, deleted and still active sessions
+    for hike, distance in zip(hikes, (12.5, 8.0, 5.0)):
+        session = call(client, "POST", "/api/v1/user/sessions", user, json={"hike_id": hike.id})
+        call(client, "PUT", f"/api/v1/user/sessions/{session['id']}", user, json={
+            "distance_covered_km": distance, "elevation_gain_m": 400, "duration_minutes": 150, "is_active": False
+        })
+    call(client, "PUT", f"/api/v1/user/sessions/{session['id']}", user, json={"distance_covered_km": 6.5})
+    call(client, "DELETE", f"/api/v1/user/sessions/{session['id']}", user)
+    call(client, "POST", "/api/v1/user/sessions", user, json={"hike_id": hikes[0].id})
+
+    # Reviews, bookmarks and follows, one of each undone
+    reviews = [
+        call(client, "POST", "/api/v1/social/reviews", user, json={"hike_id": hike.id, "rating": rating})
+        for hike, rating in zip(hikes, (5, 3.5, 2))
+    ]
+    call(client, "DELETE", f"/api/v1/social/reviews/{reviews[1]['id']}", user)
+    for hike in hikes[:2]:
+        call(client, "POST", "/api/v1/social/bookmarks", user, json={"hike_id": hike.id})
+    call(client, "DELETE", f"/api/v1/social/bookmarks/{hikes[0].id}", user)
+    call(client, "POST", "/api/v1/social/follow", user, json={"following_id": friend.id})
+    call(client, "POST", "/api/v1/social/follow", friend, json={"following_id": user.id})
+    call(client, "DELETE", f"/api/v1/social/follow/{friend.id}", user)
+
+    db.expire_all()
+    maintained = {user_id: counters(db.get(UserStats, user_id)) for user_id in (user.id, friend.id)}
+    assert maintained[user.id]["total_hikes"] == 2
+    assert maintained[user.id]["total_distance_km"] == 20.5
+
+    for user_id, values in maintained.items():
+        assert counters(stats_service.rebuild(db, user_id)) == pytest.approx(values)
+    db.rollback()
@@ -0,0 +1,96 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import routers.strava as strava_router
+from config import settings
+from conftest import auth_headers
+from models.job import Job
+from models.strava import StravaToken
+from strava_service import strava_service
+from strava_webhooks import StravaEventQueue
+
+
+def connect_strava(db, user):
+    db.add(StravaToken(
+        user_id=user.id,
+        access_token="access",
+        refresh_token="refresh",
+        expires_at=datetime.utcnow() + timedelta(hours=6),
+        athlete_id=user.id
+    ))
+    db.commit()
+
+
+def test_sync_enqueues_job(db, client, make_user):
+    user = make_user()
+    connect_strava(db, user)
+
+    response = client.post("/api/strava/sync?days=7", headers=auth_headers(user))
+
+    assert response.status_code == 202, response.text
+    job = db.get(Job, response.json()["job_id"])
+    assert (job.job_type, job.user_id, job.payload) == ("strava_sync", user.id, '{"days": 7}')
+
+    again = client.post("/api/strava/sync?days=7", headers=auth_headers(user))
+    assert again.json()["job_id"] == job.id
+
+
+def test_sync_requires_connection(client, make_user):
+    response = client.post("/api/strava/sync", headers=auth_headers(make_user()))
+
+    assert response.status_code == 404
+
+
+def test_sync_requires_login(client):
+    assert client.post("/api/strava/sync").status_code in (401, 403)
+
+
+def test_sync_status_is_admin_only(client, make_user):
+    assert client.get("/api/strava/sync/status", headers=auth_headers(make_user())).status_code == 403
+
+    response = client.get("/api/strava/sync/status", headers=auth_headers(make_user(is_admin=True)))
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"last_run", "rate_limit", "webhook_events"}
+
+
+def test_webhook_verification_echoes_challenge(client):
+    params = {"hub.mode": "subscribe", "hub.challenge": "abc123", "hub.verify_token": settings.STRAVA_WEBHOOK_VERIFY_TOKEN}
+
+    assert client.get("/api/strava/webhook", params=params).json() == {"hub.challenge": "abc123"}
+    assert client.get("/api/strava/webhook", params={**params, "hub.verify_token": "wrong"}).status_code == 403
+
+
+@pytest.fixture
+def event_queue(monkeypatch):
+    """A fresh webhook queue whose activity syncs block until released"""
+    queue = StravaEventQueue(workers=1)
+    monkeypatch.setattr(strava_router, "strava_event_queue", queue)
+    release, synced = threading.Event(), []
+
+    def sync_activity(user_id, activity_id, db):
+        release.wait(5)
+        synced.append((user_id, activity_id))
+
+    monkeypatch.setattr(strava_service, "sync_activity", sync_activity)
+    yield queue, release, synced
+    release.set()
+    queue.stop()
+
+
+def test_webhook_event_is_queued_and_synced(db, client, make_user, event_queue):
+    queue, release, synced = event_queue
+    user = make_user()
+    connect_strava(db, user)
+    event = {"object_type": "activity", "object_id": 9001, "aspect_type": "create", "owner_id": user.id, "subscription_id": 1}
+
+    assert client.post("/api/strava/webhook", json=event).json() == {"status": "queued"}
+    assert client.post("/api/strava/webhook", json=event).json() == {"status": "duplicate"}
+    assert client.post("/api/strava/webhook", json={"object_type": "route"}).json() == {"status": "ignored"}
+
+    release.set()
+    queue.join()
+    assert synced == [(user.id, 9001)]
+    assert queue.metrics()["processed"] == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from config import settings
+from job_queue import JobFailed
+from strava_rate_limiter import QuotaExhausted, StravaRateLimiter, TokenBucket
+
+
+def test_hook_waits_for_quota_within_max_wait(monkeypatch):
+    monkeypatch.setattr(settings, "STRAVA_SYNC_MAX_WAIT_SECONDS", 60)
+    limiter = StravaRateLimiter(short_limit=1, daily_limit=1000)
+    limiter.short = TokenBucket(1, 0.2)  # Refills within the allowed wait
+
+    limiter({}, "GET")
+
+    assert limiter.metrics()["throttled"] == 1
+    assert limiter.metrics()["requests"] == 1
+
+
+def test_hook_raises_retryable_error_past_max_wait(monkeypatch):
+    monkeypatch.setattr(settings, "STRAVA_SYNC_MAX_WAIT_SECONDS", 1)
+    limiter = StravaRateLimiter(short_limit=1, daily_limit=1000)
+
+    with pytest.raises(QuotaExhausted) as raised:
+        limiter({}, "GET")
+
+    # Not JobFailed, so the job queue retries the sync with backoff
+    assert not isinstance(raised.value, JobFailed)
+    assert limiter.metrics()["rejected"] == 1
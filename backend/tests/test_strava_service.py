@@ -0,0 +1,125 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from stravalib.model import SummaryActivity
+
+import strava_service as strava_service_module
+from config import settings
+from models.strava import StravaActivity, StravaToken
+from models.user import User
+from strava_service import strava_service
+
+
+def strava_activity(activity_id: int, **overrides) -> SummaryActivity:
+    """An activity as stravalib 2.x returns it from the API"""
+    data = {
+        "id": activity_id,
+        "name": "Ngong Hills",
+        "type": "Hike",
+        "start_date": "2026-05-01T06:00:00Z",
+        "start_date_local": "2026-05-01T09:00:00Z",
+        "start_latlng": [-1.3912, 36.6421],
+        "end_latlng": [-1.4001, 36.6502],
+        "distance": 12000.0,
+        "moving_time": 14400,
+        "elapsed_time": 16000,
+        "total_elevation_gain": 600.0,
+        "map": {"summary_polyline": "f`s@mdbmFg@cA"},
+        "kudos_count": 2,
+    }
+    data.update(overrides)
+    return SummaryActivity.model_validate(data)
+
+
+@pytest.fixture
+def token(db):
+    name = f"hiker-{uuid.uuid4().hex[:8]}"
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    token = StravaToken(
+        user_id=user.id,
+        access_token="access",
+        refresh_token="refresh",
+        expires_at=datetime.utcnow() + timedelta(hours=6),
+        athlete_id=user.id
+    )
+    db.add(token)
+    db.commit()
+    return token
+
+
+def activity_id() -> int:
+    return uuid.uuid4().int % 10 ** 12
+
+
+def test_activity_values_from_stravalib_model(token):
+    values = strava_service._activity_values(strava_activity(42), token)
+
+    assert values["activity_type"] == "Hike"
+    assert values["moving_time"] == 14400
+    assert values["elapsed_time"] == 16000
+    assert json.loads(values["start_latlng"]) == [-1.3912, 36.6421]
+    assert json.loads(values["end_latlng"]) == [-1.4001, 36.6502]
+    assert values["route_signature"]
+
+
+def test_activity_without_gps_has_no_signature(token):
+    values = strava_service._activity_values(strava_activity(43, start_latlng=None, end_latlng=None), token)
+
+    assert values["start_latlng"] is None
+    assert values["route_signature"] is None
+
+
+def test_upsert_is_idempotent_on_repeat_sync(db, token):
+    page = [strava_activity(activity_id()), strava_activity(activity_id(), name="Elephant Hill")]
+    ride = strava_activity(activity_id(), type="Ride")
+
+    stored = strava_service._upsert_activities(page + [ride], token, db)
+    db.commit()
+    assert len(stored) == 2
+
+    # The same page again changes nothing and returns nothing
+    assert strava_service._upsert_activities(page, token, db) == []
+    db.commit()
+    assert db.query(StravaActivity).filter(StravaActivity.user_id == token.user_id).count() == 2
+
+    # New kudos are picked up
+    liked = strava_activity(page[0].id, kudos_count=5)
+    stored = strava_service._upsert_activities([liked], token, db)
+    db.commit()
+    assert [activity.kudos_count for activity in stored] == [5]
+
+
+class FakeClient:
+    """Stands in for stravalib.Client, serving a fixed list of activities"""
+    activities = []
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def get_activities(self, after=None, limit=None):
+        FakeClient.calls.append(after)
+        return iter(FakeClient.activities)
+
+
+def test_sync_advances_last_synced_and_cursor(db, token, monkeypatch):
+    monkeypatch.setattr(strava_service_module, "Client", FakeClient)
+    FakeClient.calls = []
+    FakeClient.activities = [strava_activity(activity_id(), start_date="2026-04-01T06:00:00Z")]
+
+    before = datetime.utcnow()
+    synced = strava_service.sync_activities(token.user_id, db)
+    assert len(synced) == 1
+    db.refresh(token)
+    assert token.last_synced >= before
+
+    # The next sync starts from the later of the last sync and the newest activity
+    FakeClient.activities = []
+    strava_service.sync_activities(token.user_id, db)
+    overlap = timedelta(hours=settings.STRAVA_SYNC_OVERLAP_HOURS)
+    assert FakeClient.calls[-1] == pytest.approx(token.last_synced - overlap, abs=timedelta(seconds=1))
+    assert FakeClient.calls[-1] > datetime(2026, 4, 1, 6)
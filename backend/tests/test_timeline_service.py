@@ -0,0 +1,76 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.activity import Activity
+from models.follow import Follow
+from models.timeline import TimelineEntry
+from models.user import User
+from timeline_service import timeline_service
+
+
+def make_user(db) -> User:
+    name = f"hiker-{uuid.uuid4().hex[:8]}"
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+@pytest.fixture
+def author_and_follower(db, monkeypatch):
+    monkeypatch.setattr(timeline_service, "max_length", 3)
+    author, follower = make_user(db), make_user(db)
+    db.add(Follow(follower_id=follower.id, following_id=author.id))
+    start = datetime(2026, 5, 1, 6)
+    for minute in range(5):
+        activity = Activity(
+            user_id=author.id,
+            activity_type="completed_hike",
+            description=f"Hike {minute}",
+            created_at=start + timedelta(minutes=minute)
+        )
+        db.add(activity)
+        timeline_service.publish(db, activity)
+    db.commit()
+    return author, follower
+
+
+def timeline_length(db, user_id: int) -> int:
+    return db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id).count()
+
+
+def test_read_does_not_trim(db, author_and_follower):
+    _, follower = author_and_follower
+
+    rows = timeline_service.read(db, follower.id, None, 10)
+
+    assert [row[0].description for row in rows] == [f"Hike {minute}" for minute in (4, 3, 2, 1, 0)]
+    assert timeline_length(db, follower.id) == 5
+    assert not db.new and not db.dirty and not db.deleted
+
+
+def test_trim_all_keeps_newest_entries(db, author_and_follower):
+    author, follower = author_and_follower
+
+    assert timeline_service.trim_all(db) >= 2
+
+    for user_id in (author.id, follower.id):
+        assert timeline_length(db, user_id) == 3
+    rows = timeline_service.read(db, follower.id, None, 10)
+    assert [row[0].description for row in rows] == ["Hike 4", "Hike 3", "Hike 2"]
+    assert timeline_service.trim_all(db) == 0
+
+
+def test_retract_removes_activity_from_every_timeline(db, author_and_follower):
+    author, follower = author_and_follower
+    activity = db.query(Activity).filter(Activity.user_id == author.id, Activity.description == "Hike 4").one()
+
+    timeline_service.retract(db, activity)
+    db.commit()
+
+    assert db.get(Activity, activity.id) is None
+    assert db.query(TimelineEntry).filter(TimelineEntry.activity_id == activity.id).count() == 0
+    rows = timeline_service.read(db, follower.id, None, 10)
+    assert [row[0].description for row in rows] == [f"Hike {minute}" for minute in (3, 2, 1, 0)]
@@ -0,0 +1,93 @@
+import uuid
+
+import pytest
+
+from auth import user_cache
+from models.user import User
+
+
+@pytest.fixture
+def cache(database, monkeypatch):
+    monkeypatch.setattr(user_cache, "max_size", 10)
+    monkeypatch.setattr(user_cache, "ttl_seconds", 60)
+    user_cache.clear()
+    yield user_cache
+    user_cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    name = f"hiker-{uuid.uuid4().hex[:8]}"
+    user = User(username=name, email=f"{name}@example.com", hashed_password="secret-hash")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def cache_user(cache, user):
+    cache.put(user, cache.generation)
+
+
+def test_hit_returns_user_without_secrets(cache, db, user):
+    cache_user(cache, user)
+    db.expunge_all()
+    hits = cache.metrics()["hits"]
+
+    cached = cache.get(db, user.username)
+
+    assert cached.id == user.id
+    assert cached.email == user.email
+    assert "hashed_password" not in cached.__dict__
+    assert cache.metrics()["hits"] == hits + 1
+
+
+def test_committed_update_invalidates_entry(cache, db, user):
+    cache_user(cache, user)
+
+    user.full_name = "Renamed"
+    db.flush()
+    assert cache.get(db, user.username) is not None  # Not committed yet
+
+    db.commit()
+    assert cache.get(db, user.username) is None
+
+
+def test_rolled_back_update_keeps_entry(cache, db, user):
+    cache_user(cache, user)
+
+    user.full_name = "Renamed"
+    db.flush()
+    db.rollback()
+
+    assert cache.get(db, user.username) is not None
+
+
+def test_bulk_update_clears_cache(cache, db, user):
+    cache_user(cache, user)
+
+    db.query(User).filter(User.id == user.id).update({User.is_active: False})
+    db.commit()
+
+    assert cache.get(db, user.username) is None
+
+
+def test_put_after_invalidation_is_skipped(cache, db, user):
+    generation = cache.generation
+    cache.invalidate("someone-else")
+
+    cache.put(user, generation)
+
+    assert cache.get(db, user.username) is None
+
+
+def test_evicts_least_recently_used(cache, db, user, monkeypatch):
+    monkeypatch.setattr(cache, "max_size", 1)
+    cache_user(cache, user)
+    other = User(username=f"other-{uuid.uuid4().hex[:8]}", email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.commit()
+
+    cache_user(cache, other)
+
+    assert cache.get(db, user.username) is None
+    assert cache.get(db, other.username) is not None
@@ -0,0 +1,153 @@
+import gzip
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from bench_track_metrics import synthetic_track
+from config import settings
+from conftest import auth_headers
+from job_queue import job_queue
+from models.hike_session import HikeSession
+from models.job import Job
+from route_service import route_service
+from utils import polyline
+from utils.track_metrics import track_arrays
+from wearable_import import wearable_import_service
+
+GPX = b"""<?xml version="1.0"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>
+<trkpt lat="-1.3912" lon="36.6421"><ele>1900</ele><time>2026-05-01T06:00:00Z</time></trkpt>
+<trkpt lat="-1.3920" lon="36.6430"><ele>1910</ele><time>2026-05-01T06:01:00Z</time></trkpt>
+</trkseg></trk></gpx>"""
+
+
+def uploads() -> set:
+    return set(os.listdir(job_queue.upload_dir)) if os.path.isdir(job_queue.upload_dir) else set()
+
+
+def test_import_queues_job(db, client, make_user):
+    user = make_user()
+
+    response = client.post("/api/v1/wearable/import", files={"file": ("hike.gpx", GPX)}, headers=auth_headers(user))
+
+    assert response.status_code == 202, response.text
+    job = db.get(Job, response.json()["job_id"])
+    assert (job.job_type, job.user_id) == ("wearable_import", user.id)
+
+
+def test_oversized_file_is_rejected_before_queueing(db, client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "WEARABLE_MAX_FILE_MB", 0)
+    user = make_user()
+    before = uploads()
+
+    response = client.post("/api/v1/wearable/import", files={"file": ("hike.gpx", GPX)}, headers=auth_headers(user))
+
+    assert response.status_code == 413
+    assert db.query(Job).filter(Job.user_id == user.id).count() == 0
+    assert uploads() == before
+
+
+def test_route_zoom_picks_coarsest_level_within_tolerance(db, client, make_user, make_hike):
+    user, hike = make_user(), make_hike(latitude=-0.35, longitude=36.75)
+    session = HikeSession(user_id=user.id, hike_id=hike.id, is_active=False)
+    route_service.store(session, track_arrays(synthetic_track(3000)))
+    db.add(session)
+    db.commit()
+
+    def route(zoom):
+        response = client.get(f"/api/v1/wearable/sessions/{session.id}/route", params={"zoom": zoom}, headers=auth_headers(user))
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    city, street, closest = route(12), route(15), route(18)
+    levels = sorted(level.tolerance_m for level in session.route_levels)
+    for body, zoom in ((city, 12), (street, 15)):
+        tolerance = route_service.tolerance_for_zoom(db, session, zoom)
+        assert body["tolerance_m"] == max(t for t in levels if t <= tolerance)
+    assert city["total_points"] < street["total_points"] < 3000
+
+    # Finer than any stored level, so the full recording is served
+    assert closest["tolerance_m"] == 0
+    assert closest["total_points"] == closest["recorded_points"] == 3000
+
+
+# A 1.1 km climb north from the Marangu gate, one point a minute
+ROUTE = [(-3.0900 + i * 0.001, 37.5100) for i in range(11)]
+
+
+def gpx(start_hour: int, name: str = "Marangu") -> bytes:
+    points = "".join(
+        f'<trkpt lat="{lat}" lon="{lng}"><ele>{1800 + i * 5}</ele><time>2026-05-01T{start_hour:02d}:{i:02d}:00Z</time></trkpt>'
+        for i, (lat, lng) in enumerate(ROUTE)
+    )
+    return (
+        '<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f'<trk><name>{name}</name><trkseg>{points}</trkseg></trk></gpx>'
+    ).encode()
+
+
+@pytest.fixture
+def trail(make_hike):
+    hike = make_hike(name="Marangu Route", latitude=ROUTE[0][0], longitude=ROUTE[0][1], route_polyline=polyline.encode(ROUTE))
+    yield hike
+    wearable_import_service.shutdown()
+
+
+def test_archive_import_job_imports_each_recording_once(db, client, make_user, trail):
+    user = make_user()
+    db.query(Job).delete()
+    db.commit()
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("export/morning.gpx", gpx(6))
+        zf.writestr("export/evening.gpx.gz", gzip.compress(gpx(15)))
+        zf.writestr("export/morning-copy.gpx", gpx(6))
+        zf.writestr("__MACOSX/export/._morning.gpx", b"resource fork")
+        zf.writestr("README.txt", b"Garmin Connect export")
+
+    response = client.post(
+        "/api/v1/wearable/import/archive",
+        files={"file": ("export.zip", archive.getvalue())},
+        headers=auth_headers(user)
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["message"] == "Importing 3 activities"
+
+    assert job_queue.run_next()
+    job = db.get(Job, response.json()["job_id"])
+    assert job.status == "succeeded", job.error
+    report = json.loads(job.result)
+    assert (report["imported"], report["duplicates"], report["failed"]) == (2, 1, 0)
+    assert [(f["filename"], f["status"]) for f in report["files"]] == [
+        ("export/morning.gpx", "imported"),
+        ("export/evening.gpx.gz", "imported"),
+        ("export/morning-copy.gpx", "duplicate"),
+    ]
+    sessions = db.query(HikeSession).filter(HikeSession.user_id == user.id).all()
+    assert {session.hike_id for session in sessions} == {trail.id}
+    assert len(sessions) == 2
+    assert not os.path.exists(json.loads(job.payload)["upload_path"])
+
+
+def test_repeat_import_is_reported_as_duplicate(db, make_user, trail, tmp_path):
+    user = make_user()
+
+    def import_file(data: bytes) -> dict:
+        path = tmp_path / "hike.gpx"
+        path.write_bytes(data)
+        return wearable_import_service.import_file(db, user.id, str(path), "hike.gpx")
+
+    first = import_file(gpx(8))
+    assert first["duplicate"] is False
+
+    # The same file, and the same recording exported again under another name
+    for data in (gpx(8), gpx(8, name="Marangu re-export")):
+        again = import_file(data)
+        assert again["duplicate"] is True
+        assert again["session_id"] == first["session_id"]
+
+    assert db.query(HikeSession).filter(HikeSession.user_id == user.id).count() == 1
+    assert import_file(gpx(12))["duplicate"] is False
@@ -0,0 +1,119 @@
+import io
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from utils.wearable_parser import WearableDataParser
+
+GPX_NAMESPACES = {
+    "1.1": ' xmlns="http://www.topografix.com/GPX/1/1"',
+    "1.0": ' xmlns="http://www.topografix.com/GPX/1/0"',
+    "none": "",
+}
+
+
+def trkpt(i: int, extensions: str = "") -> str:
+    return (
+        f'<trkpt lat="{-1.39 + i * 1e-5:.6f}" lon="{36.64 + i * 1e-5:.6f}"><ele>{1900 + i % 50}</ele>'
+        f'<time>2026-05-01T{6 + i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z</time>{extensions}</trkpt>'
+    )
+
+
+class GeneratedGPX(io.RawIOBase):
+    """A GPX document produced piece by piece as it is read, never held whole"""
+
+    def __init__(self, count: int, extensions: str = ""):
+        self.pieces = self._pieces(count, extensions)
+        self.pending = b""
+        self.size = 0
+
+    @staticmethod
+    def _pieces(count: int, extensions: str):
+        yield b'<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>'
+        for i in range(count):
+            yield trkpt(i, extensions).encode()
+        yield b"</trkseg></trk></gpx>"
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self.pending) < len(buffer):
+            piece = next(self.pieces, None)
+            if piece is None:
+                break
+            self.pending += piece
+        count = min(len(buffer), len(self.pending))
+        buffer[:count] = self.pending[:count]
+        self.pending = self.pending[count:]
+        self.size += count
+        return count
+
+
+@pytest.mark.parametrize("version", GPX_NAMESPACES)
+def test_gpx_namespaces(version):
+    document = (
+        f'<?xml version="1.0"?><gpx version="1.1"{GPX_NAMESPACES[version]}>'
+        '<metadata><name>Ngong Hills</name></metadata>'
+        f'<trk><name>Track</name><trkseg>{"".join(trkpt(i) for i in range(3))}</trkseg></trk></gpx>'
+    ).encode()
+
+    parsed = WearableDataParser.parse_file(document, ".gpx")
+
+    assert parsed["success"], parsed.get("error")
+    assert parsed["name"] == "Ngong Hills"
+    assert parsed["total_points"] == 3
+    np.testing.assert_allclose(parsed["track"].elevation, [1900, 1901, 1902])
+    assert parsed["start_time"] == "2026-05-01T06:00:00+00:00"
+
+
+def test_tcx_skips_trackpoints_without_position():
+    document = b"""<?xml version="1.0"?>
+<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+<Activities><Activity Sport="Other"><Lap><Track>
+<Trackpoint><Time>2026-05-01T06:00:00Z</Time><Position><LatitudeDegrees>-1.39</LatitudeDegrees><LongitudeDegrees>36.64</LongitudeDegrees></Position><AltitudeMeters>1900</AltitudeMeters></Trackpoint>
+<Trackpoint><Time>2026-05-01T06:00:30Z</Time><HeartRateBpm><Value>120</Value></HeartRateBpm></Trackpoint>
+<Trackpoint><Time>2026-05-01T06:01:00Z</Time><Position><LatitudeDegrees>-1.391</LatitudeDegrees><LongitudeDegrees>36.641</LongitudeDegrees></Position><AltitudeMeters>1910</AltitudeMeters></Trackpoint>
+</Track></Lap></Activity></Activities></TrainingCenterDatabase>"""
+
+    parsed = WearableDataParser.parse_file(io.BytesIO(document), ".tcx")
+
+    assert parsed["success"], parsed.get("error")
+    assert parsed["total_points"] == 2
+    assert parsed["elevation_gain_m"] == 10
+
+
+def test_point_and_byte_ceilings():
+    document = GeneratedGPX(100).read()
+
+    too_many = WearableDataParser.parse_file(document, ".gpx", max_points=50)
+    assert not too_many["success"]
+    assert "more than 50 points" in too_many["error"]
+
+    too_large = WearableDataParser.parse_file(document, ".gpx", max_bytes=len(document) - 1)
+    assert not too_large["success"]
+    assert "too large" in too_large["error"]
+
+
+def peak_memory(source) -> int:
+    tracemalloc.start()
+    try:
+        parsed = WearableDataParser.parse_gpx(source, max_points=None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert parsed["success"], parsed.get("error")
+    assert parsed["total_points"] == 20_000
+    return peak
+
+
+def test_memory_does_not_follow_document_size():
+    plain = GeneratedGPX(20_000)
+    # Device extensions make every point ten times larger on disk
+    verbose = GeneratedGPX(20_000, "<extensions><note>" + "x" * 1000 + "</note></extensions>")
+
+    plain_peak, verbose_peak = peak_memory(plain), peak_memory(verbose)
+
+    assert verbose.size > 10 * plain.size
+    assert verbose_peak < 1.5 * plain_peak
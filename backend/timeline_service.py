@@ -0,0 +1,250 @@
+"""
+Home timeline service for the social activity feed
+Fans activities out to followers on write so reading a feed is one index range scan
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import and_, desc, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.activity import Activity
+from models.follow import Follow
+from models.hike import Hike
+from models.timeline import TimelineEntry
+from models.user import User
+
+# Keyset position in a feed: (created_at, activity_id)
+FeedKey = Tuple[datetime, int]
+
+
+class TimelineService:
+    """Maintain per-user home timelines with a fan-out-on-read fallback"""
+
+    def __init__(self):
+        self.max_length = settings.TIMELINE_MAX_LENGTH
+        self.fanout_limit = settings.TIMELINE_FANOUT_LIMIT
+        self.backfill_size = settings.TIMELINE_BACKFILL_SIZE
+        self.cache_seconds = settings.TIMELINE_FANOUT_CACHE_SECONDS
+
+        self._lock = threading.Lock()
+        self._high_fanout_ids: Set[int] = set()
+        self._high_fanout_loaded_at = 0.0
+
+    # ---------- Write path ----------
+
+    def publish(self, db: Session, activity: Activity):
+        """
+        Copy a new activity into the author's and followers' timelines.
+        Accounts with more than TIMELINE_FANOUT_LIMIT followers are only written
+        to the author's own timeline; followers pick them up on read instead.
+        Runs inside the caller's transaction.
+        """
+        db.flush()  # Assign activity.id and created_at
+
+        columns = ["user_id", "activity_id", "actor_id", "created_at"]
+        db.execute(TimelineEntry.__table__.insert().from_select(
+            columns,
+            select(Activity.user_id, Activity.id, Activity.user_id, Activity.created_at).where(
+                Activity.id == activity.id
+            )
+        ))
+
+        if self.is_high_fanout(db, activity.user_id):
+            return
+
+        db.execute(TimelineEntry.__table__.insert().from_select(
+            columns,
+            select(Follow.follower_id, Activity.id, Activity.user_id, Activity.created_at).where(
+                Activity.id == activity.id,
+                Follow.following_id == Activity.user_id,
+                Follow.follower_id != Activity.user_id
+            )
+        ))
+
+    def retract(self, db: Session, activity: Activity):
+        """Delete an activity and its timeline entries inside the caller's transaction"""
+        db.query(TimelineEntry).filter(
+            TimelineEntry.activity_id == activity.id
+        ).delete(synchronize_session=False)
+        db.delete(activity)
+
+    def on_follow(self, db: Session, follower_id: int, following_id: int):
+        """Backfill a new follower's timeline with recent activities of the followed user"""
+        if self.is_high_fanout(db, following_id):
+            return
+
+        already_present = select(TimelineEntry.id).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.activity_id == Activity.id
+        ).exists()
+
+        db.execute(TimelineEntry.__table__.insert().from_select(
+            ["user_id", "activity_id", "actor_id", "created_at"],
+            select(literal(follower_id), Activity.id, Activity.user_id, Activity.created_at).where(
+                Activity.user_id == following_id,
+                ~already_present
+            ).order_by(desc(Activity.created_at), desc(Activity.id)).limit(self.backfill_size)
+        ))
+
+    def on_unfollow(self, db: Session, follower_id: int, following_id: int):
+        """Drop an unfollowed user's activities from the follower's timeline"""
+        db.query(TimelineEntry).filter(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.actor_id == following_id
+        ).delete(synchronize_session=False)
+
+    def trim(self, db: Session, user_id: int):
+        """Keep only the newest TIMELINE_MAX_LENGTH entries of a timeline"""
+        cutoff = db.query(TimelineEntry.created_at, TimelineEntry.activity_id).filter(
+            TimelineEntry.user_id == user_id
+        ).order_by(
+            desc(TimelineEntry.created_at), desc(TimelineEntry.activity_id)
+        ).offset(self.max_length).limit(1).first()
+
+        if not cutoff:
+            return
+
+        db.query(TimelineEntry).filter(
+            TimelineEntry.user_id == user_id,
+            or_(
+                TimelineEntry.created_at < cutoff.created_at,
+                and_(TimelineEntry.created_at == cutoff.created_at,
+                     TimelineEntry.activity_id <= cutoff.activity_id)
+            )
+        ).delete(synchronize_session=False)
+
+    def trim_all(self, db: Session) -> int:
+        """Trim every timeline longer than TIMELINE_MAX_LENGTH, committing each; returns how many"""
+        user_ids = [
+            row[0] for row in db.query(TimelineEntry.user_id)
+            .group_by(TimelineEntry.user_id)
+            .having(func.count(TimelineEntry.id) > self.max_length)
+            .all()
+        ]
+        for user_id in user_ids:
+            self.trim(db, user_id)
+            db.commit()
+        return len(user_ids)
+
+    def rebuild(self, db: Session, user_id: int):
+        """Recreate a user's timeline from their own and followed users' activities"""
+        db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id).delete(synchronize_session=False)
+
+        high_fanout = self.high_fanout_ids(db)
+        followed = select(Follow.following_id).where(Follow.follower_id == user_id)
+
+        db.execute(TimelineEntry.__table__.insert().from_select(
+            ["user_id", "activity_id", "actor_id", "created_at"],
+            select(literal(user_id), Activity.id, Activity.user_id, Activity.created_at).where(
+                or_(
+                    Activity.user_id == user_id,
+                    and_(Activity.user_id.in_(followed), Activity.user_id.notin_(list(high_fanout)))
+                )
+            ).order_by(desc(Activity.created_at), desc(Activity.id)).limit(self.max_length)
+        ))
+
+    # ---------- Read path ----------
+
+    def read(self, db: Session, user_id: int, before: Optional[FeedKey], limit: int) -> List[tuple]:
+        """
+        Return up to `limit` feed rows of (Activity, username, profile_picture, hike_name)
+        older than `before`, newest first. Read-only; timelines are trimmed by
+        the periodic timeline_trim job.
+        """
+        query = self._with_details(
+            db.query(Activity, User.username, User.profile_picture, Hike.name)
+            .select_from(TimelineEntry)
+            .join(Activity, Activity.id == TimelineEntry.activity_id)
+        ).filter(TimelineEntry.user_id == user_id)
+        rows = self._page(query, TimelineEntry.created_at, TimelineEntry.activity_id, before, limit)
+
+        # Fan-out-on-read for followed accounts that are too popular to fan out on write
+        high_fanout = self.high_fanout_ids(db)
+        if high_fanout:
+            followed_high_fanout = [
+                row[0] for row in db.query(Follow.following_id).filter(
+                    Follow.follower_id == user_id,
+                    Follow.following_id.in_(list(high_fanout))
+                ).all()
+            ]
+            if followed_high_fanout:
+                query = self._with_details(
+                    db.query(Activity, User.username, User.profile_picture, Hike.name)
+                ).filter(Activity.user_id.in_(followed_high_fanout))
+                rows = self._merge(rows, self._page(query, Activity.created_at, Activity.id, before, limit), limit)
+
+        return rows
+
+    def is_high_fanout(self, db: Session, user_id: int) -> bool:
+        """Check whether a user has too many followers to fan out on write"""
+        followers = db.query(func.count(Follow.id)).filter(Follow.following_id == user_id).scalar()
+        if followers > self.fanout_limit:
+            with self._lock:
+                self._high_fanout_ids.add(user_id)
+            return True
+        return False
+
+    def high_fanout_ids(self, db: Session) -> Set[int]:
+        """Users above TIMELINE_FANOUT_LIMIT followers, refreshed every few minutes"""
+        with self._lock:
+            if time.monotonic() - self._high_fanout_loaded_at < self.cache_seconds:
+                return set(self._high_fanout_ids)
+
+        ids = {
+            row[0] for row in db.query(Follow.following_id)
+            .group_by(Follow.following_id)
+            .having(func.count(Follow.id) > self.fanout_limit)
+            .all()
+        }
+
+        with self._lock:
+            self._high_fanout_ids = ids
+            self._high_fanout_loaded_at = time.monotonic()
+        return set(ids)
+
+    @staticmethod
+    def _with_details(query):
+        """Join author profile and hike name so a page loads in one query"""
+        return query.join(User, User.id == Activity.user_id).outerjoin(Hike, Hike.id == Activity.hike_id)
+
+    @staticmethod
+    def _page(query, created_col, id_col, before: Optional[FeedKey], limit: int) -> List[tuple]:
+        """Apply keyset pagination on (created_at, id), newest first"""
+        if before:
+            before_created_at, before_id = before
+            # Compare against the stored timestamp so both sides share one representation
+            before_created_at = func.coalesce(
+                select(Activity.created_at).where(Activity.id == before_id).scalar_subquery(),
+                before_created_at
+            )
+            query = query.filter(or_(
+                created_col < before_created_at,
+                and_(created_col == before_created_at, id_col < before_id)
+            ))
+        return query.order_by(desc(created_col), desc(id_col)).limit(limit).all()
+
+    @staticmethod
+    def _merge(rows: List[tuple], extra: List[tuple], limit: int) -> List[tuple]:
+        """Merge two newest-first pages, dropping activities present in both"""
+        seen = set()
+        merged = []
+        for row in sorted(rows + extra, key=lambda r: (r[0].created_at, r[0].id), reverse=True):
+            if row[0].id in seen:
+                continue
+            seen.add(row[0].id)
+            merged.append(row)
+        return merged[:limit]
+
+
+# Singleton instance
+timeline_service = TimelineService()
+
+
+def run_trim_job(db, job, payload: dict) -> dict:
+    """Job handler for the periodic timeline_trim job"""
+    return {"trimmed": timeline_service.trim_all(db)}
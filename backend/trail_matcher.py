@@ -0,0 +1,230 @@
+"""
+Match recorded activities to trails by route shape
+Decodes an activity's summary polyline and compares it with the stored
+geometry of nearby hikes using a symmetric Hausdorff distance, computed with
+vectorized NumPy kernels in a local metric projection.
+"""
+
+import json
+import math
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config import settings
+from geo_service import geo_service
+from models.hike import Hike
+from models.strava import StravaActivity
+from utils.geo import EARTH_RADIUS_KM, haversine_km
+from utils.polyline import decode
+
+# Result of a match: (hike_id, Hausdorff distance in metres, or None for a proximity-only match)
+TrailMatch = Tuple[int, Optional[float]]
+
+# (lat, lng, radius_km) -> [(distance_km, hike)] nearest first
+NearbyLookup = Callable[[float, float, float], List[Tuple[float, Hike]]]
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+
+@lru_cache(maxsize=4096)
+def _decode_polyline(encoded: str) -> np.ndarray:
+    """Decode a polyline into an (N, 2) array of (lat, lng) degrees, cached per string"""
+    points = np.array(decode(encoded), dtype=np.float64).reshape(-1, 2)
+    points.setflags(write=False)
+    return points
+
+
+def _project(points: np.ndarray, origin_lat: float) -> np.ndarray:
+    """Equirectangular projection to metres around a reference latitude"""
+    radians = np.radians(points)
+    return np.column_stack((
+        EARTH_RADIUS_M * radians[:, 1] * math.cos(math.radians(origin_lat)),
+        EARTH_RADIUS_M * radians[:, 0]
+    ))
+
+
+def _densify(points: np.ndarray, step_m: float, max_points: int) -> np.ndarray:
+    """
+    Interpolate along segments so vertices are at most step_m apart, then
+    thin evenly to max_points. Keeps vertex-based distances close to the
+    true distance between the lines.
+    """
+    if len(points) > 1:
+        segments = np.diff(points, axis=0)
+        lengths = np.hypot(segments[:, 0], segments[:, 1])
+        counts = np.maximum(1, np.ceil(lengths / step_m).astype(np.int64))
+        # Fraction along its segment for every interpolated vertex
+        offsets = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)) / np.repeat(counts, counts)
+        starts = np.repeat(points[:-1], counts, axis=0)
+        points = np.vstack((starts + np.repeat(segments, counts, axis=0) * offsets[:, None], points[-1:]))
+
+    if len(points) > max_points:
+        points = points[np.linspace(0, len(points) - 1, max_points).astype(np.int64)]
+    return points
+
+
+def hausdorff_distance(a: np.ndarray, b: np.ndarray, chunk_size: int = 1024) -> float:
+    """Symmetric Hausdorff distance between two (N, 2) point sets, in their units"""
+    min_a_to_b = np.empty(len(a))
+    min_b_to_a = np.full(len(b), np.inf)
+
+    # Chunk the pairwise matrix so memory stays bounded for long tracks
+    for start in range(0, len(a), chunk_size):
+        block = a[start:start + chunk_size]
+        squared = ((block[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        min_a_to_b[start:start + len(block)] = squared.min(axis=1)
+        np.minimum(min_b_to_a, squared.min(axis=0), out=min_b_to_a)
+
+    return float(math.sqrt(max(min_a_to_b.max(), min_b_to_a.max())))
+
+
+class TrailMatcher:
+    """Find the hike a recorded route most likely followed"""
+
+    def __init__(self):
+        self.search_radius_km = settings.TRAIL_MATCH_RADIUS_KM
+        self.max_distance_m = settings.TRAIL_MATCH_MAX_DISTANCE_M
+        self.max_points = settings.TRAIL_MATCH_MAX_POINTS
+        self.batch_radius_km = settings.TRAIL_MATCH_BATCH_RADIUS_KM
+
+    def match(self, db: Session, activity: StravaActivity) -> Optional[TrailMatch]:
+        """Best matching hike for a Strava activity, or None"""
+        return self._match(self._route(activity), self._start_point(activity), self._nearby_from_db(db))
+
+    def match_many(self, db: Session, activities: Iterable[StravaActivity]) -> List[Optional[TrailMatch]]:
+        """
+        Match a batch of activities. Candidate hikes for the whole batch are
+        loaded with one geo query when the batch covers a limited area, and
+        trail geometries are decoded once and reused.
+        """
+        activities = list(activities)
+        return self._match_batch(
+            db,
+            [self._route(activity) for activity in activities],
+            [self._start_point(activity) for activity in activities]
+        )
+
+    def match_routes(self, db: Session, routes: List[np.ndarray]) -> List[Optional[TrailMatch]]:
+        """Match a batch of recorded routes, (N, 2) arrays of (lat, lng), like match_many"""
+        return self._match_batch(db, routes, [None] * len(routes))
+
+    def _match_batch(
+        self,
+        db: Session,
+        routes: List[Optional[np.ndarray]],
+        starts: List[Optional[Tuple[float, float]]]
+    ) -> List[Optional[TrailMatch]]:
+        points = [route for route in routes if route is not None]
+        points += [np.array([start]) for start in starts if start]
+        if not points:
+            return [None] * len(routes)
+
+        points = np.vstack(points)
+        south, west = points.min(axis=0)
+        north, east = points.max(axis=0)
+        center_lat, center_lng = (south + north) / 2, (west + east) / 2
+        radius_km = haversine_km(center_lat, center_lng, north, east) + self.search_radius_km
+
+        if radius_km > self.batch_radius_km:
+            nearby = self._nearby_from_db(db)
+        else:
+            pool = [hike for _, hike in geo_service.nearby(db, center_lat, center_lng, radius_km)]
+            nearby = self._nearby_from_pool(pool)
+
+        return [self._match(route, start, nearby) for route, start in zip(routes, starts)]
+
+    def match_route(
+        self,
+        db: Session,
+        route: np.ndarray,
+        start: Optional[Tuple[float, float]] = None
+    ) -> Optional[TrailMatch]:
+        """Best matching hike for a route given as an (N, 2) array of (lat, lng)"""
+        return self._match(route, start, self._nearby_from_db(db))
+
+    def _match(self, route: Optional[np.ndarray], start: Optional[Tuple[float, float]], nearby: NearbyLookup) -> Optional[TrailMatch]:
+        """Match by route shape when there is a route and trail geometry, else by proximity"""
+        if route is None:
+            return self._match_by_proximity(start, nearby) if start else None
+
+        south, west = route.min(axis=0)
+        north, east = route.max(axis=0)
+        center_lat, center_lng = (south + north) / 2, (west + east) / 2
+
+        # Any trail the route follows has its reference point within the route's extent plus a margin
+        radius_km = haversine_km(center_lat, center_lng, north, east) + self.search_radius_km
+        candidates = [hike for _, hike in nearby(center_lat, center_lng, radius_km) if hike.route_polyline]
+        if not candidates:
+            return self._match_by_proximity(start or tuple(route[0]), nearby)
+
+        step_m = self.max_distance_m / 2
+        route_m = _densify(_project(route, center_lat), step_m, self.max_points)
+
+        best = None
+        for hike in candidates:
+            try:
+                trail = _decode_polyline(hike.route_polyline)
+            except ValueError:
+                continue
+            if not len(trail):
+                continue
+
+            trail_m = _densify(_project(trail, center_lat), step_m, self.max_points)
+            distance = hausdorff_distance(route_m, trail_m)
+            if distance <= self.max_distance_m and (best is None or distance < best[1]):
+                best = (hike.id, distance)
+
+        return best
+
+    def _match_by_proximity(self, start: Tuple[float, float], nearby: NearbyLookup) -> Optional[TrailMatch]:
+        """Fallback for routes without geometry: the only hike near the start point"""
+        found = nearby(start[0], start[1], self.search_radius_km)
+        if len(found) == 1:
+            return found[0][1].id, None
+        return None
+
+    @staticmethod
+    def _nearby_from_db(db: Session) -> NearbyLookup:
+        """Look candidates up with the geohash index"""
+        return lambda lat, lng, radius_km: geo_service.nearby(db, lat, lng, radius_km)
+
+    @staticmethod
+    def _nearby_from_pool(pool: List[Hike]) -> NearbyLookup:
+        """Filter candidates from hikes already loaded for a batch"""
+        def nearby(lat: float, lng: float, radius_km: float):
+            found = []
+            for hike in pool:
+                distance = haversine_km(lat, lng, hike.latitude, hike.longitude)
+                if distance <= radius_km:
+                    found.append((distance, hike))
+            return sorted(found, key=lambda item: (item[0], item[1].id))
+        return nearby
+
+    @staticmethod
+    def _route(activity: StravaActivity) -> Optional[np.ndarray]:
+        if not activity.map_summary_polyline:
+            return None
+        try:
+            route = _decode_polyline(activity.map_summary_polyline)
+        except ValueError:
+            return None
+        return route if len(route) else None
+
+    @staticmethod
+    def _start_point(activity: StravaActivity) -> Optional[Tuple[float, float]]:
+        if not activity.start_latlng:
+            return None
+        try:
+            coords = json.loads(activity.start_latlng)
+        except (TypeError, ValueError):
+            return None
+        if not coords or len(coords) != 2:
+            return None
+        return float(coords[0]), float(coords[1])
+
+
+# Singleton instance
+trail_matcher = TrailMatcher()
@@ -0,0 +1,51 @@
+"""
+Import fingerprints for duplicate detection
+A content hash recognises a re-uploaded file; a route signature (start
+minute and start cell) recognises the same recording arriving another way,
+e.g. a GPX export of an activity already synced from Strava. Both are short
+strings looked up through indexes; signature hits are confirmed by length.
+"""
+import hashlib
+from typing import BinaryIO, Optional, Union
+
+from utils.geo import geohash_encode
+from utils.track_metrics import parse_timestamp
+
+# Start cell: 7 geohash characters is roughly 150m x 150m
+SIGNATURE_CELL_PRECISION = 7
+# Two recordings with the same signature are one hike if their lengths differ by less than this
+SIGNATURE_LENGTH_TOLERANCE = 0.1
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(source: Union[bytes, BinaryIO]) -> str:
+    """SHA-256 of raw bytes or of a binary file object read to the end, as hex"""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+    else:
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def route_signature(start_time, latitude: Optional[float], longitude: Optional[float]) -> Optional[str]:
+    """
+    "<start minute>:<start cell>" for a recording starting at start_time
+    (datetime, ISO string or Unix seconds; naive times are UTC) at a point,
+    or None without a start time or position.
+    """
+    if latitude is None or longitude is None:
+        return None
+    seconds = parse_timestamp(start_time)
+    if seconds != seconds:  # NaN
+        return None
+    return f"{int(seconds // 60)}:{geohash_encode(latitude, longitude, SIGNATURE_CELL_PRECISION)}"
+
+
+def same_length(a_km: Optional[float], b_km: Optional[float], tolerance: float = SIGNATURE_LENGTH_TOLERANCE) -> bool:
+    """Whether two recorded distances agree within a relative tolerance (unknown lengths agree)"""
+    if not a_km or not b_km:
+        return True
+    return abs(a_km - b_km) <= tolerance * max(a_km, b_km)
@@ -0,0 +1,201 @@
+"""
+Fast decoding of FIT activity files
+Reads only what an import needs - record positions, altitude, timestamps
+and heart rate, plus the session totals - with one precompiled struct per
+message definition, and converts semicircles to degrees in a single NumPy
+step. Anything it does not understand raises FitFormatError so callers can
+fall back to fitparse.
+"""
+import struct
+from array import array
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from utils.track_metrics import TrackArrays
+
+# Seconds between the Unix epoch and the FIT epoch (1989-12-31 00:00 UTC)
+FIT_EPOCH = 631065600
+SEMICIRCLES_TO_DEGREES = 180 / 2 ** 31
+
+MESG_RECORD = 20
+MESG_SESSION = 18
+FIELD_TIMESTAMP = 253
+
+# record: field number -> name
+RECORD_FIELDS = {0: "lat", 1: "lng", 2: "altitude", 3: "heart_rate", 78: "enhanced_altitude"}
+# session: field number -> (name, scale)
+SESSION_FIELDS = {
+    7: ("total_elapsed_time", 1000),   # s
+    8: ("total_timer_time", 1000),     # s
+    9: ("total_distance", 100),        # m
+    22: ("total_ascent", 1),           # m
+    23: ("total_descent", 1),          # m
+}
+
+# Base type number -> (struct code, size, invalid value)
+BASE_TYPES = {
+    0x00: ("B", 1, 0xFF), 0x01: ("b", 1, 0x7F), 0x02: ("B", 1, 0xFF),
+    0x03: ("h", 2, 0x7FFF), 0x04: ("H", 2, 0xFFFF),
+    0x05: ("i", 4, 0x7FFFFFFF), 0x06: ("I", 4, 0xFFFFFFFF),
+    0x08: ("f", 4, None), 0x09: ("d", 8, None),
+    0x0A: ("B", 1, 0x00), 0x0B: ("H", 2, 0x0000), 0x0C: ("I", 4, 0x00000000),
+    0x0E: ("q", 8, 0x7FFFFFFFFFFFFFFF), 0x0F: ("Q", 8, 0xFFFFFFFFFFFFFFFF), 0x10: ("Q", 8, 0),
+}
+
+
+class FitFormatError(Exception):
+    """The file uses something this decoder does not handle"""
+
+
+class FitData(NamedTuple):
+    track: TrackArrays
+    heart_rate: Optional[np.ndarray]  # bpm per track point, NaN where missing
+    session: Dict[str, float]
+
+
+class _Definition:
+    """A compiled message definition: one struct for the whole data message"""
+    __slots__ = ("global_number", "size", "struct", "names", "invalid")
+
+    def __init__(self, global_number: int, big_endian: bool, fields, developer_size: int, wanted: Dict[int, str]):
+        self.global_number = global_number
+        codes = [">" if big_endian else "<"]
+        self.names = []
+        self.invalid = []
+        size = 0
+        for number, field_size, base_type in fields:
+            base = BASE_TYPES.get(base_type & 0x1F)
+            if number in wanted and base and base[1] == field_size:
+                codes.append(base[0])
+                self.names.append(wanted[number])
+                self.invalid.append(base[2])
+            else:
+                codes.append(f"{field_size}x")
+            size += field_size
+        if developer_size:
+            codes.append(f"{developer_size}x")
+        self.size = size + developer_size
+        self.struct = struct.Struct("".join(codes))
+
+
+def decode_fit(data: bytes, max_points: Optional[int] = None) -> FitData:
+    """Decode the record and session messages of a FIT file"""
+    data = memoryview(data)
+    if len(data) < 12:
+        raise FitFormatError("File is too short")
+
+    latitude, longitude = array("i"), array("i")
+    altitude, heart_rate, timestamp = array("d"), array("d"), array("d")
+    session: Dict[str, float] = {}
+
+    offset = 0
+    # A file may chain several FIT segments, each with its own header and CRC
+    while offset + 12 <= len(data):
+        header_size = data[offset]
+        if header_size < 12 or bytes(data[offset + 8:offset + 12]) != b".FIT":
+            if offset == 0:
+                raise FitFormatError("Not a FIT file")
+            break
+        data_size = struct.unpack_from("<I", data, offset + 4)[0]
+        start = offset + header_size
+        end = start + data_size
+        if end > len(data):
+            raise FitFormatError("File is truncated")
+
+        _decode_records(data, start, end, latitude, longitude, altitude, heart_rate, timestamp, session, max_points)
+        offset = end + 2  # Skip the file CRC
+
+    # Keep records with a position, converting semicircles in one step
+    lat = np.frombuffer(latitude, dtype=np.int32)
+    lng = np.frombuffer(longitude, dtype=np.int32)
+    valid = (lat != 0x7FFFFFFF) & (lng != 0x7FFFFFFF)
+    elevation = np.frombuffer(altitude, dtype=np.float64)[valid]
+    times = np.frombuffer(timestamp, dtype=np.float64)[valid]
+    heart = np.frombuffer(heart_rate, dtype=np.float64)[valid]
+
+    track = TrackArrays(
+        lat[valid] * SEMICIRCLES_TO_DEGREES,
+        lng[valid] * SEMICIRCLES_TO_DEGREES,
+        None if np.isnan(elevation).all() else elevation,
+        None if np.isnan(times).all() else times
+    )
+    return FitData(track, None if np.isnan(heart).all() else heart, session)
+
+
+def _decode_records(data, offset, end, latitude, longitude, altitude, heart_rate, timestamp, session, max_points):
+    definitions: Dict[int, _Definition] = {}
+    last_timestamp = None
+    nan = float("nan")
+
+    while offset < end:
+        header = data[offset]
+        offset += 1
+
+        if header & 0x80:
+            # Compressed timestamp header: data message with a 5-bit time offset
+            local = (header >> 5) & 0x03
+            time_offset = header & 0x1F
+            if last_timestamp is None:
+                raise FitFormatError("Compressed timestamp before any timestamp")
+            message_time = (last_timestamp & ~0x1F) + time_offset
+            if time_offset < (last_timestamp & 0x1F):
+                message_time += 0x20
+            last_timestamp = message_time
+        elif header & 0x40:
+            # Definition message
+            local = header & 0x0F
+            big_endian = data[offset + 1] == 1
+            global_number = struct.unpack_from(">H" if big_endian else "<H", data, offset + 2)[0]
+            field_count = data[offset + 4]
+            offset += 5
+            fields = [tuple(data[offset + 3 * i:offset + 3 * i + 3]) for i in range(field_count)]
+            offset += 3 * field_count
+            developer_size = 0
+            if header & 0x20:
+                developer_count = data[offset]
+                offset += 1
+                developer_size = sum(data[offset + 3 * i + 1] for i in range(developer_count))
+                offset += 3 * developer_count
+            if global_number == MESG_RECORD:
+                wanted = {**RECORD_FIELDS, FIELD_TIMESTAMP: "timestamp"}
+            elif global_number == MESG_SESSION:
+                wanted = {number: name for number, (name, _) in SESSION_FIELDS.items()}
+            else:
+                wanted = {FIELD_TIMESTAMP: "timestamp"}
+            definitions[local] = _Definition(global_number, big_endian, fields, developer_size, wanted)
+            continue
+        else:
+            local = header & 0x0F
+            message_time = None
+
+        definition = definitions.get(local)
+        if definition is None:
+            raise FitFormatError(f"Data message for undefined local type {local}")
+        if offset + definition.size > end:
+            raise FitFormatError("Message runs past the end of the data")
+
+        values = definition.struct.unpack_from(data, offset)
+        offset += definition.size
+        fields = {
+            name: value for name, value, invalid in zip(definition.names, values, definition.invalid)
+            if value != invalid
+        }
+
+        if "timestamp" in fields:
+            last_timestamp = message_time = fields["timestamp"]
+
+        if definition.global_number == MESG_RECORD:
+            if max_points is not None and len(latitude) >= max_points:
+                raise ValueError(f"Track has more than {max_points:,} points")
+            latitude.append(fields.get("lat", 0x7FFFFFFF))
+            longitude.append(fields.get("lng", 0x7FFFFFFF))
+            raw_altitude = fields.get("enhanced_altitude", fields.get("altitude"))
+            altitude.append(raw_altitude / 5 - 500 if raw_altitude is not None else nan)
+            heart_rate.append(fields.get("heart_rate", nan))
+            timestamp.append(message_time + FIT_EPOCH if message_time is not None else nan)
+        elif definition.global_number == MESG_SESSION and not session:
+            session.update({
+                name: fields[name] / scale
+                for name, scale in SESSION_FIELDS.values() if name in fields
+            })
@@ -0,0 +1,96 @@
+"""
+Geospatial helpers for trail lookups
+Geohash encoding for indexed proximity search and haversine distances
+"""
+import math
+from typing import List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Precision stored on hikes: 9 characters is roughly a 5m x 5m cell
+GEOHASH_PRECISION = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash_encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Bits alternate longitude, latitude
+
+    while len(chars) < precision:
+        interval, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell at the given precision"""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def covering_geohashes(lat: float, lng: float, radius_km: float) -> Optional[List[str]]:
+    """
+    Geohash prefixes whose cells together cover a circle around a point.
+    Uses the coarsest precision at which a cell is at least as large as the
+    radius, so the point's cell plus its eight neighbours always cover it.
+    Returns None when the radius is too large for any prefix to help.
+    """
+    km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+    # Longitude degrees shrink towards the poles; size cells for the worst latitude in range
+    worst_lat = min(89.9, abs(lat) + radius_km / km_per_degree)
+    lng_scale = math.cos(math.radians(worst_lat))
+
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        height, width = geohash_cell_size(candidate)
+        if height * km_per_degree < radius_km or width * km_per_degree * lng_scale < radius_km:
+            break
+        precision = candidate
+
+    if precision == 0:
+        return None
+
+    height, width = geohash_cell_size(precision)
+    prefixes = set()
+    for d_lat in (-height, 0.0, height):
+        for d_lng in (-width, 0.0, width):
+            cell_lat = max(-90.0, min(90.0, lat + d_lat))
+            cell_lng = (lng + d_lng + 180.0) % 360.0 - 180.0
+            prefixes.add(geohash_encode(cell_lat, cell_lng, precision))
+    return sorted(prefixes)
+
+
+def geohash_range(prefix: str) -> Tuple[str, str]:
+    """Inclusive (low, high) bounds of full-precision geohashes under a prefix"""
+    padding = GEOHASH_PRECISION - len(prefix)
+    return prefix + _BASE32[0] * padding, prefix + _BASE32[-1] * padding
@@ -0,0 +1,54 @@
+"""
+Google encoded polyline format, as used by Strava's map.summary_polyline
+https://developers.google.com/maps/documentation/utilities/polylinealgorithm
+"""
+from typing import Iterable, List, Tuple
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Decode a polyline string into (lat, lng) pairs"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                if index >= length:
+                    raise ValueError("Truncated polyline")
+                byte = ord(encoded[index]) - 63
+                if not 0 <= byte < 64:
+                    raise ValueError(f"Invalid polyline character {encoded[index]!r}")
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+
+    return points
+
+
+def encode(points: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """Encode (lat, lng) pairs as a polyline string"""
+    factor = 10 ** precision
+    chunks = []
+    prev_lat = prev_lng = 0
+
+    for lat, lng in points:
+        lat_i, lng_i = int(round(lat * factor)), int(round(lng * factor))
+        for delta in (lat_i - prev_lat, lng_i - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        prev_lat, prev_lng = lat_i, lng_i
+
+    return "".join(chunks)
@@ -0,0 +1,88 @@
+"""
+Denormalized rating aggregates on hikes
+Review count, rating sum, average and star histogram are kept on the hike row
+so trail listings can show and sort by rating without touching reviews.
+"""
+
+from typing import Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+
+def star_bucket(rating: float) -> int:
+    """Histogram bucket (1-5) for a possibly fractional rating"""
+    return min(5, max(1, int(rating + 0.5)))
+
+
+class RatingService:
+    """
+    Maintain per-hike rating aggregates. Built with the Hike and Review
+    models, so the API and the Streamlit app share it over their own mappings.
+    """
+
+    def __init__(self, hike_model, review_model):
+        self.hike_model = hike_model
+        self.review_model = review_model
+
+    def review_added(self, db: Session, hike_id: int, rating: float):
+        """Count a new review, in the caller's transaction"""
+        self._apply(db, hike_id, rating, 1)
+
+    def review_removed(self, db: Session, hike_id: int, rating: float):
+        """Discount a deleted review, in the caller's transaction"""
+        self._apply(db, hike_id, rating, -1)
+
+    def _apply(self, db: Session, hike_id: int, rating: float, sign: int):
+        """Atomically adjust the aggregates; the right-hand sides read pre-update values"""
+        Hike = self.hike_model
+        new_count = Hike.review_count + sign
+        new_sum = Hike.rating_sum + sign * rating
+        bucket = getattr(Hike, f"rating_{star_bucket(rating)}_count")
+
+        db.query(Hike).filter(Hike.id == hike_id).update({
+            Hike.review_count: new_count,
+            Hike.rating_sum: new_sum,
+            Hike.avg_rating: case((new_count > 0, new_sum / new_count), else_=None),
+            bucket: bucket + sign,
+        }, synchronize_session=False)
+
+    def rebuild(self, db: Session, hike_id: Optional[int] = None, only_missing: bool = False) -> int:
+        """
+        Recompute aggregates from the reviews table for one hike or all hikes.
+        With only_missing, hikes that already have counts are left alone.
+        Returns the number of hikes updated.
+        """
+        Hike, Review = self.hike_model, self.review_model
+        # Same boundaries as star_bucket(): [.., 1.5) -> 1, [1.5, 2.5) -> 2, ... [4.5, ..] -> 5
+        buckets = [
+            func.sum(case((Review.rating < 1.5, 1), else_=0)),
+            func.sum(case(((Review.rating >= 1.5) & (Review.rating < 2.5), 1), else_=0)),
+            func.sum(case(((Review.rating >= 2.5) & (Review.rating < 3.5), 1), else_=0)),
+            func.sum(case(((Review.rating >= 3.5) & (Review.rating < 4.5), 1), else_=0)),
+            func.sum(case((Review.rating >= 4.5, 1), else_=0)),
+        ]
+        query = db.query(Review.hike_id, func.count(Review.id), func.sum(Review.rating), *buckets).group_by(Review.hike_id)
+
+        hikes = db.query(Hike)
+        if hike_id is not None:
+            query = query.filter(Review.hike_id == hike_id)
+            hikes = hikes.filter(Hike.id == hike_id)
+        if only_missing:
+            hikes = hikes.filter(Hike.review_count == 0)
+
+        totals = {row[0]: row[1:] for row in query.all()}
+        updated = 0
+        for hike in hikes.all():
+            if hike.id not in totals and only_missing:
+                continue
+            count, rating_sum, *histogram = totals.get(hike.id, (0, 0, 0, 0, 0, 0, 0))
+            hike.review_count = count
+            hike.rating_sum = float(rating_sum or 0)
+            hike.avg_rating = hike.rating_sum / count if count else None
+            for stars, value in enumerate(histogram, start=1):
+                setattr(hike, f"rating_{stars}_count", int(value or 0))
+            updated += 1
+
+        db.flush()
+        return updated
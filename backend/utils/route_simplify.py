@@ -0,0 +1,82 @@
+"""
+Douglas-Peucker route simplification
+Ranks every point of a track once by the tolerance at which Douglas-Peucker
+would still keep it, so simplified copies for any number of tolerances are
+cheap index selections of the same ranking.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from utils.geo import EARTH_RADIUS_KM
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+# Ground resolution of a Web Mercator tile pyramid at zoom 0, metres per pixel at the equator
+METRES_PER_PIXEL_ZOOM_0 = 2 * math.pi * EARTH_RADIUS_M / 256
+
+
+def project_metres(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to an (N, 2) array of metres around the mean latitude"""
+    scale = math.cos(math.radians(float(np.mean(latitude)))) if len(latitude) else 1.0
+    return np.column_stack((
+        EARTH_RADIUS_M * np.radians(longitude) * scale,
+        EARTH_RADIUS_M * np.radians(latitude)
+    ))
+
+
+def douglas_peucker_ranks(points: np.ndarray, min_tolerance: float = 0.0) -> np.ndarray:
+    """
+    For each point of an (N, 2) metric polyline, the largest tolerance at which
+    Douglas-Peucker keeps it: the endpoints are inf, and points that would only
+    survive a tolerance below min_tolerance are 0. Simplifying at tolerance t
+    keeps exactly the points whose rank is >= t.
+    """
+    count = len(points)
+    ranks = np.zeros(count)
+    if count == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+
+    stack = [(0, count - 1, np.inf)]
+    while stack:
+        first, last, parent_rank = stack.pop()
+        if last - first < 2:
+            continue
+
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        segment = end - start
+        length_sq = float(segment @ segment)
+        if length_sq > 0:
+            along = np.clip((inner - start) @ segment / length_sq, 0.0, 1.0)
+            offsets = inner - (start + along[:, None] * segment)
+        else:
+            offsets = inner - start
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+
+        farthest = int(distances.argmax())
+        distance = float(distances[farthest])
+        if distance < min_tolerance:
+            continue
+
+        # A point is only kept while the split that introduced it is kept
+        rank = min(distance, parent_rank)
+        split = first + 1 + farthest
+        ranks[split] = rank
+        stack.append((first, split, rank))
+        stack.append((split, last, rank))
+
+    return ranks
+
+
+def simplify_indices(ranks: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the points Douglas-Peucker keeps at a tolerance"""
+    return np.flatnonzero(ranks >= max(tolerance, np.finfo(float).tiny))
+
+
+def zoom_tolerance(zoom: float, latitude: Optional[float] = None, pixels: float = 1.0) -> float:
+    """Ground distance in metres covered by a number of map pixels at a web map zoom level"""
+    scale = math.cos(math.radians(latitude)) if latitude is not None else 1.0
+    return pixels * METRES_PER_PIXEL_ZOOM_0 * scale / (2 ** zoom)
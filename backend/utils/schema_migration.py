@@ -0,0 +1,42 @@
+"""
+Schema migration helpers
+Shared by migrate_schema.py and the Streamlit app's migration scripts; there
+is no migration framework, so new columns are added with ALTER TABLE.
+"""
+from typing import List, Tuple, Union
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import TypeEngine
+
+# (table, column, DDL or SQLAlchemy type)
+NewColumn = Tuple[str, str, Union[str, TypeEngine]]
+
+
+def add_missing_columns(engine: Engine, new_columns: List[NewColumn]):
+    """Add columns that create_all() cannot add to existing tables"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table, column, ddl in new_columns:
+            if table not in existing_tables:
+                continue
+
+            columns = [col["name"] for col in inspector.get_columns(table)]
+            if column in columns:
+                print(f"  ℹ️  '{table}.{column}' already exists")
+                continue
+
+            if not isinstance(ddl, str):
+                ddl = ddl.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            print(f"  ✅ Added '{table}.{column}'")
+
+
+def create_missing_indexes(engine: Engine, metadata: MetaData):
+    """Create indexes declared on models but missing from existing tables"""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print("  ✅ Indexes up to date")
@@ -0,0 +1,240 @@
+"""
+Vectorized metrics for recorded tracks
+Distance, elevation gain/loss, moving time, pace and bounds computed over
+contiguous NumPy arrays, shared by the GPX, FIT and TCX parsers.
+"""
+from array import array
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.geo import EARTH_RADIUS_KM
+
+# Elevation changes smaller than this are treated as noise (hysteresis band)
+ELEVATION_HYSTERESIS_M = 5.0
+# Moving-average window applied to elevations before gain/loss, in points
+ELEVATION_SMOOTHING_POINTS = 5
+# Segments slower than this count as stopped
+MOVING_SPEED_KMH = 1.0
+# Longer gaps between fixes (auto-pause, lost signal) never count as moving
+MAX_MOVING_GAP_SECONDS = 300.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class TrackArrays(NamedTuple):
+    """Track columns; missing elevations and times are NaN"""
+    latitude: np.ndarray
+    longitude: np.ndarray
+    elevation: Optional[np.ndarray]
+    time: Optional[np.ndarray]  # Unix seconds
+
+
+class TrackMetrics(NamedTuple):
+    point_count: int
+    distance_km: float
+    elevation_gain_m: float
+    elevation_loss_m: float
+    min_elevation_m: Optional[float]
+    max_elevation_m: Optional[float]
+    elapsed_hours: float
+    moving_hours: float
+    pace_min_per_km: Optional[float]  # Over moving time
+    center_latitude: float
+    center_longitude: float
+    bounds: Optional[Tuple[float, float, float, float]]  # south, west, north, east
+
+
+def track_arrays(points: List[Dict]) -> TrackArrays:
+    """
+    Columns from {latitude, longitude, elevation?, time?} dicts. Times may be
+    datetimes, ISO strings or Unix seconds; naive datetimes are UTC.
+    """
+    # None becomes NaN in a float array
+    elevation = np.array([p.get("elevation") for p in points], dtype=np.float64)
+    times = np.array([parse_timestamp(p.get("time")) for p in points], dtype=np.float64)
+    return TrackArrays(
+        np.array([p["latitude"] for p in points], dtype=np.float64),
+        np.array([p["longitude"] for p in points], dtype=np.float64),
+        None if np.isnan(elevation).all() else elevation,
+        None if np.isnan(times).all() else times
+    )
+
+
+class TrackBuffer:
+    """
+    Growable typed columns for points read one at a time, about 32 bytes
+    per point. Raises ValueError once more than max_points are added.
+    """
+
+    def __init__(self, max_points: Optional[int] = None):
+        self.max_points = max_points
+        self._latitude = array("d")
+        self._longitude = array("d")
+        self._elevation = array("d")
+        self._time = array("d")
+
+    def __len__(self) -> int:
+        return len(self._latitude)
+
+    def append(self, latitude: float, longitude: float, elevation: float = np.nan, time: float = np.nan):
+        """Add a point; pass NaN for a missing elevation or time (Unix seconds)"""
+        if self.max_points is not None and len(self._latitude) >= self.max_points:
+            raise ValueError(f"Track has more than {self.max_points:,} points")
+        self._latitude.append(latitude)
+        self._longitude.append(longitude)
+        self._elevation.append(elevation)
+        self._time.append(time)
+
+    def arrays(self) -> TrackArrays:
+        """The points as NumPy columns, sharing the buffers' memory"""
+        elevation = np.frombuffer(self._elevation, dtype=np.float64)
+        time = np.frombuffer(self._time, dtype=np.float64)
+        return TrackArrays(
+            np.frombuffer(self._latitude, dtype=np.float64),
+            np.frombuffer(self._longitude, dtype=np.float64),
+            None if np.isnan(elevation).all() else elevation,
+            None if np.isnan(time).all() else time
+        )
+
+
+def segment_distances_km(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Haversine distance of each consecutive pair of points"""
+    phi = np.radians(latitude)
+    d_phi = np.diff(phi)
+    d_lambda = np.radians(np.diff(longitude))
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def elevation_change(
+    elevation: np.ndarray,
+    hysteresis_m: float = ELEVATION_HYSTERESIS_M,
+    smoothing_points: int = ELEVATION_SMOOTHING_POINTS
+) -> Tuple[float, float]:
+    """
+    Cumulative (gain, loss) in metres. Elevations are smoothed, then climbs
+    and descents are only counted once they swing more than hysteresis_m
+    from the last turning point, so sensor noise does not add up.
+    """
+    values = elevation[~np.isnan(elevation)]
+    if len(values) < 2:
+        return 0.0, 0.0
+
+    if smoothing_points > 1 and len(values) > smoothing_points:
+        # Edge-padded moving average keeps the series length
+        pad = smoothing_points // 2
+        padded = np.pad(values, (pad, smoothing_points - 1 - pad), mode="edge")
+        values = np.convolve(padded, np.ones(smoothing_points) / smoothing_points, mode="valid")
+
+    # Only the turning points matter for swing sizes, which leaves a short loop
+    steps = np.diff(values)
+    moving = np.flatnonzero(steps)
+    if not len(moving):
+        return 0.0, 0.0
+    signs = np.sign(steps[moving])
+    turns = moving[1:][signs[1:] != signs[:-1]]
+    extremes = values[np.concatenate(([0], turns, [len(values) - 1]))].tolist()
+
+    gain = loss = 0.0
+    last = peak = trough = extremes[0]
+    direction = 0
+    for value in extremes[1:]:
+        if direction > 0:
+            if value > peak:
+                peak = value
+            elif peak - value >= hysteresis_m:
+                gain += peak - last
+                last, trough, direction = peak, value, -1
+        elif direction < 0:
+            if value < trough:
+                trough = value
+            elif value - trough >= hysteresis_m:
+                loss += last - trough
+                last, peak, direction = trough, value, 1
+        elif value - last >= hysteresis_m:
+            peak, direction = value, 1
+        elif last - value >= hysteresis_m:
+            trough, direction = value, -1
+
+    if direction > 0:
+        gain += peak - last
+    elif direction < 0:
+        loss += last - trough
+    return gain, loss
+
+
+def compute_track_metrics(
+    latitude: Sequence[float],
+    longitude: Sequence[float],
+    elevation: Optional[Sequence[float]] = None,
+    time: Optional[Sequence[float]] = None,
+    moving_speed_kmh: float = MOVING_SPEED_KMH
+) -> TrackMetrics:
+    """Metrics for a track given as coordinate arrays (degrees, metres, Unix seconds)"""
+    latitude = np.ascontiguousarray(latitude, dtype=np.float64)
+    longitude = np.ascontiguousarray(longitude, dtype=np.float64)
+    count = len(latitude)
+    if count == 0:
+        return TrackMetrics(0, 0.0, 0.0, 0.0, None, None, 0.0, 0.0, None, 0.0, 0.0, None)
+
+    segments_km = segment_distances_km(latitude, longitude)
+    distance_km = float(segments_km.sum())
+
+    gain = loss = 0.0
+    min_elevation = max_elevation = None
+    if elevation is not None:
+        elevation = np.ascontiguousarray(elevation, dtype=np.float64)
+        if not np.isnan(elevation).all():
+            gain, loss = elevation_change(elevation)
+            min_elevation, max_elevation = float(np.nanmin(elevation)), float(np.nanmax(elevation))
+
+    elapsed_hours = moving_hours = moving_km = 0.0
+    if time is not None:
+        time = np.ascontiguousarray(time, dtype=np.float64)
+        known = ~np.isnan(time)
+        if known.sum() > 1:
+            elapsed_hours = float(np.nanmax(time) - np.nanmin(time)) / 3600
+            # Distance between consecutive timed fixes, so untimed points still count
+            cumulative = np.concatenate(([0.0], np.cumsum(segments_km)))[known]
+            seconds = np.diff(time[known])
+            kilometres = np.diff(cumulative)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speed = kilometres / (seconds / 3600)
+            moving = (seconds > 0) & (seconds <= MAX_MOVING_GAP_SECONDS) & (speed >= moving_speed_kmh)
+            moving_hours = float(seconds[moving].sum()) / 3600
+            moving_km = float(kilometres[moving].sum())
+
+    pace = None
+    if moving_km > 0:
+        pace = moving_hours * 60 / moving_km
+
+    south, north = float(latitude.min()), float(latitude.max())
+    west, east = float(longitude.min()), float(longitude.max())
+    return TrackMetrics(
+        point_count=count,
+        distance_km=distance_km,
+        elevation_gain_m=gain,
+        elevation_loss_m=loss,
+        min_elevation_m=min_elevation,
+        max_elevation_m=max_elevation,
+        elapsed_hours=elapsed_hours,
+        moving_hours=moving_hours,
+        pace_min_per_km=pace,
+        center_latitude=float(latitude.mean()),
+        center_longitude=float(longitude.mean()),
+        bounds=(south, west, north, east)
+    )
+
+
+def parse_timestamp(value: Union[datetime, str, float, None]) -> float:
+    """Unix seconds from a datetime, ISO 8601 string or number; naive times are UTC, None is NaN"""
+    if isinstance(value, datetime):
+        # Subtracting the epoch avoids making a tz-aware copy of naive datetimes
+        return value.timestamp() if value.tzinfo else (value - _EPOCH).total_seconds()
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        return parse_timestamp(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    return float(value)
@@ -1,88 +1,139 @@
 """
 Utility functions for parsing wearable device tracking files
 Supports GPX, FIT, and TCX formats from smartwatches and fitness trackers
+GPX and TCX are streamed with iterparse into typed point buffers, clearing
+each element once read, so memory follows the point count rather than the
+document size.
 """
-import gpxpy
-import gpxpy.gpx
 from fitparse import FitFile
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Optional, Union
+import io
+import os
+import struct
 import xml.etree.ElementTree as ET
 
+import numpy as np
+
+from utils.fit_decoder import SEMICIRCLES_TO_DEGREES, FitData, FitFormatError, decode_fit
+from utils.track_metrics import TrackArrays, TrackBuffer, compute_track_metrics, parse_timestamp
+
+# Default ceilings for a single file
+MAX_FILE_BYTES = 100 * 1024 * 1024
+MAX_POINTS = 500_000
+
+# A file path-free upload: raw bytes or a binary file object
+Source = Union[bytes, BinaryIO]
+
+# (FIT session field, result key, divisor from the field's units)
+FIT_SESSION_TOTALS = (
+    ('total_distance', 'total_distance_km', 1000),
+    ('total_elapsed_time', 'duration_hours', 3600),
+    ('total_timer_time', 'moving_time_hours', 3600),
+    ('total_ascent', 'elevation_gain_m', 1),
+    ('total_descent', 'elevation_loss_m', 1),
+)
+
+
+def _open(source: Source) -> BinaryIO:
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _source_size(source: Source) -> Optional[int]:
+    """Size in bytes without reading the source, if it can be known"""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    try:
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _stream(source: Source, point_tag: str, read_point, on_end=None):
+    """
+    Run iterparse over a document, taking its namespace (GPX 1.0/1.1, TCX
+    v1/v2 or none) from the root element. read_point is called with each
+    complete point element and the namespace prefix; the element and any
+    earlier siblings are discarded afterwards. on_end sees every other
+    element end, for metadata.
+    """
+    events = ET.iterparse(_open(source), events=('start', 'end'))
+    prefix = None
+    parents = []
+    for event, elem in events:
+        if event == 'start':
+            if prefix is None:
+                # The root element carries the namespace; resolve tag names once
+                prefix = elem.tag[:elem.tag.index('}') + 1] if elem.tag.startswith('{') else ''
+                point_tag = prefix + point_tag
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if elem.tag == point_tag:
+            read_point(elem, prefix)
+            # Drop the finished point from its parent so the tree never grows
+            if parents:
+                del parents[-1][:]
+        elif on_end is not None:
+            on_end(elem, prefix, parents)
+
+
+def _float(text: Optional[str]) -> float:
+    try:
+        return float(text) if text else np.nan
+    except ValueError:
+        return np.nan
+
+
+def _time(text: Optional[str]) -> float:
+    try:
+        return parse_timestamp(text.strip()) if text else np.nan
+    except ValueError:
+        return np.nan
+
+
 class WearableDataParser:
     """Parse tracking data from wearable devices"""
     
     @staticmethod
-    def parse_gpx(file_content: bytes) -> Dict:
+    def parse_gpx(file_content: Source, max_points: int = MAX_POINTS) -> Dict:
         """
         Parse GPX file from devices like Garmin, Strava, etc.
-        Returns hiking session data with route coordinates
+        Returns hiking session data with the track as arrays
         """
         try:
-            gpx = gpxpy.parse(file_content.decode('utf-8'))
-            
-            # Extract metadata
-            name = gpx.name or "Imported Hike"
-            description = gpx.description or ""
-            
-            # Extract all track points
-            all_points = []
-            total_distance = 0
-            min_elevation = float('inf')
-            max_elevation = float('-inf')
-            start_time = None
-            end_time = None
-            
-            for track in gpx.tracks:
-                for segment in track.segments:
-                    for point in segment.points:
-                        all_points.append({
-                            'latitude': point.latitude,
-                            'longitude': point.longitude,
-                            'elevation': point.elevation or 0,
-                            'time': point.time
-                        })
-                        
-                        if point.elevation:
-                            min_elevation = min(min_elevation, point.elevation)
-                            max_elevation = max(max_elevation, point.elevation)
-                        
-                        if point.time:
-                            if not start_time:
-                                start_time = point.time
-                            end_time = point.time
-            
-            # Calculate total distance
-            total_distance = gpx.length_3d() / 1000  # Convert to km
+            points = TrackBuffer(max_points)
+            metadata = {}
             
-            # Calculate elevation gain
-            elevation_gain = max_elevation - min_elevation if min_elevation != float('inf') else 0
+            def read_point(elem, prefix):
+                points.append(
+                    float(elem.get('lat')),
+                    float(elem.get('lon')),
+                    _float(elem.findtext(prefix + 'ele')),
+                    _time(elem.findtext(prefix + 'time'))
+                )
             
-            # Calculate duration
-            duration_hours = 0
-            if start_time and end_time:
-                duration = end_time - start_time
-                duration_hours = duration.total_seconds() / 3600
+            def on_end(elem, prefix, parents):
+                # Document name and description, from <metadata> (GPX 1.1) or the root (GPX 1.0)
+                local = elem.tag[len(prefix):]
+                if local in ('name', 'desc') and len(parents) <= 2 and local not in metadata:
+                    if len(parents) == 1 or parents[-1].tag == prefix + 'metadata':
+                        metadata[local] = (elem.text or '').strip()
+                elif local in ('trk', 'rte', 'wpt'):
+                    elem.clear()
             
-            # Get center point for location
-            center_lat = sum(p['latitude'] for p in all_points) / len(all_points) if all_points else 0
-            center_lon = sum(p['longitude'] for p in all_points) / len(all_points) if all_points else 0
+            _stream(file_content, 'trkpt', read_point, on_end)
             
-            return {
-                'success': True,
-                'name': name,
-                'description': description,
-                'route_coordinates': all_points,
-                'total_distance_km': round(total_distance, 2),
-                'elevation_gain_m': round(elevation_gain, 2),
-                'duration_hours': round(duration_hours, 2),
-                'center_latitude': center_lat,
-                'center_longitude': center_lon,
-                'start_time': start_time.isoformat() if start_time else None,
-                'end_time': end_time.isoformat() if end_time else None,
-                'total_points': len(all_points),
-                'source': 'GPX'
-            }
+            return WearableDataParser._summarize(
+                points.arrays(),
+                source='GPX',
+                name=metadata.get('name') or "Imported Hike",
+                description=metadata.get('desc') or ""
+            )
         
         except Exception as e:
             return {
@@ -91,98 +142,41 @@ class WearableDataParser:
             }
     
     @staticmethod
-    def parse_fit(file_content: bytes) -> Dict:
+    def parse_fit(file_content: Source, max_points: int = MAX_POINTS) -> Dict:
         """
         Parse FIT file from Garmin watches
-        Returns hiking session data with route coordinates
+        Returns hiking session data with the track as arrays
         """
         try:
-            fitfile = FitFile(file_content)
-            
-            # Extract session data
-            session_data = None
-            for record in fitfile.get_messages('session'):
-                session_data = record
-                break
-            
-            # Extract track points
-            all_points = []
-            start_time = None
-            end_time = None
-            
-            for record in fitfile.get_messages('record'):
-                point = {}
-                
-                for data in record:
-                    if data.name == 'position_lat' and data.value is not None:
-                        point['latitude'] = data.value * (180 / 2**31)  # Convert semicircles to degrees
-                    elif data.name == 'position_long' and data.value is not None:
-                        point['longitude'] = data.value * (180 / 2**31)
-                    elif data.name == 'altitude' and data.value is not None:
-                        point['elevation'] = data.value
-                    elif data.name == 'timestamp' and data.value is not None:
-                        point['time'] = data.value
-                        if not start_time:
-                            start_time = data.value
-                        end_time = data.value
-                
-                if 'latitude' in point and 'longitude' in point:
-                    all_points.append(point)
-            
-            # Extract session metrics
-            total_distance = 0
-            duration_hours = 0
-            elevation_gain = 0
-            
-            if session_data:
-                for data in session_data:
-                    if data.name == 'total_distance' and data.value is not None:
-                        total_distance = data.value / 1000  # Convert to km
-                    elif data.name == 'total_elapsed_time' and data.value is not None:
-                        duration_hours = data.value / 3600  # Convert to hours
-                    elif data.name == 'total_ascent' and data.value is not None:
-                        elevation_gain = data.value
+            data = file_content if isinstance(file_content, (bytes, bytearray)) else file_content.read()
             
-            # Fallback: calculate distance from points if not in session
-            if total_distance == 0 and len(all_points) > 1:
-                import math
-                R = 6371  # Earth radius in km
-                for i in range(1, len(all_points)):
-                    lat1, lon1 = all_points[i-1]['latitude'], all_points[i-1]['longitude']
-                    lat2, lon2 = all_points[i]['latitude'], all_points[i]['longitude']
-                    dlat = math.radians(lat2 - lat1)
-                    dlon = math.radians(lon2 - lon1)
-                    a = (math.sin(dlat/2) * math.sin(dlat/2) +
-                         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-                         math.sin(dlon/2) * math.sin(dlon/2))
-                    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                    total_distance += R * c
+            try:
+                fit = decode_fit(data, max_points)
+            except (FitFormatError, struct.error, IndexError):
+                # Fall back to the complete (and much slower) decoder
+                fit = WearableDataParser._parse_fit_fitparse(data, max_points)
             
-            # Fallback: calculate elevation gain from points if not in session
-            if elevation_gain == 0:
-                elevations = [p.get('elevation', 0) for p in all_points if 'elevation' in p]
-                if elevations:
-                    elevation_gain = max(elevations) - min(elevations)
+            # Totals recorded by the device take precedence over ones computed from points
+            device_totals = {}
+            for name, key, scale in FIT_SESSION_TOTALS:
+                if fit.session.get(name):
+                    device_totals[key] = fit.session[name] / scale
             
-            # Calculate center point
-            center_lat = sum(p['latitude'] for p in all_points) / len(all_points) if all_points else 0
-            center_lon = sum(p['longitude'] for p in all_points) / len(all_points) if all_points else 0
+            heart_rate = {}
+            if fit.heart_rate is not None:
+                heart_rate = {
+                    'avg_heart_rate': round(float(np.nanmean(fit.heart_rate))),
+                    'max_heart_rate': round(float(np.nanmax(fit.heart_rate)))
+                }
             
-            return {
-                'success': True,
-                'name': "Imported Hike",
-                'description': "Imported from Garmin device",
-                'route_coordinates': all_points,
-                'total_distance_km': round(total_distance, 2),
-                'elevation_gain_m': round(elevation_gain, 2),
-                'duration_hours': round(duration_hours, 2),
-                'center_latitude': center_lat,
-                'center_longitude': center_lon,
-                'start_time': start_time.isoformat() if start_time and hasattr(start_time, 'isoformat') else None,
-                'end_time': end_time.isoformat() if end_time and hasattr(end_time, 'isoformat') else None,
-                'total_points': len(all_points),
-                'source': 'FIT'
-            }
+            return WearableDataParser._summarize(
+                fit.track,
+                source='FIT',
+                name="Imported Hike",
+                description="Imported from Garmin device",
+                **device_totals,
+                **heart_rate
+            )
         
         except Exception as e:
             return {
@@ -191,113 +185,83 @@ class WearableDataParser:
             }
     
     @staticmethod
-    def parse_tcx(file_content: bytes) -> Dict:
+    def _parse_fit_fitparse(content: bytes, max_points: int = MAX_POINTS) -> FitData:
+        """Decode a FIT file with fitparse's generic message API"""
+        fitfile = FitFile(content)
+        
+        # Extract session data
+        session = {}
+        for record in fitfile.get_messages('session'):
+            session = {data.name: data.value for data in record if data.value is not None}
+            break
+        
+        # Extract track points
+        points = TrackBuffer(max_points)
+        heart_rate = []
+        for record in fitfile.get_messages('record'):
+            point = {}
+            
+            for data in record:
+                if data.name == 'position_lat' and data.value is not None:
+                    point['latitude'] = data.value * SEMICIRCLES_TO_DEGREES
+                elif data.name == 'position_long' and data.value is not None:
+                    point['longitude'] = data.value * SEMICIRCLES_TO_DEGREES
+                elif data.name in ('altitude', 'enhanced_altitude') and data.value is not None:
+                    point['elevation'] = data.value
+                elif data.name == 'heart_rate' and data.value is not None:
+                    point['heart_rate'] = data.value
+                elif data.name == 'timestamp' and data.value is not None:
+                    point['time'] = data.value
+            
+            if 'latitude' in point and 'longitude' in point:
+                points.append(
+                    point['latitude'],
+                    point['longitude'],
+                    point.get('elevation', np.nan),
+                    parse_timestamp(point.get('time'))
+                )
+                heart_rate.append(point.get('heart_rate', np.nan))
+        
+        heart_rate = np.array(heart_rate, dtype=np.float64)
+        return FitData(points.arrays(), None if np.isnan(heart_rate).all() else heart_rate, session)
+    
+    @staticmethod
+    def parse_tcx(file_content: Source, max_points: int = MAX_POINTS) -> Dict:
         """
         Parse TCX file from various devices
-        Returns hiking session data with route coordinates
+        Returns hiking session data with the track as arrays
         """
         try:
-            root = ET.fromstring(file_content.decode('utf-8'))
-            
-            # Try multiple namespace variants
-            namespaces = [
-                {'tcx': 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2'},
-                {'tcx': 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v1'},
-                {}  # No namespace fallback
-            ]
-            
-            all_points = []
-            start_time = None
-            end_time = None
+            points = TrackBuffer(max_points)
             
-            # Try each namespace variant
-            for ns in namespaces:
-                trackpoints = root.findall('.//tcx:Trackpoint', ns) if ns else root.findall('.//Trackpoint')
-                
-                if trackpoints:
-                    for trackpoint in trackpoints:
-                        point = {}
-                        
-                        # Get position
-                        position = trackpoint.find('tcx:Position', ns) if ns else trackpoint.find('Position')
-                        if position is not None:
-                            lat = position.find('tcx:LatitudeDegrees', ns) if ns else position.find('LatitudeDegrees')
-                            lon = position.find('tcx:LongitudeDegrees', ns) if ns else position.find('LongitudeDegrees')
-                            if lat is not None and lon is not None and lat.text and lon.text:
-                                point['latitude'] = float(lat.text)
-                                point['longitude'] = float(lon.text)
-                        
-                        # Get elevation
-                        altitude = trackpoint.find('tcx:AltitudeMeters', ns) if ns else trackpoint.find('AltitudeMeters')
-                        if altitude is not None and altitude.text:
-                            point['elevation'] = float(altitude.text)
-                        
-                        # Get time
-                        time_elem = trackpoint.find('tcx:Time', ns) if ns else trackpoint.find('Time')
-                        if time_elem is not None and time_elem.text:
-                            try:
-                                point['time'] = datetime.fromisoformat(time_elem.text.replace('Z', '+00:00'))
-                                if not start_time:
-                                    start_time = point['time']
-                                end_time = point['time']
-                            except:
-                                pass
-                        
-                        if 'latitude' in point and 'longitude' in point:
-                            all_points.append(point)
-                    
-                    # If we found points, no need to try other namespaces
-                    if all_points:
-                        break
+            def read_point(elem, prefix):
+                position = elem.find(prefix + 'Position')
+                if position is None:
+                    return
+                latitude = _float(position.findtext(prefix + 'LatitudeDegrees'))
+                longitude = _float(position.findtext(prefix + 'LongitudeDegrees'))
+                if latitude != latitude or longitude != longitude:
+                    return
+                points.append(
+                    latitude,
+                    longitude,
+                    _float(elem.findtext(prefix + 'AltitudeMeters')),
+                    _time(elem.findtext(prefix + 'Time'))
+                )
             
-            # Calculate metrics
-            total_distance = 0
-            if len(all_points) > 1:
-                for i in range(1, len(all_points)):
-                    # Simple distance calculation
-                    lat1, lon1 = all_points[i-1]['latitude'], all_points[i-1]['longitude']
-                    lat2, lon2 = all_points[i]['latitude'], all_points[i]['longitude']
-                    
-                    # Haversine formula (simplified)
-                    import math
-                    R = 6371  # Earth radius in km
-                    dlat = math.radians(lat2 - lat1)
-                    dlon = math.radians(lon2 - lon1)
-                    a = (math.sin(dlat/2) * math.sin(dlat/2) +
-                         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-                         math.sin(dlon/2) * math.sin(dlon/2))
-                    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                    total_distance += R * c
+            def on_end(elem, prefix, parents):
+                # Laps and activities are done once their points are read
+                if elem.tag in (prefix + 'Lap', prefix + 'Activity', prefix + 'Course'):
+                    elem.clear()
             
-            # Calculate elevation gain
-            elevations = [p.get('elevation', 0) for p in all_points if 'elevation' in p]
-            elevation_gain = max(elevations) - min(elevations) if elevations else 0
+            _stream(file_content, 'Trackpoint', read_point, on_end)
             
-            # Calculate duration
-            duration_hours = 0
-            if start_time and end_time:
-                duration = end_time - start_time
-                duration_hours = duration.total_seconds() / 3600
-            
-            # Calculate center point
-            center_lat = sum(p['latitude'] for p in all_points) / len(all_points) if all_points else 0
-            center_lon = sum(p['longitude'] for p in all_points) / len(all_points) if all_points else 0
-            
-            return {
-                'success': True,
-                'name': "Imported Hike",
-                'description': "Imported from TCX file",
-                'route_coordinates': all_points,
-                'total_distance_km': round(total_distance, 2),
-                'elevation_gain_m': round(elevation_gain, 2),
-                'duration_hours': round(duration_hours, 2),
-                'center_latitude': center_lat,
-                'center_longitude': center_lon,
-                'start_time': start_time.isoformat() if start_time else None,
-                'end_time': end_time.isoformat() if end_time else None,
-                'total_points': len(all_points),
-                'source': 'TCX'
-            }
+            return WearableDataParser._summarize(
+                points.arrays(),
+                source='TCX',
+                name="Imported Hike",
+                description="Imported from TCX file"
+            )
         
         except Exception as e:
             return {
@@ -306,18 +270,75 @@ class WearableDataParser:
             }
     
     @staticmethod
-    def parse_file(file_content: bytes, file_extension: str) -> Dict:
+    def _summarize(track: TrackArrays, source: str, name: str, description: str, **overrides) -> Dict:
         """
-        Parse wearable device file based on extension
+        Build the parse result shared by all formats, with metrics computed
+        from the track in one vectorized pass. Keyword overrides (e.g. totals
+        recorded by the device) replace computed values.
+        """
+        metrics = compute_track_metrics(*track)
+        
+        start_time = end_time = None
+        if track.time is not None:
+            timed = track.time[~np.isnan(track.time)]
+            start_time = datetime.fromtimestamp(timed[0], timezone.utc).isoformat()
+            end_time = datetime.fromtimestamp(timed[-1], timezone.utc).isoformat()
+        
+        result = {
+            'success': True,
+            'name': name,
+            'description': description,
+            'track': track,
+            'total_distance_km': metrics.distance_km,
+            'elevation_gain_m': metrics.elevation_gain_m,
+            'elevation_loss_m': metrics.elevation_loss_m,
+            'duration_hours': metrics.elapsed_hours,
+            'moving_time_hours': metrics.moving_hours,
+            'pace_min_per_km': metrics.pace_min_per_km,
+            'center_latitude': metrics.center_latitude,
+            'center_longitude': metrics.center_longitude,
+            'bounds': dict(zip(('south', 'west', 'north', 'east'), metrics.bounds)) if metrics.bounds else None,
+            'start_time': start_time,
+            'end_time': end_time,
+            'total_points': metrics.point_count,
+            'source': source
+        }
+        result.update(overrides)
+        
+        if 'moving_time_hours' in overrides and result['total_distance_km']:
+            result['pace_min_per_km'] = result['moving_time_hours'] * 60 / result['total_distance_km']
+        
+        for key in ('total_distance_km', 'elevation_gain_m', 'elevation_loss_m', 'duration_hours', 'moving_time_hours', 'pace_min_per_km'):
+            if result[key] is not None:
+                result[key] = round(result[key], 2)
+        return result
+    
+    @staticmethod
+    def parse_file(
+        file_content: Source,
+        file_extension: str,
+        max_bytes: int = MAX_FILE_BYTES,
+        max_points: int = MAX_POINTS
+    ) -> Dict:
+        """
+        Parse wearable device file based on extension.
+        file_content may be bytes or a binary file object, which is read as a stream.
         """
         ext = file_extension.lower().replace('.', '')
         
+        size = _source_size(file_content)
+        if size is not None and size > max_bytes:
+            return {
+                'success': False,
+                'error': f"File is too large ({size / 1024 / 1024:.1f} MB). Maximum is {max_bytes / 1024 / 1024:.0f} MB"
+            }
+        
         if ext == 'gpx':
-            return WearableDataParser.parse_gpx(file_content)
+            return WearableDataParser.parse_gpx(file_content, max_points)
         elif ext == 'fit':
-            return WearableDataParser.parse_fit(file_content)
+            return WearableDataParser.parse_fit(file_content, max_points)
         elif ext == 'tcx':
-            return WearableDataParser.parse_tcx(file_content)
+            return WearableDataParser.parse_tcx(file_content, max_points)
         else:
             return {
                 'success': False,
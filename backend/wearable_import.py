@@ -0,0 +1,481 @@
+"""
+Wearable file imports
+Turns GPX/FIT/TCX recordings into completed hike sessions. Runs as
+background jobs (see job_queue.py): files are parsed and encoded in a shared
+process pool, archives (e.g. a Garmin Connect export) with a bounded number
+of files in flight, then matched to trails in one batch and inserted in a
+single transaction.
+"""
+
+import gzip
+import io
+import itertools
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.hike_session import HikeSession
+from models.strava import StravaActivity
+from route_service import EncodedRoute, route_service
+from stats_service import stats_service
+from trail_matcher import trail_matcher
+from job_queue import JobFailed
+from utils.fingerprint import content_hash, route_signature, same_length
+from utils.track_metrics import TrackArrays
+from utils.wearable_parser import WearableDataParser
+
+SUPPORTED_EXTENSIONS = ('.gpx', '.fit', '.tcx')
+
+# Routes are thinned to about this many points for trail matching
+MATCH_ROUTE_POINTS = 2000
+
+def file_format(filename: str) -> Optional[str]:
+    """The wearable format ('.gpx', '.fit' or '.tcx') of a file name, allowing a .gz suffix"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    extension = os.path.splitext(name)[1]
+    return extension if extension in SUPPORTED_EXTENSIONS else None
+
+
+def match_route(track: TrackArrays) -> np.ndarray:
+    """A track as an (N, 2) (lat, lng) array for trail matching, thinned to about MATCH_ROUTE_POINTS"""
+    step = max(1, -(-len(track.latitude) // MATCH_ROUTE_POINTS))
+    return np.column_stack((track.latitude[::step], track.longitude[::step]))
+
+
+def start_signature(track: TrackArrays) -> Optional[str]:
+    """Route signature of a track from its first point and first timestamp"""
+    if not len(track.latitude) or track.time is None:
+        return None
+    start_time = float(track.time[~np.isnan(track.time)][0])
+    return route_signature(start_time, float(track.latitude[0]), float(track.longitude[0]))
+
+
+def _parse_archive_entry(archive_path: str, name: str, max_bytes: int, max_points: int) -> Dict:
+    """
+    Parse one archive member and encode its route. Runs in a worker process,
+    so the result holds the encoded route rather than the full track.
+    """
+    too_large = {
+        'success': False,
+        'error': f"File is too large. Maximum is {max_bytes / 1024 / 1024:.0f} MB"
+    }
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            info = archive.getinfo(name)
+            if info.file_size > max_bytes:
+                return too_large
+            # Read at most one byte past the limit, whatever the header claims
+            with archive.open(info) as member:
+                data = member.read(max_bytes + 1)
+        if name.lower().endswith('.gz'):
+            with gzip.GzipFile(fileobj=io.BytesIO(data)) as member:
+                data = member.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            return too_large
+    except (zipfile.BadZipFile, OSError, EOFError, ValueError) as e:
+        return {'success': False, 'error': f"Could not read file: {str(e)}"}
+
+    return _encode_parsed(WearableDataParser.parse_file(data, file_format(name), max_bytes, max_points))
+
+
+def _parse_upload(path: str, filename: str, max_bytes: int, max_points: int) -> Dict:
+    """Parse an uploaded file and encode its route; runs in a worker process"""
+    with open(path, 'rb') as source:
+        parsed = WearableDataParser.parse_file(source, os.path.splitext(filename)[1], max_bytes, max_points)
+    return _encode_parsed(parsed)
+
+
+def _encode_parsed(parsed: Dict) -> Dict:
+    """Replace a parse result's track with its encoded route and a thinned copy for matching"""
+    if parsed['success']:
+        track = parsed.pop('track')
+        parsed['route'] = route_service.encode(track)
+        parsed['match_route'] = match_route(track) if len(track.latitude) else None
+        parsed['route_signature'] = start_signature(track)
+    return parsed
+
+
+class WearableImportService:
+    """Create hike sessions from wearable recordings"""
+
+    def __init__(self):
+        self.max_file_bytes = settings.WEARABLE_MAX_FILE_MB * 1024 * 1024
+        self.max_points = settings.WEARABLE_MAX_POINTS
+        self.max_archive_files = settings.WEARABLE_ARCHIVE_MAX_FILES
+        self.workers = max(1, settings.WEARABLE_IMPORT_WORKERS)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def create_session(
+        self,
+        db: Session,
+        user_id: int,
+        hike_id: int,
+        parsed: Dict,
+        route: EncodedRoute,
+        filename: str
+    ) -> HikeSession:
+        """A completed session for a parsed recording, added to the caller's transaction"""
+        started_at = parsed.get('start_time')
+        ended_at = parsed.get('end_time')
+        hike_session = HikeSession(
+            user_id=user_id,
+            hike_id=hike_id,
+            started_at=datetime.fromisoformat(started_at) if started_at else None,
+            completed_at=datetime.fromisoformat(ended_at) if ended_at else None,
+            is_active=False,
+            duration_minutes=round((parsed.get('duration_hours') or 0) * 60),
+            distance_covered_km=parsed.get('total_distance_km', 0),
+            elevation_gain_m=parsed.get('elevation_gain_m', 0),
+            notes=f"Imported from {parsed['source']} file: {filename}"[:500],
+            content_hash=parsed.get('content_hash'),
+            route_signature=parsed.get('route_signature')
+        )
+        route_service.store_encoded(hike_session, route)
+        db.add(hike_session)
+        return hike_session
+
+    @staticmethod
+    def find_duplicate(
+        db: Session,
+        user_id: int,
+        file_hash: Optional[str] = None,
+        signature: Optional[str] = None,
+        distance_km: Optional[float] = None
+    ) -> Optional[int]:
+        """Id of the user's session that already holds this file or recording, if any"""
+        if file_hash:
+            found = db.query(HikeSession.id).filter(
+                HikeSession.user_id == user_id,
+                HikeSession.content_hash == file_hash
+            ).first()
+            if found:
+                return found[0]
+
+        if signature:
+            for session_id, session_km in db.query(HikeSession.id, HikeSession.distance_covered_km).filter(
+                HikeSession.user_id == user_id,
+                HikeSession.route_signature == signature
+            ):
+                if same_length(session_km, distance_km):
+                    return session_id
+        return None
+
+    @staticmethod
+    def link_strava_activity(db: Session, hike_session: HikeSession) -> Optional[StravaActivity]:
+        """Attach the user's synced Strava activity of the same recording to a new session"""
+        if not hike_session.route_signature:
+            return None
+        activities = db.query(StravaActivity).filter(
+            StravaActivity.user_id == hike_session.user_id,
+            StravaActivity.route_signature == hike_session.route_signature,
+            StravaActivity.hike_session_id.is_(None)
+        )
+        for activity in activities:
+            if same_length(hike_session.distance_covered_km, (activity.distance or 0) / 1000):
+                activity.hike_session = hike_session
+                return activity
+        return None
+
+    def archive_entries(self, archive_path: str) -> List[str]:
+        """Names of the wearable files in a ZIP archive, in archive order"""
+        with zipfile.ZipFile(archive_path) as archive:
+            names = [
+                info.filename for info in archive.infolist()
+                if not info.is_dir()
+                and file_format(info.filename)
+                # Skip macOS resource forks and other hidden files
+                and not any(part.startswith(('.', '__MACOSX')) for part in info.filename.split('/'))
+            ]
+        if len(names) > self.max_archive_files:
+            raise ValueError(f"Archive has {len(names)} activity files. Maximum is {self.max_archive_files}")
+        return names
+
+    def import_file(self, db: Session, user_id: int, path: str, filename: str, hike_id: Optional[int] = None) -> Dict:
+        """
+        Import one uploaded recording, matched to a trail unless hike_id is
+        given. A file or recording the user already imported is a no-op.
+        Raises ValueError if the file cannot be imported.
+        """
+        with open(path, 'rb') as source:
+            file_hash = content_hash(source)
+        existing = self.find_duplicate(db, user_id, file_hash=file_hash)
+        if existing:
+            return self._duplicate_result(existing)
+
+        pool = self._get_pool()
+        try:
+            parsed = pool.submit(_parse_upload, path, filename, self.max_file_bytes, self.max_points).result()
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise
+
+        if not parsed['success']:
+            raise ValueError(parsed['error'])
+        parsed['content_hash'] = file_hash
+
+        existing = self.find_duplicate(
+            db, user_id, signature=parsed['route_signature'], distance_km=parsed.get('total_distance_km')
+        )
+        if existing:
+            return self._duplicate_result(existing)
+
+        if hike_id is None and parsed['match_route'] is not None:
+            # Match the recorded route to a known trail
+            match = trail_matcher.match_route(db, parsed['match_route'])
+            hike_id = match[0] if match else None
+
+        if hike_id is None:
+            raise ValueError("Could not match the route to a trail, please choose the hike")
+
+        hike_session = self.create_session(db, user_id, hike_id, parsed, parsed['route'], filename)
+        strava_activity = self.link_strava_activity(db, hike_session)
+        db.flush()
+        stats_service.session_changed(db, user_id, {}, stats_service.session_contribution(hike_session))
+        db.commit()
+
+        return {
+            "message": "Wearable data imported successfully",
+            "duplicate": False,
+            "session_id": hike_session.id,
+            "hike_id": hike_id,
+            "strava_activity_id": strava_activity.strava_activity_id if strava_activity else None,
+            "summary": {
+                "name": parsed.get('name'),
+                "distance_km": parsed.get('total_distance_km'),
+                "elevation_gain_m": parsed.get('elevation_gain_m'),
+                "elevation_loss_m": parsed.get('elevation_loss_m'),
+                "duration_hours": parsed.get('duration_hours'),
+                "moving_time_hours": parsed.get('moving_time_hours'),
+                "pace_min_per_km": parsed.get('pace_min_per_km'),
+                "bounds": parsed.get('bounds'),
+                "total_points": parsed.get('total_points'),
+                "source": parsed.get('source'),
+                "center": {
+                    "latitude": parsed.get('center_latitude'),
+                    "longitude": parsed.get('center_longitude')
+                }
+            },
+            "route_url": f"/api/v1/wearable/sessions/{hike_session.id}/route"
+        }
+
+    def import_archive(self, db: Session, user_id: int, archive_path: str) -> Dict:
+        """
+        Import every GPX/FIT/TCX file (optionally gzipped) in a ZIP archive.
+        Files and recordings the user already has, in earlier imports or
+        earlier in the archive, are reported as duplicates without storing
+        them again; files already imported are not even parsed. Sessions for
+        all other files that parse and match a trail are committed together.
+        The report has one entry per file, in archive order.
+        """
+        names = self.archive_entries(archive_path)
+        report = {name: {'filename': name} for name in names}
+
+        hashes = self._archive_hashes(archive_path, names)
+        first_with_hash = {}
+        to_parse = []
+        for name in names:
+            file_hash = hashes.get(name)
+            if file_hash in first_with_hash:
+                report[name].update(status='duplicate', duplicate_of=first_with_hash[file_hash])
+                continue
+            if file_hash:
+                first_with_hash[file_hash] = name
+            existing = self.find_duplicate(db, user_id, file_hash=file_hash)
+            if existing:
+                report[name].update(status='duplicate', session_id=existing)
+            else:
+                to_parse.append(name)
+
+        results = self._parse_entries(archive_path, to_parse)
+
+        # The same recording can also arrive as different files, e.g. FIT and GPX exports of one hike
+        first_with_signature = {}
+        candidates = []
+        for name in to_parse:
+            parsed = results[name]
+            entry = report[name]
+            if not parsed['success']:
+                entry.update(status='failed', error=parsed['error'])
+                continue
+            if parsed['match_route'] is None:
+                entry.update(status='failed', error="No track points found")
+                continue
+
+            parsed['content_hash'] = hashes.get(name)
+            signature = parsed['route_signature']
+            distance_km = parsed.get('total_distance_km')
+            earlier = first_with_signature.get(signature)
+            if earlier and same_length(results[earlier].get('total_distance_km'), distance_km):
+                entry.update(status='duplicate', duplicate_of=earlier)
+                continue
+            existing = self.find_duplicate(db, user_id, signature=signature, distance_km=distance_km)
+            if existing:
+                entry.update(status='duplicate', session_id=existing)
+                continue
+            if signature:
+                first_with_signature.setdefault(signature, name)
+            candidates.append(name)
+
+        matches = trail_matcher.match_routes(db, [results[name]['match_route'] for name in candidates])
+
+        imported = []
+        for name, match in zip(candidates, matches):
+            parsed = results[name]
+            entry = report[name]
+            if not match:
+                entry.update(status='skipped', error="Could not match the route to a trail")
+                continue
+
+            hike_id = match[0]
+            hike_session = self.create_session(db, user_id, hike_id, parsed, parsed['route'], name)
+            strava_activity = self.link_strava_activity(db, hike_session)
+            entry.update(
+                status='imported',
+                hike_id=hike_id,
+                distance_km=parsed.get('total_distance_km'),
+                elevation_gain_m=parsed.get('elevation_gain_m'),
+                duration_hours=parsed.get('duration_hours'),
+                total_points=parsed.get('total_points'),
+                source=parsed.get('source'),
+                strava_activity_id=strava_activity.strava_activity_id if strava_activity else None
+            )
+            imported.append((entry, hike_session))
+
+        if imported:
+            db.flush()
+            # One statistics update for the whole archive
+            totals = {}
+            for _, hike_session in imported:
+                for column, value in stats_service.session_contribution(hike_session).items():
+                    totals[column] = totals.get(column, 0) + value
+            stats_service.session_changed(db, user_id, {}, totals)
+            db.commit()
+            for entry, hike_session in imported:
+                entry['session_id'] = hike_session.id
+
+        files = [report[name] for name in names]
+        return {
+            'imported': len(imported),
+            'duplicates': sum(1 for entry in files if entry['status'] == 'duplicate'),
+            'skipped': sum(1 for entry in files if entry['status'] == 'skipped'),
+            'failed': sum(1 for entry in files if entry['status'] == 'failed'),
+            'files': files
+        }
+
+    def _archive_hashes(self, archive_path: str, names: List[str]) -> Dict[str, str]:
+        """Content hashes of archive members, streamed; oversized or unreadable members are left out"""
+        hashes = {}
+        with zipfile.ZipFile(archive_path) as archive:
+            for name in names:
+                info = archive.getinfo(name)
+                if info.file_size > self.max_file_bytes:
+                    continue
+                try:
+                    with archive.open(info) as member:
+                        hashes[name] = content_hash(member)
+                except (zipfile.BadZipFile, OSError, EOFError, ValueError):
+                    continue
+        return hashes
+
+    @staticmethod
+    def _duplicate_result(session_id: int) -> Dict:
+        return {
+            "message": "This recording was already imported",
+            "duplicate": True,
+            "session_id": session_id,
+            "route_url": f"/api/v1/wearable/sessions/{session_id}/route"
+        }
+
+    def _parse_entries(self, archive_path: str, names: List[str]) -> Dict[str, Dict]:
+        """
+        Parse archive members in the process pool, keeping at most two files
+        per worker in flight so finished results are consumed as they arrive.
+        """
+        results = {}
+        pending: Dict[Future, Tuple[str, ProcessPoolExecutor]] = {}
+        queue = iter(names)
+
+        def submit(name: str):
+            pool = self._get_pool()
+            future = pool.submit(_parse_archive_entry, archive_path, name, self.max_file_bytes, self.max_points)
+            pending[future] = (name, pool)
+
+        for name in itertools.islice(queue, self.workers * 2):
+            submit(name)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, pool = pending.pop(future)
+                try:
+                    results[name] = future.result()
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); later files get a fresh pool
+                    self._discard_pool(pool)
+                    results[name] = {'success': False, 'error': "Parser process crashed"}
+                except Exception as e:
+                    results[name] = {'success': False, 'error': f"Parsing failed: {str(e)}"}
+
+                next_name = next(queue, None)
+                if next_name is not None:
+                    submit(next_name)
+
+        return results
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned workers do not inherit the server's threads or DB connections
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Singleton instance
+wearable_import_service = WearableImportService()
+
+
+def run_file_job(db: Session, job, payload: Dict) -> Dict:
+    """Job handler for POST /api/v1/wearable/import"""
+    try:
+        return wearable_import_service.import_file(
+            db, job.user_id, payload['upload_path'], payload['filename'], payload.get('hike_id')
+        )
+    except ValueError as e:
+        raise JobFailed(str(e))
+
+
+def run_archive_job(db: Session, job, payload: Dict) -> Dict:
+    """Job handler for POST /api/v1/wearable/import/archive"""
+    try:
+        return wearable_import_service.import_archive(db, job.user_id, payload['upload_path'])
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise JobFailed(str(e))
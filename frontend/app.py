@@ -52,9 +52,20 @@ def fetch_hikes(difficulty=None):
         if difficulty and difficulty != "All":
             params['difficulty'] = difficulty
         
-        response = requests.get(f"{API_BASE_URL}/hikes", params=params)
+        # Revalidate the last response for these filters; the API answers 304 if the catalogue is unchanged
+        cache = st.session_state.setdefault('hikes_cache', {})
+        key = tuple(sorted(params.items()))
+        cached = cache.get(key)
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+        
+        response = requests.get(f"{API_BASE_URL}/hikes", params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached['hikes']
         response.raise_for_status()
-        return response.json()
+        hikes = response.json()
+        if response.headers.get('ETag'):
+            cache[key] = {'etag': response.headers['ETag'], 'hikes': hikes}
+        return hikes
     except requests.exceptions.ConnectionError:
         st.error("⚠️ Cannot connect to backend. Make sure the FastAPI server is running at http://localhost:8000")
         return []
@@ -8,17 +8,51 @@ import streamlit.components.v1 as components
 import bcrypt
 import pyotp
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import settings
 from database import get_db
 from models import User, SessionToken
 from datetime import datetime, timedelta
 
+# bcrypt runs on a few shared threads, so a burst of sign-ins across sessions
+# cannot take every core from the sessions rendering pages
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_lock = threading.Lock()
+_hash_metrics = {"pending": 0, "max_pending": 0, "completed": 0}
+
+def _run_hashing(func, *args):
+    """Run a bcrypt call on the shared executor and wait for it"""
+    with _hash_lock:
+        _hash_metrics["pending"] += 1
+        _hash_metrics["max_pending"] = max(_hash_metrics["max_pending"], _hash_metrics["pending"])
+    try:
+        return _hash_executor.submit(func, *args).result()
+    finally:
+        with _hash_lock:
+            _hash_metrics["pending"] -= 1
+            _hash_metrics["completed"] += 1
+
+def hashing_metrics() -> dict:
+    """Password hashing counters; pending beyond the worker count is queue depth"""
+    with _hash_lock:
+        return {**_hash_metrics, "workers": settings.PASSWORD_HASH_WORKERS}
+
 def hash_password(password: str) -> str:
-    """Hash a password"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    """Hash a password at the configured bcrypt cost"""
+    salt = bcrypt.gensalt(settings.BCRYPT_ROUNDS)
+    return _run_hashing(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return _run_hashing(bcrypt.checkpw, plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made at another bcrypt cost than the configured one"""
+    try:
+        return int(hashed_password.split('$')[2]) != settings.BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
 
 def create_session_token(user_id: int, remember_me: bool = True) -> str:
     """Create a persistent session token for user"""
@@ -100,6 +134,10 @@ def authenticate_user(username: str, password: str) -> dict:
         if not verify_password(password, user.hashed_password):
             return None
         
+        # Upgrade hashes made at another bcrypt cost (committed with the session)
+        if needs_rehash(user.hashed_password):
+            user.hashed_password = hash_password(password)
+        
         # Ensure Nesh is always admin
         is_admin = user.is_admin or (user.username == "Nesh")
         
@@ -57,6 +57,16 @@ class Settings:
     def MAX_UPLOAD_SIZE_MB(self) -> int:
         return int(self._get("MAX_UPLOAD_SIZE_MB", "10"))
     
+    @property
+    def BCRYPT_ROUNDS(self) -> int:
+        """bcrypt cost for new hashes; older hashes are upgraded on the next login"""
+        return int(self._get("BCRYPT_ROUNDS", "12"))
+    
+    @property
+    def PASSWORD_HASH_WORKERS(self) -> int:
+        """Threads shared by all sessions for bcrypt"""
+        return int(self._get("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    
     @property
     def is_production(self) -> bool:
         """Check if running in production"""
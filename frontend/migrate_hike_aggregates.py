@@ -0,0 +1,59 @@
+"""
+Migration script to add the rating aggregate, geohash and route columns
+Run this once to update existing databases
+"""
+from sqlalchemy import LargeBinary
+from database import Base, engine, get_db, init_database
+from models import Hike
+from services import rating_service
+from shared import add_missing_columns, create_missing_indexes, geohash_encode
+
+# Columns added to existing tables: (table, column, DDL or SQLAlchemy type)
+NEW_COLUMNS = [
+    ("hikes", "geohash", "VARCHAR(12)"),
+    ("hikes", "review_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_sum", "FLOAT NOT NULL DEFAULT 0"),
+    ("hikes", "avg_rating", "FLOAT"),
+    ("hikes", "rating_1_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_2_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_3_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_4_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hikes", "rating_5_count", "INTEGER NOT NULL DEFAULT 0"),
+    ("hike_sessions", "route_blob", LargeBinary()),
+    ("hike_sessions", "route_point_count", "INTEGER"),
+    ("hike_sessions", "content_hash", "VARCHAR(64)"),
+    ("hike_sessions", "route_signature", "VARCHAR(32)"),
+]
+
+def backfill_hike_ratings():
+    """Recompute every hike's rating aggregates from its reviews"""
+    with get_db() as db:
+        count = rating_service.rebuild(db)
+        print(f"  ✅ Rating aggregates computed for {count} hikes")
+
+def backfill_geohashes():
+    """Compute geohashes for hikes that have coordinates but no geohash"""
+    with get_db() as db:
+        hikes = db.query(Hike).filter(
+            Hike.geohash.is_(None),
+            Hike.latitude.isnot(None),
+            Hike.longitude.isnot(None)
+        ).all()
+        for hike in hikes:
+            hike.geohash = geohash_encode(hike.latitude, hike.longitude)
+        print(f"  ✅ Geohashes computed for {len(hikes)} hikes")
+
+def migrate():
+    """Bring an existing database up to the current models"""
+    print("Running migration to add hike aggregate and route columns...")
+
+    init_database()
+    add_missing_columns(engine, NEW_COLUMNS)
+    create_missing_indexes(engine, Base.metadata)
+    backfill_hike_ratings()
+    backfill_geohashes()
+
+    print("✅ Migration complete!")
+
+if __name__ == "__main__":
+    migrate()
@@ -2,10 +2,11 @@
 Database models for Streamlit app
 Copied from backend with Streamlit-specific optimizations
 """
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, JSON, LargeBinary, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
+from shared import geohash_encode
 
 class Hike(Base):
     __tablename__ = "hikes"
@@ -22,7 +23,19 @@ class Hike(Base):
     best_season = Column(String)
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(String(12), index=True)  # Derived from latitude/longitude for nearby search
     image_url = Column(String)
+    
+    # Rating aggregates (maintained on review create/delete)
+    review_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Float, default=0.0, nullable=False)
+    avg_rating = Column(Float, index=True)
+    rating_1_count = Column(Integer, default=0, nullable=False)
+    rating_2_count = Column(Integer, default=0, nullable=False)
+    rating_3_count = Column(Integer, default=0, nullable=False)
+    rating_4_count = Column(Integer, default=0, nullable=False)
+    rating_5_count = Column(Integer, default=0, nullable=False)
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -31,6 +44,15 @@ class Hike(Base):
     sessions = relationship("HikeSession", back_populates="hike")
     bookmarks = relationship("Bookmark", back_populates="hike")
 
+@event.listens_for(Hike, "before_insert")
+@event.listens_for(Hike, "before_update")
+def _set_geohash(mapper, connection, hike):
+    """Keep the geohash column in step with the coordinates"""
+    if hike.latitude is not None and hike.longitude is not None:
+        hike.geohash = geohash_encode(hike.latitude, hike.longitude)
+    else:
+        hike.geohash = None
+
 class User(Base):
     __tablename__ = "users"
     
@@ -88,7 +110,11 @@ class HikeSession(Base):
     distance_covered_km = Column(Float)
     elevation_gain_m = Column(Float)
     status = Column(String, default="in_progress")
-    route_data = Column(Text)
+    route_data = Column(Text)  # JSON route; route_blob holds routes stored by the backend in the compact format
+    route_blob = Column(LargeBinary)
+    route_point_count = Column(Integer)
+    content_hash = Column(String(64))  # Duplicate detection, see backend/utils/fingerprint.py
+    route_signature = Column(String(32))
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
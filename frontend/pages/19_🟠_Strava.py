@@ -7,6 +7,7 @@ from auth import is_authenticated, get_current_user
 from nature_theme import apply_nature_theme
 import pandas as pd
 from datetime import datetime
+import time
 
 st.set_page_config(page_title="Strava Connect - Kilele", page_icon="🟠", layout="wide")
 apply_nature_theme()
@@ -83,11 +84,24 @@ if is_connected:
                         headers={"user-id": str(user['id'])}
                     )
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        st.success(f"✅ {data['message']}")
-                        st.cache_data.clear()
-                        st.rerun()
+                    if response.status_code == 202:
+                        # The sync runs as a background job; wait for it to finish
+                        job_url = f"{API_BASE_URL}/api/v1/jobs/{response.json()['job_id']}"
+                        job = {}
+                        for _ in range(120):
+                            job = requests.get(job_url, headers={"user-id": str(user['id'])}).json()
+                            if job.get('status') in ('succeeded', 'failed'):
+                                break
+                            time.sleep(1)
+                        
+                        if job.get('status') == 'succeeded':
+                            st.success(f"✅ {job['result']['message']}")
+                            st.cache_data.clear()
+                            st.rerun()
+                        elif job.get('status') == 'failed':
+                            st.error(f"❌ Sync failed: {job.get('error') or 'Unknown error'}")
+                        else:
+                            st.info("⏳ Sync is still running, check back in a moment")
                     else:
                         st.error(f"❌ Sync failed: {response.json().get('detail', 'Unknown error')}")
                 except Exception as e:
@@ -11,6 +11,10 @@ from models import (
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy import func, or_
+from shared import RatingService
+
+# Hike rating aggregates, maintained the same way as in the API
+rating_service = RatingService(Hike, Review)
 
 # ============= HIKE SERVICES =============
 
@@ -38,6 +42,8 @@ def get_all_hikes(difficulty: str = None, skip: int = 0, limit: int = 100) -> Li
             "latitude": h.latitude,
             "longitude": h.longitude,
             "image_url": h.image_url,
+            "avg_rating": h.avg_rating,
+            "review_count": h.review_count or 0,
             "created_at": h.created_at.isoformat() if h.created_at else None
         } for h in hikes]
 
@@ -61,7 +67,10 @@ def get_hike(hike_id: int) -> Optional[dict]:
             "best_season": hike.best_season,
             "latitude": hike.latitude,
             "longitude": hike.longitude,
-            "image_url": hike.image_url
+            "image_url": hike.image_url,
+            "avg_rating": hike.avg_rating,
+            "review_count": hike.review_count or 0,
+            "rating_histogram": {stars: getattr(hike, f"rating_{stars}_count") or 0 for stars in range(1, 6)}
         }
 
 def create_hike(hike_data: dict) -> dict:
@@ -105,6 +114,7 @@ def create_review(user_id: int, hike_id: int, rating: int, comment: str = None,
         )
         db.add(review)
         db.flush()
+        rating_service.review_added(db, hike_id, rating)
         
         return {"id": review.id, "rating": rating}
 
@@ -406,19 +416,21 @@ def get_user_stats(user_id: int) -> dict:
                 "bookmarks_count": 0
             }
         
-        sessions = db.query(HikeSession).filter(HikeSession.user_id == user_id).all()
+        # One aggregate query instead of loading every session row
+        total_hikes, total_distance, total_elevation, total_duration = db.query(
+            func.count(HikeSession.id),
+            func.coalesce(func.sum(HikeSession.distance_covered_km), 0),
+            func.coalesce(func.sum(HikeSession.elevation_gain_m), 0),
+            func.coalesce(func.sum(HikeSession.duration_hours), 0)
+        ).filter(HikeSession.user_id == user_id).one()
         reviews_count = db.query(func.count(Review.id)).filter(Review.user_id == user_id).scalar()
         bookmarks_count = db.query(func.count(Bookmark.id)).filter(Bookmark.user_id == user_id).scalar()
         
-        total_distance = sum(s.distance_km or 0 for s in sessions)
-        total_elevation = sum(s.elevation_gain_m or 0 for s in sessions)
-        total_duration = sum(s.duration_hours or 0 for s in sessions)
-        
         return {
-            "total_hikes": len(sessions),
-            "total_distance": round(total_distance, 2),
-            "total_elevation": round(total_elevation, 2),
-            "total_duration": round(total_duration, 2),
+            "total_hikes": total_hikes,
+            "total_distance": round(float(total_distance), 2),
+            "total_elevation": round(float(total_elevation), 2),
+            "total_duration": round(float(total_duration), 2),
             "reviews_count": reviews_count,
             "bookmarks_count": bookmarks_count
         }
@@ -554,6 +566,7 @@ def delete_review_admin(review_id: int) -> bool:
             return False
         db.delete(review)
         db.flush()
+        rating_service.review_removed(db, review.hike_id, review.rating)
         return True
 
 def get_all_reviews_admin(skip: int = 0, limit: int = 100) -> List[dict]:
@@ -0,0 +1,15 @@
+"""
+Helpers shared with the API
+Loaded from backend/utils so the Streamlit app and the API use one implementation
+"""
+import os
+import sys
+
+BACKEND_UTILS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", "utils")
+if BACKEND_UTILS not in sys.path:
+    # Appended, so the app's own modules (including its utils package) take precedence
+    sys.path.append(BACKEND_UTILS)
+
+from geo import geohash_encode  # noqa: E402
+from ratings import RatingService  # noqa: E402
+from schema_migration import add_missing_columns, create_missing_indexes  # noqa: E402